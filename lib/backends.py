@@ -0,0 +1,597 @@
+import ast
+import datetime
+import operator
+import warnings
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from .config import CONFIG
+from .expressions import compile_formula, FUNCTIONS
+from .plan import optimize_plan, execute_plan
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Carries each row's original position through backends without an index
+ROW_ID = "__row__"
+
+SQL_FUNCTIONS = {
+    'abs': 'abs', 'sqrt': 'sqrt', 'exp': 'exp', 'log': 'ln', 'log10': 'log10',
+    'sin': 'sin', 'cos': 'cos', 'tan': 'tan', 'arcsin': 'asin', 'arccos': 'acos',
+    'arctan': 'atan', 'arctan2': 'atan2', 'sinh': 'sinh', 'cosh': 'cosh', 'tanh': 'tanh',
+    'arcsinh': 'asinh', 'arccosh': 'acosh', 'arctanh': 'atanh',
+}
+
+# Functions DuckDB rejects outside their domain, written to give NULL there as
+# NumPy gives NaN, and NumPy's infinities at the poles
+SQL_DOMAINS = {
+    'sqrt': "CASE WHEN {0} >= 0 THEN sqrt({0}) END",
+    'log': "CASE WHEN {0} > 0 THEN ln({0}) WHEN {0} = 0 THEN '-inf'::DOUBLE END",
+    'log10': "CASE WHEN {0} > 0 THEN log10({0}) WHEN {0} = 0 THEN '-inf'::DOUBLE END",
+    'log1p': "CASE WHEN {0} > -1 THEN ln(1 + {0}) WHEN {0} = -1 THEN '-inf'::DOUBLE END",
+    'arcsin': "CASE WHEN {0} BETWEEN -1 AND 1 THEN asin({0}) END",
+    'arccos': "CASE WHEN {0} BETWEEN -1 AND 1 THEN acos({0}) END",
+    'arccosh': "CASE WHEN {0} >= 1 THEN acosh({0}) END",
+    'arctanh': "CASE WHEN abs({0}) < 1 THEN atanh({0}) WHEN {0} = 1 THEN 'inf'::DOUBLE "
+               "WHEN {0} = -1 THEN '-inf'::DOUBLE END",
+}
+
+COMPARISONS = {
+    'Eq': operator.eq, 'NotEq': operator.ne, 'Lt': operator.lt,
+    'LtE': operator.le, 'Gt': operator.gt, 'GtE': operator.ge,
+}
+
+SQL_OPERATORS = {
+    ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/', ast.BitAnd: 'AND', ast.BitOr: 'OR',
+    ast.Eq: '=', ast.NotEq: '<>', ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=',
+}
+
+
+class PandasBackend:
+    """
+    Runs transformations in memory with pandas.
+    """
+    name = "pandas"
+
+    def execute(self, df: pd.DataFrame, steps: list, load_dataset) -> pd.DataFrame:
+        """
+        Runs recorded transformations against a dataframe.
+
+        Parameters
+        ------------
+        df: pd.DataFrame
+            The data before the transformations.
+        steps: list[dict]
+            Transformations as recorded in history.
+        load_dataset: callable
+            Returns the latest dataframe of a dataset, given its path_id, for merges.
+
+        Returns
+        ------------
+        pd.DataFrame: The transformed data.
+        """
+        return execute_plan(df, steps, load_dataset)
+
+
+class PolarsBackend:
+    """
+    Runs transformations with Polars, which spreads each step across all cores.
+    """
+    name = "polars"
+
+    def __init__(self) -> None:
+        if pl is None:
+            raise ImportError("The polars backend requires the polars package.")
+
+    def execute(self, df: pd.DataFrame, steps: list, load_dataset) -> pd.DataFrame:
+        """
+        Runs recorded transformations against a dataframe. See PandasBackend.execute.
+        """
+        frame = pl.from_pandas(_with_row_ids(df)).lazy()
+        self.nullable = _nullable_columns(df)
+        merged = False
+
+        for stage in optimize_plan(steps):
+            if stage['name'] == 'filter':
+                for predicate in stage['predicates']:
+                    frame = frame.filter(self.predicate(*predicate))
+                # DataFrame.query compares nullable text like other text, so
+                # its missing values don't carry through filters
+                text = {name for name, dtype in frame.collect_schema().items() if dtype == pl.String}
+                for query in stage['queries']:
+                    frame = frame.filter(self.expression(query, self.nullable - text))
+
+            elif stage['name'] == 'columns':
+                for name, formula in stage['formulas'].items():
+                    frame = frame.with_columns(self.expression(formula, self.nullable).alias(name))
+                    _track_nullable(self.nullable, name, formula)
+
+            elif stage['name'] == 'dedup':
+                subset = stage['subset'] or [col for col in frame.collect_schema().names() if col != ROW_ID]
+                frame = frame.unique(subset=subset, keep=stage['keep'], maintain_order=True)
+
+            elif stage['name'] == 'merge':
+                right = load_dataset(stage['dataset'], stage['version'], stage['load_columns'])['df']
+                self.nullable = _merged_nullable(self.nullable, frame.collect_schema().names(), right, stage['columns'])
+                frame = self.merge(frame, pl.from_pandas(_with_row_ids(right)).lazy(), stage['columns'])
+                merged = True
+
+        # NumPy functions warn on invalid input from Polars' threads, where
+        # np.errstate doesn't reach
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            result = frame.collect()
+
+        return _restore_index(_restore_dtypes(result.to_pandas(), df, self.nullable), df, merged)
+
+    def merge(self, left, right, keys: list):
+        """
+        Full outer join matching pd.merge(how="outer"): keys coalesced, shared
+        columns suffixed _x and _y, rows sorted by key.
+        """
+        left_cols = left.collect_schema().names()
+        right_cols = right.collect_schema().names()
+        shared = [col for col in left_cols if col in right_cols and col not in keys and col != ROW_ID]
+
+        left = left.rename({**{col: f"{col}_x" for col in shared}, ROW_ID: "__left__"})
+        right = right.rename({**{col: f"{col}_y" for col in shared}, ROW_ID: "__right__"})
+
+        joined = left.join(right, on=keys, how="full", coalesce=True, nulls_equal=True)
+        joined = joined.sort(keys + ["__left__", "__right__"], nulls_last=True)
+
+        columns = [f"{col}_x" if col in shared else col for col in left_cols if col != ROW_ID]
+        columns += [f"{col}_y" if col in shared else col for col in right_cols
+                    if col not in keys and col != ROW_ID]
+        return joined.select(columns).with_row_index(ROW_ID)
+
+    def predicate(self, col: str, op: str, value):
+        """
+        Builds a Polars expression from a structured row filter. As in pandas,
+        missing values pass `!=` and `not in`.
+        """
+        column = pl.col(col)
+        if op == '==':
+            return column.eq(value)
+        if op == '!=':
+            return column.ne_missing(value)
+        if op in ('<', '<=', '>', '>='):
+            return {'<': column.lt, '<=': column.le, '>': column.gt, '>=': column.ge}[op](value)
+        if op == 'in':
+            return column.is_in(list(value), nulls_equal=True)
+        if op == 'not in':
+            return ~column.is_in(list(value), nulls_equal=True)
+        raise ValueError(f"Unsupported filter operator: {op}")
+
+    def expression(self, formula: str, nullable: set):
+        """
+        Builds a Polars expression from a formula or filter query. Comparisons and
+        functions treat missing values as pandas does; see `compare`. Missing
+        values of the `nullable` columns carry through comparisons.
+        """
+        compiled = compile_formula(formula)
+        tree = _MarkComparisons(compiled['columns'], nullable).visit(ast.parse(compiled['source'], mode="eval"))
+
+        namespace = {f"_c{i}": pl.col(col) for i, col in enumerate(compiled['columns'])}
+        # Invalid input gives NaN, which Polars orders above every number and
+        # equal to itself; missing values compare as pandas compares NaN
+        namespace.update({name: (lambda function: lambda *args: function(*args).fill_nan(None))(function)
+                          for name, function in FUNCTIONS.items() if name != 'where'})
+        namespace['where'] = lambda cond, a, b: pl.when(cond).then(a).otherwise(b)
+        namespace['_compare'] = self.compare
+
+        result = eval(compile(ast.fix_missing_locations(tree), "<formula>", "eval"), {"__builtins__": {}}, namespace)
+        return result if isinstance(result, pl.Expr) else pl.lit(result)
+
+    def compare(self, op: str, left, right, propagate: bool):
+        """
+        Compares two expressions as pandas does: a missing value makes `!=` true
+        and other comparisons false, unless a nullable column is involved, whose
+        missing values carry through.
+        """
+        result = COMPARISONS[op](left if isinstance(left, pl.Expr) else pl.lit(left), right)
+        return result if propagate else result.fill_null(op == 'NotEq')
+
+
+class DuckDBBackend:
+    """
+    Runs transformations as SQL on an embedded DuckDB connection, which scans
+    the data through Arrow without copying it and uses all cores.
+    """
+    name = "duckdb"
+
+    def __init__(self) -> None:
+        if duckdb is None:
+            raise ImportError("The duckdb backend requires the duckdb package.")
+        self.connection = duckdb.connect()
+
+    def execute(self, df: pd.DataFrame, steps: list, load_dataset) -> pd.DataFrame:
+        """
+        Runs recorded transformations against a dataframe. See PandasBackend.execute.
+        """
+        # Arrow turns NaN into NULL, matching how pandas treats missing values
+        source = pa.Table.from_pandas(_with_row_ids(df), preserve_index=False)
+        self.connection.register("source", source)
+        self.nullable = _nullable_columns(df)
+
+        query = "SELECT * FROM source"
+        merged = False
+
+        try:
+            for stage in optimize_plan(steps):
+                if stage['name'] == 'filter':
+                    text = self.text_columns(query)
+                    conditions = [self.predicate(*predicate) for predicate in stage['predicates']]
+                    # DataFrame.query compares nullable text like other text, so
+                    # its missing values don't carry through filters
+                    conditions += [self.sql(q, text, self.nullable - text) for q in stage['queries']]
+                    conditions = " AND ".join(f"({condition})" for condition in conditions)
+                    query = f"SELECT * FROM ({query}) WHERE {conditions}"
+
+                elif stage['name'] == 'columns':
+                    for name, formula in stage['formulas'].items():
+                        expression = self.sql(formula, self.text_columns(query), self.nullable)
+                        if name in self.columns(query):
+                            query = f"SELECT * REPLACE ({expression} AS {_quote(name)}) FROM ({query})"
+                        else:
+                            query = f"SELECT *, {expression} AS {_quote(name)} FROM ({query})"
+                        _track_nullable(self.nullable, name, formula)
+
+                elif stage['name'] == 'dedup':
+                    subset = stage['subset'] or self.columns(query)
+                    partition = ", ".join(_quote(col) for col in subset)
+                    if stage['keep'] == 'none':
+                        keep = f"count(*) OVER (PARTITION BY {partition}) = 1"
+                    else:
+                        order = "DESC" if stage['keep'] == 'last' else "ASC"
+                        keep = f"row_number() OVER (PARTITION BY {partition} ORDER BY {ROW_ID} {order}) = 1"
+                    query = f"SELECT * FROM ({query}) QUALIFY {keep}"
+
+                elif stage['name'] == 'merge':
+                    right_df = load_dataset(stage['dataset'], stage['version'], stage['load_columns'])['df']
+                    self.nullable = _merged_nullable(self.nullable, self.columns(query), right_df, stage['columns'])
+                    right = pa.Table.from_pandas(_with_row_ids(right_df), preserve_index=False)
+                    self.connection.register("merge_source", right)
+                    query = self.merge(query, right, stage['columns'])
+                    merged = True
+
+            result = self.connection.execute(f"SELECT * FROM ({query}) ORDER BY {ROW_ID}").arrow()
+            # Newer DuckDB releases return a reader rather than a table
+            if isinstance(result, pa.RecordBatchReader):
+                result = result.read_all()
+        finally:
+            self.connection.unregister("source")
+            self.connection.unregister("merge_source")
+
+        return _restore_index(_restore_dtypes(result.to_pandas(), df, self.nullable), df, merged)
+
+    def describe(self, query: str) -> dict:
+        """
+        Returns the column types a query produces, without running it.
+        """
+        rows = self.connection.execute(f"DESCRIBE {query}").fetchall()
+        return {row[0]: row[1] for row in rows if row[0] != ROW_ID}
+
+    def columns(self, query: str) -> list:
+        """
+        Returns the data columns a query produces.
+        """
+        return list(self.describe(query))
+
+    def text_columns(self, query: str) -> set:
+        """
+        Returns the text columns a query produces, where + means concatenation.
+        """
+        return {name for name, kind in self.describe(query).items() if kind == "VARCHAR"}
+
+    def merge(self, query: str, right: pa.Table, keys: list) -> str:
+        """
+        Builds a full outer join matching pd.merge(how="outer"): keys coalesced,
+        shared columns suffixed _x and _y, rows sorted by key.
+        """
+        left_cols = self.columns(query)
+        right_cols = [col for col in right.column_names if col != ROW_ID]
+        shared = [col for col in left_cols if col in right_cols and col not in keys]
+
+        select = []
+        for col in left_cols:
+            if col in keys:
+                select.append(f"coalesce(l.{_quote(col)}, r.{_quote(col)}) AS {_quote(col)}")
+            else:
+                select.append(f"l.{_quote(col)} AS {_quote(f'{col}_x' if col in shared else col)}")
+        for col in right_cols:
+            if col not in keys:
+                select.append(f"r.{_quote(col)} AS {_quote(f'{col}_y' if col in shared else col)}")
+
+        on = " AND ".join(f"l.{_quote(col)} IS NOT DISTINCT FROM r.{_quote(col)}" for col in keys)
+        order = ", ".join(f"{_quote(col)} NULLS LAST" for col in keys)
+        joined = (f"SELECT {', '.join(select)}, l.{ROW_ID} AS __left__, r.{ROW_ID} AS __right__ "
+                  f"FROM ({query}) l FULL OUTER JOIN merge_source r ON {on}")
+
+        return (f"SELECT * EXCLUDE (__left__, __right__), row_number() OVER "
+                f"(ORDER BY {order}, __left__ NULLS LAST, __right__ NULLS LAST) - 1 AS {ROW_ID} "
+                f"FROM ({joined})")
+
+    def predicate(self, col: str, op: str, value) -> str:
+        """
+        Translates a structured row filter to SQL. As in pandas, missing values
+        pass `!=` and `not in`.
+        """
+        column = _quote(col)
+        if op == '!=':
+            return f"{column} IS DISTINCT FROM {self.literal(value)}"
+        if op in ('in', 'not in'):
+            values = list(value)
+            listed = ", ".join(self.literal(item) for item in values if not pd.isna(item)) or "NULL"
+            matched = f"coalesce({column} IN ({listed}), FALSE)"
+            if any(pd.isna(item) for item in values):
+                matched = f"({matched} OR {column} IS NULL)"
+            return matched if op == 'in' else f"NOT {matched}"
+        if op in ('==', '<', '<=', '>', '>='):
+            return f"{column} {'=' if op == '==' else op} {self.literal(value)}"
+        raise ValueError(f"Unsupported filter operator: {op}")
+
+    def literal(self, value) -> str:
+        """
+        Writes a filter value as a SQL literal.
+        """
+        if isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, datetime.date):
+            # Quoted, so DuckDB casts it to the column's type
+            return f"'{value.isoformat()}'"
+        return self.translate(ast.Constant(value=value), (), set(), set())
+
+    def sql(self, formula: str, text: set, nullable: set) -> str:
+        """
+        Translates a formula or filter query to a SQL expression, where missing
+        values of the `nullable` columns carry through comparisons.
+        """
+        compiled = compile_formula(formula)
+        return self.translate(ast.parse(compiled['source'], mode="eval").body, compiled['columns'], text, nullable)
+
+    def translate(self, node, columns: tuple, text: set, nullable: set) -> str:
+        """
+        Translates one node of a rewritten formula to SQL.
+        """
+        if isinstance(node, ast.Name):
+            return _quote(columns[int(node.id[2:])])
+
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, bool):
+                return "TRUE" if node.value else "FALSE"
+            if node.value is None:
+                return "NULL"
+            if isinstance(node.value, str):
+                return "'" + node.value.replace("'", "''") + "'"
+            return repr(node.value)
+
+        if isinstance(node, ast.UnaryOp):
+            operand = self.translate(node.operand, columns, text, nullable)
+            return f"(NOT {operand})" if isinstance(node.op, ast.Invert) else \
+                f"({'-' if isinstance(node.op, ast.USub) else '+'}{operand})"
+
+        if isinstance(node, ast.Compare):
+            left = self.translate(node.left, columns, text, nullable)
+            right = self.translate(node.comparators[0], columns, text, nullable)
+            comparison = f"({left} {SQL_OPERATORS[type(node.ops[0])]} {right})"
+            if _MarkComparisons(columns, nullable).propagates(node):
+                return comparison
+            # As in pandas, a missing value makes != true and other comparisons false
+            return f"coalesce({comparison}, {'TRUE' if isinstance(node.ops[0], ast.NotEq) else 'FALSE'})"
+
+        if isinstance(node, ast.BinOp):
+            left = self.translate(node.left, columns, text, nullable)
+            right = self.translate(node.right, columns, text, nullable)
+            if isinstance(node.op, ast.Add) and self.is_text(node, columns, text):
+                return f"({left} || {right})"
+            if isinstance(node.op, ast.Pow):
+                return f"power({left}, {right})"
+            if isinstance(node.op, ast.FloorDiv):
+                return f"floor({left} / {right})"
+            if isinstance(node.op, ast.Mod):
+                # Python's modulo takes the sign of the divisor
+                return f"((({left} % {right}) + {right}) % {right})"
+            if isinstance(node.op, ast.BitXor):
+                return f"xor({left}, {right})"
+            return f"({left} {SQL_OPERATORS[type(node.op)]} {right})"
+
+        if isinstance(node, ast.Call):
+            args = [self.translate(arg, columns, text, nullable) for arg in node.args]
+            name = node.func.id
+            if name == 'where':
+                return f"(CASE WHEN {args[0]} THEN {args[1]} ELSE {args[2]} END)"
+            if name == 'expm1':
+                return f"(exp({args[0]}) - 1)"
+            if name in SQL_DOMAINS:
+                return f"({SQL_DOMAINS[name].format(args[0])})"
+            return f"{SQL_FUNCTIONS[name]}({', '.join(args)})"
+
+        raise ValueError(f"Unsupported syntax in formula: {type(node).__name__}")
+
+    def is_text(self, node, columns: tuple, text: set) -> bool:
+        """
+        Checks whether a formula node produces text, so + means concatenation.
+        """
+        if isinstance(node, ast.Name):
+            return columns[int(node.id[2:])] in text
+        if isinstance(node, ast.Constant):
+            return isinstance(node.value, str)
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            return self.is_text(node.left, columns, text) or self.is_text(node.right, columns, text)
+        return False
+
+
+BACKENDS = {
+    'pandas': PandasBackend,
+    'polars': PolarsBackend,
+    'duckdb': DuckDBBackend,
+}
+
+
+def get_backend(name: str = None, client: str = None):
+    """
+    Creates an execution backend by name, or the one configured for a client.
+
+    Parameters
+    ------------
+    name: str
+        One of BACKENDS, or None to use the configuration.
+    client: str
+        The client whose configured backend to use when no name is given.
+
+    Returns
+    ------------
+    The backend instance.
+    """
+    if name is None:
+        name = CONFIG['backend']['clients'].get(client, CONFIG['backend']['default'])
+
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend: {name}")
+
+    return BACKENDS[name]()
+
+
+def compare_backends(df: pd.DataFrame, steps: list, load_dataset=None, backends: list = None) -> dict:
+    """
+    Runs the same transformations on several backends and checks each result
+    against pandas, ignoring dtype differences such as int64 against Int64.
+
+    Parameters
+    ------------
+    df: pd.DataFrame
+        The data before the transformations.
+    steps: list[dict]
+        Transformations as recorded in history.
+    load_dataset: callable
+        Returns the latest dataframe of a dataset, for merges.
+    backends: list[str]
+        Backends to check, defaulting to every installed one.
+
+    Returns
+    ------------
+    dict: Backend names mapped to None when they match pandas, or the difference.
+    """
+    if backends is None:
+        backends = [name for name, module in (('polars', pl), ('duckdb', duckdb)) if module is not None]
+
+    expected = PandasBackend().execute(df, steps, load_dataset)
+    results = {}
+
+    for name in backends:
+        actual = get_backend(name).execute(df, steps, load_dataset)
+        try:
+            pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_index_type=False)
+            results[name] = None
+        except AssertionError as e:
+            results[name] = str(e)
+
+    return results
+
+
+class _MarkComparisons(ast.NodeTransformer):
+    """
+    Rewrites the comparisons of a compiled formula as calls to `_compare`, noting
+    whether they read a nullable column, whose missing values pandas carries
+    through comparisons instead of treating them as NaN.
+    """
+
+    def __init__(self, columns: tuple, nullable: set) -> None:
+        self.columns = columns
+        self.nullable = nullable
+
+    def propagates(self, node) -> bool:
+        return any(isinstance(child, ast.Name) and child.id.startswith("_c")
+                   and self.columns[int(child.id[2:])] in self.nullable for child in ast.walk(node))
+
+    def visit_Compare(self, node):
+        propagate = self.propagates(node)
+        node = self.generic_visit(node)
+        return ast.Call(func=ast.Name(id="_compare", ctx=ast.Load()),
+                        args=[ast.Constant(value=type(node.ops[0]).__name__), node.left,
+                              node.comparators[0], ast.Constant(value=propagate)],
+                        keywords=[])
+
+
+def _nullable_columns(df: pd.DataFrame) -> set:
+    """
+    Returns the columns with nullable dtypes such as Int64 or boolean, whose
+    missing value is pd.NA rather than NaN.
+    """
+    return {col for col, dtype in df.dtypes.items() if getattr(dtype, 'na_value', None) is pd.NA}
+
+
+def _track_nullable(nullable: set, name: str, formula: str) -> None:
+    """
+    Marks a formula column nullable when it reads a nullable column, as pandas
+    arithmetic on those keeps a nullable dtype.
+    """
+    if nullable.intersection(compile_formula(formula)['columns']):
+        nullable.add(name)
+    else:
+        nullable.discard(name)
+
+
+def _merged_nullable(nullable: set, left_cols: list, right: pd.DataFrame, keys: list) -> set:
+    """
+    Returns the nullable columns after an outer merge, named as pd.merge names them.
+    """
+    right_nullable = _nullable_columns(right)
+    shared = {col for col in left_cols if col in right.columns and col not in keys}
+
+    merged = {col for col in keys if col in nullable or col in right_nullable}
+    merged |= {f"{col}_x" if col in shared else col for col in nullable if col in left_cols and col not in keys}
+    merged |= {f"{col}_y" if col in shared else col for col in right_nullable if col not in keys}
+    return merged
+
+
+def _with_row_ids(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds each row's position as a column, dropping the index.
+    """
+    return df.reset_index(drop=True).assign(**{ROW_ID: np.arange(len(df))})
+
+
+def _restore_dtypes(result: pd.DataFrame, source: pd.DataFrame, nullable: set) -> pd.DataFrame:
+    """
+    Gives categorical columns back the source's categories, which pandas keeps
+    when rows are dropped but DuckDB returns as text and Polars prunes, and
+    nullable columns a nullable dtype again, with pd.NA for missing values.
+    """
+    for col, dtype in source.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) and col in result.columns:
+            values = result[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Unordered categories compare equal in any order, so astype wouldn't reorder them
+                result[col] = values.cat.set_categories(dtype.categories, ordered=dtype.ordered)
+            else:
+                result[col] = values.astype(dtype)
+
+    for col in nullable.intersection(result.columns):
+        if not isinstance(result[col].dtype, pd.CategoricalDtype):
+            result[col] = result[col].convert_dtypes()
+    return result
+
+
+def _restore_index(result: pd.DataFrame, source: pd.DataFrame, merged: bool) -> pd.DataFrame:
+    """
+    Puts back the source index for the surviving rows, or a fresh range index
+    after a merge, as pandas does.
+    """
+    positions = result.pop(ROW_ID).to_numpy()
+    result.index = pd.RangeIndex(len(result)) if merged else source.index.take(positions)
+    return result
+
+
+def _quote(name: str) -> str:
+    """
+    Quotes a SQL identifier.
+    """
+    return '"' + str(name).replace('"', '""') + '"'
@@ -0,0 +1,209 @@
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from .config import ClientPath
+from .import_engine import stream_import
+
+
+def find_sources(sources) -> list:
+    """
+    Expands directories and glob patterns into a sorted list of files.
+
+    Parameters
+    ------------
+    sources: str or list[str]
+        Files, directories or glob patterns.
+
+    Returns
+    ------------
+    list[str]: The matching files.
+    """
+    if isinstance(sources, str):
+        sources = [sources]
+
+    files = set()
+    for source in sources:
+        if os.path.isdir(source):
+            files.update(os.path.join(source, name) for name in os.listdir(source)
+                         if os.path.isfile(os.path.join(source, name)))
+        else:
+            files.update(path for path in glob.glob(source) if os.path.isfile(path))
+
+    return sorted(files)
+
+
+def database_names(files: list) -> dict:
+    """
+    Names the database of each file after its path below the folder all the
+    files share, so files with the same name in different folders stay apart.
+    Files differing only by extension keep it in their name.
+
+    Parameters
+    ------------
+    files: list[str]
+        The files being imported.
+
+    Returns
+    ------------
+    dict: Each file mapped to its database name.
+    """
+    paths = {source: os.path.abspath(source) for source in files}
+    try:
+        root = os.path.commonpath([os.path.dirname(path) for path in paths.values()]) if paths else ''
+    except ValueError:
+        # Files on different drives share no folder
+        root = ''
+
+    names = {source: os.path.splitext(os.path.relpath(path, root) if root else path.replace(':', ''))
+             for source, path in paths.items()}
+    stems = [stem for stem, _ in names.values()]
+
+    return {source: stem if stems.count(stem) == 1 else stem + extension.replace('.', '_')
+            for source, (stem, extension) in names.items()}
+
+
+def import_file(client: str, year: str, specs: dict, source: str, db_name: str = None) -> dict:
+    """
+    Imports one file into the client's database using saved specs. Errors are
+    returned in the result instead of raised, so one bad file does not stop a batch.
+
+    Parameters
+    ------------
+    client: str
+        The client name.
+    year: str
+        The year the file belongs to.
+    specs: dict
+        Import specs, as saved by DataImport.
+    source: str
+        The file to import.
+    db_name: str
+        Name of the database under the year, defaulting to the file name
+        without its extension.
+
+    Returns
+    ------------
+    dict: The import summary with a 'status' of 'ok' or 'error'.
+    """
+    start = time.perf_counter()
+    db_name = os.path.join(str(year), db_name or os.path.splitext(os.path.basename(source))[0])
+
+    try:
+        paths = ClientPath(client)
+        target = paths.get('database', 'data', create=True, db_name=db_name)
+
+        summary = stream_import(source, specs, target)
+        summary['database'] = db_name
+        if not summary['rows']:
+            raise ValueError("No rows were read from the file")
+        if not os.path.exists(target):
+            raise FileNotFoundError(f"Nothing was written to {target}")
+
+        with open(paths.get('database', 'specs', create=True, db_name=db_name), 'w') as f:
+            json.dump(specs, f, indent=4)
+
+        summary['status'] = 'ok'
+        return summary
+    except Exception as e:
+        return {
+            'source': source,
+            'status': 'error',
+            'error': f"{type(e).__name__}: {e}",
+            'seconds': time.perf_counter() - start
+        }
+
+
+def batch_import(client: str, year: str, spec_name: str, sources, workers: int = None, progress=None) -> dict:
+    """
+    Imports many files in parallel with a named spec, one process per core by
+    default, and saves a summary report for the year.
+
+    Parameters
+    ------------
+    client: str
+        The client name.
+    year: str
+        The year the files belong to.
+    spec_name: str
+        Name of the saved spec under the client's named_specs.
+    sources: str or list[str]
+        Files, directories or glob patterns to import.
+    workers: int
+        Number of worker processes, defaulting to the number of cores.
+    progress: callable
+        Called with (done, total, result) as each file finishes.
+
+    Returns
+    ------------
+    dict: The batch report with one result per file.
+    """
+    paths = ClientPath(client)
+    spec_path = paths.get('named_specs', 'specs', spec_name=spec_name)
+
+    with open(spec_path, 'r') as f:
+        specs = json.load(f)
+
+    files = find_sources(sources)
+    names = database_names(files)
+    start = time.perf_counter()
+    results = []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(import_file, client, year, specs, source, names[source]) for source in files]
+
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if progress:
+                progress(len(results), len(files), result)
+
+    results.sort(key=lambda result: result['source'])
+    report = {
+        'client': client,
+        'year': str(year),
+        'spec_name': spec_name,
+        'finished_at': str(datetime.now()),
+        'seconds': time.perf_counter() - start,
+        'files': len(files),
+        'succeeded': sum(result['status'] == 'ok' for result in results),
+        'failed': sum(result['status'] == 'error' for result in results),
+        'rows': sum(result.get('rows', 0) for result in results),
+        'results': results
+    }
+
+    report_path = paths.get('years', 'batch_report', create=True, year=year)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=4)
+
+    return report
+
+
+def print_progress(done: int, total: int, result: dict) -> None:
+    """
+    Prints one line per finished file.
+    """
+    name = os.path.basename(result['source'])
+    if result['status'] == 'ok':
+        print(f"✅ [{done}/{total}] {name}: {result['rows']:,} rows in {result['seconds']:.1f}s")
+    else:
+        print(f"❌ [{done}/{total}] {name}: {result['error']}")
+
+
+if __name__ == "__main__":
+    # Usage: python -m lib.batch_import CLIENT YEAR SPEC_NAME SOURCE [SOURCE ...] [--workers N]
+    parser = argparse.ArgumentParser(description="Import files in parallel using a named spec.")
+    parser.add_argument("client")
+    parser.add_argument("year")
+    parser.add_argument("spec_name")
+    parser.add_argument("sources", nargs="+", help="Files, directories or glob patterns")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    report = batch_import(args.client, args.year, args.spec_name, args.sources,
+                          workers=args.workers, progress=print_progress)
+    print(f"Imported {report['succeeded']} of {report['files']} files "
+          f"({report['rows']:,} rows) in {report['seconds']:.1f}s, {report['failed']} failed")
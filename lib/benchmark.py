@@ -0,0 +1,585 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from .config import CONFIG
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Cases run on each generated dataset; import runs once per source format
+CASES = ('import', 'add_col', 'filter_rows', 'remove_duplicates', 'merge_csv', 'add_checkpoint', 'set_active_df')
+
+SHAPES = ('narrow', 'wide')
+CARDINALITIES = ('low', 'high')
+FORMATS = ('delimited', 'fixed_width')
+
+# Distinct keys and labels in low-cardinality datasets
+LOW_DISTINCT = 100
+
+# Extra columns of wide datasets, cycling through integers, floats and text
+WIDE_EXTRA = 36
+
+# Rows generated at a time; each block has its own seed, so the data depends only
+# on the seed and the row count
+GENERATE_ROWS = 1_000_000
+
+# Field widths of the fixed-width sources
+FIELD_WIDTHS = {'int': 12, 'float': 16, 'text': 14, 'date': 10, 'flag': 1}
+
+# Differences smaller than these are noise, never regressions
+MIN_SECONDS = 0.01
+MIN_MEMORY_BYTES = 16 * 1024 ** 2
+
+
+def column_kinds(shape: str) -> dict:
+    """
+    Returns the columns of a generated dataset and the kind of values in each.
+    """
+    kinds = {
+        'id': 'int',
+        'key': 'int',
+        'amount': 'float',
+        'category': 'text',
+        'date': 'date',
+        'flag': 'flag',
+        'note': 'text',
+    }
+    if shape == 'wide':
+        for i in range(WIDE_EXTRA):
+            kinds[f'col{i}'] = ('int', 'float', 'text')[i % 3]
+
+    return kinds
+
+
+def generate_frame(rows: int, shape: str = 'narrow', cardinality: str = 'low', seed: int = 0,
+                   start: int = 0) -> pd.DataFrame:
+    """
+    Generates a block of deterministic synthetic data with mixed types: unique
+    ids, a join key, amounts, categories, dates as text, Y/N flags, notes with
+    missing values and, for wide data, more numeric and text columns.
+
+    Parameters
+    ------------
+    rows: int
+        Rows to generate.
+    shape: str
+        'narrow' for 7 columns or 'wide' for 43.
+    cardinality: str
+        'low' for few distinct keys and labels, 'high' for about one per two rows.
+    seed: int
+        Seed for the data.
+    start: int
+        Position of the block's first row in the dataset.
+
+    Returns
+    ------------
+    pd.DataFrame: The rows.
+    """
+    rng = np.random.default_rng([seed, start])
+    distinct = LOW_DISTINCT if cardinality == 'low' else max((start + rows) // 2, 1)
+
+    data = {}
+    for name, kind in column_kinds(shape).items():
+        if name == 'id':
+            values = np.arange(start, start + rows, dtype=np.int64)
+        elif kind == 'int':
+            values = rng.integers(0, distinct, rows)
+        elif kind == 'float':
+            values = np.round(rng.normal(0, 1000, rows), 2)
+        elif kind == 'date':
+            days = rng.integers(0, 3650, rows)
+            values = (np.datetime64('2015-01-01') + days).astype(str)
+        elif kind == 'flag':
+            values = np.where(rng.random(rows) < 0.5, 'Y', 'N')
+        else:
+            labels = rng.integers(0, distinct, rows)
+            values = pd.Series(labels).map(lambda label: f"{name[:3]}{label:09d}").to_numpy(dtype=object)
+            if name == 'note':
+                values[rng.random(rows) < 0.1] = None
+        data[name] = values
+
+    return pd.DataFrame(data, index=pd.RangeIndex(start, start + rows))
+
+
+def write_source(path: str, rows: int, shape: str = 'narrow', cardinality: str = 'low',
+                 source_format: str = 'delimited', seed: int = 0) -> dict:
+    """
+    Writes a generated dataset as a source file, a block at a time so any size
+    fits in memory.
+
+    Parameters
+    ------------
+    path: str
+        The file to write.
+    rows: int
+        Rows in the dataset.
+    shape: str
+        'narrow' or 'wide'.
+    cardinality: str
+        'low' or 'high'.
+    source_format: str
+        'delimited' for CSV with a header, or 'fixed_width'.
+    seed: int
+        Seed for the data.
+
+    Returns
+    ------------
+    dict: Import specs that read the file.
+    """
+    kinds = column_kinds(shape)
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        for start in range(0, rows, GENERATE_ROWS):
+            df = generate_frame(min(GENERATE_ROWS, rows - start), shape, cardinality, seed, start)
+            if source_format == 'delimited':
+                df.to_csv(f, index=False, header=start == 0)
+            else:
+                fields = [df[name].astype(object).where(df[name].notna(), '').astype(str).str.rjust(FIELD_WIDTHS[kind])
+                          for name, kind in kinds.items()]
+                lines = fields[0].str.cat(fields[1:])
+                f.write("\n".join(lines) + "\n")
+
+    os.replace(tmp_path, path)
+
+    if source_format == 'delimited':
+        return {'delimited': True, 'delimiter': ',', 'contains_headers': True, 'utf8_encoding': True}
+
+    columns = []
+    offset = 0
+    for name, kind in kinds.items():
+        columns.append({'name': name, 'start': offset, 'end': offset + FIELD_WIDTHS[kind]})
+        offset += FIELD_WIDTHS[kind]
+
+    return {'delimited': False, 'fixed_width_columns': columns, 'contains_headers': False, 'utf8_encoding': True}
+
+
+class MemorySampler:
+    """
+    Samples the process's resident memory in a background thread while a block
+    runs, to find how far it rose above where it started.
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.start = None
+        self.peak = None
+        self.running = False
+        self.thread = None
+
+    def __enter__(self) -> "MemorySampler":
+        self.start = self.peak = current_rss()
+        if self.start is not None:
+            self.running = True
+            self.thread = threading.Thread(target=self._sample, daemon=True)
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.peak = max(self.peak, current_rss())
+
+    @property
+    def growth(self):
+        """
+        Bytes the memory rose above its level at the start, or None where it
+        can't be read.
+        """
+        return None if self.start is None else self.peak - self.start
+
+    def _sample(self) -> None:
+        while self.running:
+            self.peak = max(self.peak, current_rss())
+            time.sleep(self.interval)
+
+
+def current_rss():
+    """
+    Returns the process's resident memory in bytes, or None where it can't be read.
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def measure(operation, repeat: int) -> dict:
+    """
+    Runs an operation several times and keeps the median time and the largest
+    memory growth.
+    """
+    runs = []
+    memory = []
+    for _ in range(repeat):
+        with MemorySampler() as sampler:
+            start = time.perf_counter()
+            operation()
+            runs.append(time.perf_counter() - start)
+        memory.append(sampler.growth)
+
+    return {
+        'seconds': statistics.median(runs),
+        'runs': runs,
+        'peak_memory_bytes': None if None in memory else max(memory)
+    }
+
+
+def run_dataset(rows: int, shape: str, cardinality: str, repeat: int, work_dir: str, seed: int = 0) -> list:
+    """
+    Benchmarks every case on one generated dataset, in a fresh data folder. Meant
+    to run in its own process, so earlier datasets don't skew the memory figures.
+    Datasets with more than CONFIG['benchmark']['in_memory_rows'] rows run out of
+    core.
+
+    Parameters
+    ------------
+    rows: int
+        Rows in the dataset.
+    shape: str
+        'narrow' or 'wide'.
+    cardinality: str
+        'low' or 'high'.
+    repeat: int
+        Runs per case; the median time is kept.
+    work_dir: str
+        Folder for generated sources, which are kept for later runs, and the
+        benchmark's client data, which is removed afterwards.
+    seed: int
+        Seed for the data.
+
+    Returns
+    ------------
+    list[dict]: One result per case.
+    """
+    # Imported here so the data folder is set before anything is stored
+    from .clean_data import CleanData
+    from .import_engine import read_source, apply_specs, stream_import
+
+    source_dir = os.path.join(work_dir, 'sources')
+    data_dir = os.path.join(work_dir, f'data_{os.getpid()}') + os.sep
+    os.makedirs(source_dir, exist_ok=True)
+    CONFIG['paths']['data'] = data_dir
+    CONFIG['instrument']['enabled'] = False
+
+    out_of_core = rows > CONFIG['benchmark']['in_memory_rows']
+    name = f"{rows}_{shape}_{cardinality}_{seed}"
+    results = []
+
+    def result(case, source_format, timing, rows_in, nbytes=None):
+        entry = {
+            'case': case,
+            'rows': rows,
+            'shape': shape,
+            'cardinality': cardinality,
+            'format': source_format,
+            'out_of_core': out_of_core,
+            'rows_in': rows_in,
+            'rows_per_second': rows_in / timing['seconds'] if timing['seconds'] else None,
+            **timing
+        }
+        if nbytes is not None:
+            entry['bytes_in'] = nbytes
+            entry['bytes_per_second'] = nbytes / timing['seconds'] if timing['seconds'] else None
+        results.append(entry)
+
+    try:
+        sources = {}
+        for source_format in FORMATS:
+            extension = 'csv' if source_format == 'delimited' else 'txt'
+            path = os.path.join(source_dir, f"{name}.{extension}")
+            specs_path = f"{path}.json"
+            if not os.path.exists(path) or not os.path.exists(specs_path):
+                specs = write_source(path, rows, shape, cardinality, source_format, seed)
+                with open(specs_path, 'w') as f:
+                    json.dump(specs, f)
+            with open(specs_path) as f:
+                sources[source_format] = (path, json.load(f))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            for source_format, (path, specs) in sources.items():
+                if out_of_core:
+                    target = os.path.join(data_dir, 'import.parquet')
+                    os.makedirs(data_dir, exist_ok=True)
+                    timing = measure(lambda: stream_import(path, specs, target), repeat)
+                else:
+                    timing = measure(lambda: apply_specs(read_source(path, specs), specs), repeat)
+                result('import', source_format, timing, rows, os.path.getsize(path))
+
+            path, specs = sources['delimited']
+            with CleanData('benchmark', name, out_of_core=out_of_core) as cleaner:
+                distinct = LOW_DISTINCT if cardinality == 'low' else max(rows // 2, 1)
+                lookup = pd.DataFrame({'key': np.arange(distinct), 'label': np.arange(distinct) % 7})
+                cleaner.load_df(path, df_new=lookup)
+                lookup_id = cleaner.path_id
+
+                if out_of_core:
+                    cleaner.load_df(path, specs=specs)
+                else:
+                    cleaner.load_df(path, df_new=apply_specs(read_source(path, specs), specs))
+                cleaner.flush()
+                main_id = cleaner.path_id
+
+                cases = [
+                    ('add_col', lambda: cleaner.add_col('amount2', '[amount] * 2 + [key]')),
+                    ('filter_rows', lambda: cleaner.filter_rows([('amount', '>', 0)])),
+                    ('remove_duplicates', lambda: cleaner.remove_duplicates(['key', 'category'])),
+                    ('merge_csv', lambda: cleaner.merge_csv(lookup_id, ['key'])),
+                ]
+
+                for _ in range(repeat):
+                    # Each run starts again from the raw data, discarding the last run's changes
+                    cleaner.mark_clean()
+                    cleaner.set_active_df(main_id, 0)
+                    for case, operation in cases:
+                        rows_in = len(cleaner.df)
+                        timing = measure(operation, 1)
+                        result(case, None, timing, rows_in)
+
+                    rows_in = len(cleaner.df)
+                    timing = measure(lambda: (cleaner.add_checkpoint('benchmark'), cleaner.flush()), 1)
+                    result('add_checkpoint', None, timing, rows_in)
+
+                    checkpoint = cleaner.df_id
+                    cleaner.cache.clear()
+                    cleaner.set_active_df(main_id, 0)
+                    cleaner.cache.clear()
+                    timing = measure(lambda: cleaner.set_active_df(main_id, checkpoint), 1)
+                    result('set_active_df', None, timing, rows_in)
+
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    return merge_runs(results)
+
+
+def merge_runs(results: list) -> list:
+    """
+    Combines the single runs of a case into one result with the median time.
+    """
+    merged = {}
+    for entry in results:
+        key = result_key(entry)
+        if key not in merged:
+            merged[key] = dict(entry, runs=list(entry['runs']), memory=[entry['peak_memory_bytes']])
+            continue
+        merged[key]['runs'] += entry['runs']
+        merged[key]['memory'].append(entry['peak_memory_bytes'])
+
+    for entry in merged.values():
+        memory = entry.pop('memory')
+        entry['seconds'] = statistics.median(entry['runs'])
+        entry['peak_memory_bytes'] = None if None in memory else max(memory)
+        if entry['seconds']:
+            entry['rows_per_second'] = entry['rows_in'] / entry['seconds']
+            if 'bytes_in' in entry:
+                entry['bytes_per_second'] = entry['bytes_in'] / entry['seconds']
+
+    return list(merged.values())
+
+
+def run_benchmarks(scales: list = None, shapes: list = None, cardinalities: list = None, repeat: int = None,
+                   seed: int = 0, progress=None) -> dict:
+    """
+    Benchmarks import, cleaning operations and checkpoints on generated datasets
+    of every combination of size, shape and cardinality. Datasets run one after
+    another, each in a fresh process.
+
+    Parameters
+    ------------
+    scales: list[int]
+        Rows per dataset, defaulting to CONFIG['benchmark']['scales'].
+    shapes: list[str]
+        'narrow' and/or 'wide'.
+    cardinalities: list[str]
+        'low' and/or 'high'.
+    repeat: int
+        Runs per case, defaulting to CONFIG['benchmark']['repeat'].
+    seed: int
+        Seed for the data.
+    progress: callable
+        Called with (done, total, results) as each dataset finishes.
+
+    Returns
+    ------------
+    dict: The environment and one result per case and dataset.
+    """
+    scales = scales or CONFIG['benchmark']['scales']
+    shapes = shapes or SHAPES
+    cardinalities = cardinalities or CARDINALITIES
+    repeat = repeat or CONFIG['benchmark']['repeat']
+    work_dir = os.path.abspath(CONFIG['benchmark']['work_dir'])
+
+    datasets = [(rows, shape, cardinality) for rows in scales for shape in shapes for cardinality in cardinalities]
+    results = []
+
+    for done, (rows, shape, cardinality) in enumerate(datasets, start=1):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            dataset_results = executor.submit(run_dataset, rows, shape, cardinality, repeat, work_dir, seed).result()
+        results += dataset_results
+        if progress:
+            progress(done, len(datasets), dataset_results)
+
+    return {
+        'finished_at': str(datetime.now()),
+        'environment': environment(),
+        'repeat': repeat,
+        'seed': seed,
+        'results': results
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float = None) -> list:
+    """
+    Finds the cases that got slower or used more memory than in a baseline run.
+    Changes below MIN_SECONDS or MIN_MEMORY_BYTES are ignored as noise.
+
+    Parameters
+    ------------
+    report: dict
+        Results from run_benchmarks.
+    baseline: dict
+        Earlier results to compare against.
+    tolerance: float
+        Allowed growth as a fraction, defaulting to CONFIG['benchmark']['tolerance'].
+
+    Returns
+    ------------
+    list[dict]: One entry per regression, with the case, the metric and both values.
+    """
+    tolerance = CONFIG['benchmark']['tolerance'] if tolerance is None else tolerance
+    earlier = {result_key(entry): entry for entry in baseline['results']}
+
+    regressions = []
+    for entry in report['results']:
+        before = earlier.get(result_key(entry))
+        if before is None:
+            continue
+
+        for metric, floor in (('seconds', MIN_SECONDS), ('peak_memory_bytes', MIN_MEMORY_BYTES)):
+            old, new = before.get(metric), entry.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append({
+                    'case': describe(entry),
+                    'metric': metric,
+                    'baseline': old,
+                    'current': new,
+                    'change': new / old - 1 if old else None
+                })
+
+    return regressions
+
+
+def result_key(entry: dict) -> tuple:
+    """
+    Identifies a result by its case and dataset.
+    """
+    return entry['case'], entry['rows'], entry['shape'], entry['cardinality'], entry.get('format')
+
+
+def describe(entry: dict) -> str:
+    """
+    Names a result's case and dataset for reports.
+    """
+    parts = [entry['case'], f"{entry['rows']:,} rows", entry['shape'], f"{entry['cardinality']} cardinality"]
+    if entry.get('format'):
+        parts.append(entry['format'])
+    return ", ".join(parts)
+
+
+def environment() -> dict:
+    """
+    Returns the versions and machine the benchmarks ran on.
+    """
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'pyarrow': pa.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count()
+    }
+
+
+def print_progress(done: int, total: int, results: list) -> None:
+    """
+    Prints the results of each finished dataset.
+    """
+    print(f"✅ [{done}/{total}] {results[0]['rows']:,} rows, {results[0]['shape']}, "
+          f"{results[0]['cardinality']} cardinality")
+    for entry in results:
+        memory = entry['peak_memory_bytes']
+        memory = f"{memory / 1024 ** 2:8.1f} MB" if memory is not None else "       n/a"
+        name = entry['case'] + (f" ({entry['format']})" if entry.get('format') else "")
+        print(f"   {name:<26} {entry['seconds']:9.4f}s {entry['rows_per_second'] or 0:14,.0f} rows/s {memory}")
+
+
+if __name__ == "__main__":
+    # Usage: python -m lib.benchmark run [--scales 10000 1e6] [--output FILE] [--baseline FILE]
+    #        python -m lib.benchmark compare RESULTS BASELINE [--tolerance 0.15]
+    parser = argparse.ArgumentParser(description="Benchmark import, cleaning operations and checkpoints.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks and save the results.")
+    run_parser.add_argument("--scales", nargs="+", type=lambda value: int(float(value)))
+    run_parser.add_argument("--shapes", nargs="+", choices=SHAPES)
+    run_parser.add_argument("--cardinality", nargs="+", choices=CARDINALITIES)
+    run_parser.add_argument("--repeat", type=int)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", default=CONFIG['benchmark']['results'])
+    run_parser.add_argument("--baseline", help="Compare against these results and fail on regressions.")
+    run_parser.add_argument("--tolerance", type=float)
+
+    compare_parser = commands.add_parser("compare", help="Compare saved results against a baseline.")
+    compare_parser.add_argument("results")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("--tolerance", type=float)
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run_benchmarks(args.scales, args.shapes, args.cardinality, args.repeat, args.seed,
+                                progress=print_progress)
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"✅ Saved {len(report['results'])} results to {args.output}")
+        baseline_path = args.baseline
+    else:
+        with open(args.results) as f:
+            report = json.load(f)
+        baseline_path = args.baseline
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"❌ {regression['case']}: {regression['metric']} {regression['baseline']:,.4g} -> "
+                  f"{regression['current']:,.4g} (+{regression['change']:.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No regressions against {baseline_path}")
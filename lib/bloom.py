@@ -0,0 +1,145 @@
+import math
+import numpy as np
+import pandas as pd
+
+# Smallest filter per row group, in bits
+MIN_BITS = 64
+
+
+def bloom_keys(values) -> tuple:
+    """
+    Hashes the non-missing values of a text or integer column for a Bloom filter.
+    Integers of any width hash alike, as do text stored as strings or categories,
+    so a filter value hashes the same as the stored value it equals.
+
+    Parameters
+    ------------
+    values: array-like
+        The values to hash.
+
+    Returns
+    ------------
+    tuple: The uint64 hash and row position of each non-missing value, or None
+    for other kinds of data.
+    """
+    series = pd.Series(values, copy=False).reset_index(drop=True)
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Hash each category once and spread the hashes by code
+        category_keys = bloom_keys(series.cat.categories)
+        if category_keys is None:
+            return None
+        codes = series.cat.codes.to_numpy()
+        positions = np.flatnonzero(codes >= 0)
+        return category_keys[0][codes[positions]], positions
+
+    series = series.dropna()
+    kind = pd.api.types.infer_dtype(series, skipna=True)
+
+    try:
+        if kind == 'integer':
+            keys = series.to_numpy(dtype=np.int64)
+        elif kind == 'string':
+            keys = series.to_numpy(dtype=object)
+        else:
+            return None
+    except (OverflowError, TypeError, ValueError):
+        return None
+
+    return pd.util.hash_array(keys, categorize=False), series.index.to_numpy()
+
+
+def build_bloom(values, group_rows: int, bits_per_value: int) -> dict:
+    """
+    Builds one Bloom filter per row group of a column, sized for the number of
+    distinct values in the fullest group.
+
+    Parameters
+    ------------
+    values: array-like
+        The column, in stored row order.
+    group_rows: int
+        Rows per row group.
+    bits_per_value: int
+        Filter bits per distinct value; 10 gives about 1% false positives.
+
+    Returns
+    ------------
+    dict: The packed filter 'bits' with one row per group, the number of
+    'hashes' per value and the 'group_rows' they cover, or None when the column
+    cannot be filtered this way.
+    """
+    keys = bloom_keys(values)
+    if keys is None:
+        return None
+
+    hashes, positions = keys
+    groups = positions // group_rows
+    n_groups = max(-(-len(values) // group_rows), 1)
+    bounds = np.searchsorted(groups, np.arange(n_groups + 1))
+
+    group_hashes = [pd.unique(hashes[bounds[g]:bounds[g + 1]]) for g in range(n_groups)]
+    distinct = max(len(unique) for unique in group_hashes)
+    n_bits = max(-(-distinct * bits_per_value // MIN_BITS) * MIN_BITS, MIN_BITS)
+    n_hashes = max(round(bits_per_value * math.log(2)), 1)
+
+    bits = np.zeros((n_groups, n_bits // 8), dtype=np.uint8)
+    for g, unique in enumerate(group_hashes):
+        group_bits = np.zeros(n_bits, dtype=bool)
+        group_bits[_bit_positions(unique, n_bits, n_hashes)] = True
+        bits[g] = np.packbits(group_bits)
+
+    return {
+        'bits': bits,
+        'hashes': n_hashes,
+        'group_rows': group_rows
+    }
+
+
+def bloom_contains(bloom: dict, values: list) -> np.ndarray:
+    """
+    Checks which row groups may hold any of the values. A False is certain; a
+    True may be a false positive.
+
+    Parameters
+    ------------
+    bloom: dict
+        The column's filters, from build_bloom.
+    values: list
+        The values looked for.
+
+    Returns
+    ------------
+    np.ndarray: One boolean per row group.
+    """
+    n_groups = len(bloom['bits'])
+    values = list(values)
+
+    # Missing values aren't in the filter, and `in` filters can match them
+    if any(pd.isna(value) for value in values if np.ndim(value) == 0):
+        return np.ones(n_groups, dtype=bool)
+
+    keys = bloom_keys(pd.Series(values, dtype=object).infer_objects())
+    if keys is None:
+        return np.ones(n_groups, dtype=bool)
+
+    if not len(keys[0]):
+        return np.zeros(n_groups, dtype=bool)
+
+    n_bits = bloom['bits'].shape[1] * 8
+    positions = _bit_positions(keys[0], n_bits, int(bloom['hashes']))
+
+    # A value may be in a group only if all of its bits are set there
+    found = (bloom['bits'][:, positions // 8] >> (7 - positions % 8).astype(np.uint8)) & 1
+    return found.all(axis=1).any(axis=1)
+
+
+def _bit_positions(hashes: np.ndarray, n_bits: int, n_hashes: int) -> np.ndarray:
+    """
+    Derives the filter bits of each hash by double hashing, one row per hash
+    function.
+    """
+    first = hashes & np.uint64(0xFFFFFFFF)
+    second = (hashes >> np.uint64(32)) | np.uint64(1)
+    steps = np.arange(n_hashes, dtype=np.uint64)[:, None]
+    return ((first[None] + steps * second[None]) % np.uint64(n_bits)).astype(np.int64)
@@ -0,0 +1,203 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+
+class VersionCatalog:
+    """
+    SQLite catalog of the datasets and versions saved for a client and year.
+
+    Adding a dataset or a version is a single indexed insert, so saving no longer
+    rewrites the whole history the way metadata.json did.
+    """
+
+    def __init__(self, db_path: str) -> None:
+        """
+        Opens the catalog, creating its tables if needed.
+
+        Parameters
+        ------------
+        db_path: str
+            Path of the SQLite database file.
+        """
+        self.db_path = db_path
+        self.lock = threading.Lock()
+
+        # Shared between the UI thread and the checkpoint writer, guarded by the lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS datasets (
+                path_id TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                metadata TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS versions (
+                path_id TEXT NOT NULL REFERENCES datasets(path_id),
+                df_id INTEGER NOT NULL,
+                entry TEXT NOT NULL,
+                PRIMARY KEY (path_id, df_id)
+            );
+            CREATE INDEX IF NOT EXISTS datasets_position ON datasets (position);
+        """)
+        self.conn.commit()
+
+    def add_dataset(self, path_id: str, metadata: dict) -> None:
+        """
+        Records a new dataset.
+
+        Parameters
+        ------------
+        path_id: str
+            Unique identifier for the dataset.
+        metadata: dict
+            The dataset's source metadata.
+        """
+        # A dataset recorded again keeps its place; new ones go after the last,
+        # found through the position index rather than by counting every row
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO datasets (path_id, position, metadata) "
+                "VALUES (?, COALESCE((SELECT position FROM datasets WHERE path_id = ?), "
+                "(SELECT COALESCE(MAX(position) + 1, 0) FROM datasets)), ?)",
+                (path_id, path_id, json.dumps(metadata))
+            )
+
+    def add_version(self, path_id: str, df_id: int, entry: dict) -> None:
+        """
+        Records a version of a dataset.
+
+        Parameters
+        ------------
+        path_id: str
+            Unique identifier for the dataset.
+        df_id: int
+            The index of the version in the dataset's history.
+        entry: dict
+            The history entry describing the version.
+        """
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO versions (path_id, df_id, entry) VALUES (?, ?, ?)",
+                (path_id, df_id, json.dumps(entry))
+            )
+
+    def get_version(self, path_id: str, df_id: int) -> dict:
+        """
+        Looks up a single version.
+
+        Parameters
+        ------------
+        path_id: str
+            Unique identifier for the dataset.
+        df_id: int
+            The index of the version in the dataset's history.
+
+        Returns
+        ------------
+        dict: The history entry, or None if it is not in the catalog.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT entry FROM versions WHERE path_id = ? AND df_id = ?",
+                (path_id, df_id)
+            ).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def set_state(self, **values) -> None:
+        """
+        Records session values such as the active dataset and version.
+        """
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in values.items()]
+            )
+
+    def get_state(self) -> dict:
+        """
+        Returns the recorded session values.
+        """
+        with self.lock:
+            rows = self.conn.execute("SELECT key, value FROM state").fetchall()
+
+        return {key: json.loads(value) for key, value in rows}
+
+    def load_df_list(self) -> dict:
+        """
+        Returns every dataset with its history, in the shape ManageData keeps in memory.
+        """
+        with self.lock:
+            datasets = self.conn.execute(
+                "SELECT path_id, metadata FROM datasets ORDER BY position"
+            ).fetchall()
+            versions = self.conn.execute(
+                "SELECT path_id, entry FROM versions ORDER BY path_id, df_id"
+            ).fetchall()
+
+        df_list = {
+            path_id: {'metadata': json.loads(metadata), 'history': []}
+            for path_id, metadata in datasets
+        }
+        for path_id, entry in versions:
+            df_list[path_id]['history'].append(json.loads(entry))
+
+        return df_list
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        with self.lock:
+            self.conn.close()
+
+
+def migrate_metadata(json_path: str, db_path: str) -> VersionCatalog:
+    """
+    Converts a metadata.json file into a catalog database. The JSON file is kept,
+    renamed with a .migrated suffix, so the migration only runs once.
+
+    Parameters
+    ------------
+    json_path: str
+        Path of the metadata.json file to convert.
+    db_path: str
+        Path of the SQLite database to create.
+
+    Returns
+    ------------
+    VersionCatalog: The populated catalog.
+    """
+    with open(json_path, "r") as f:
+        metadata = json.load(f)
+
+    catalog = VersionCatalog(db_path)
+
+    for path_id, dataset in metadata["df_list"].items():
+        catalog.add_dataset(path_id, dataset["metadata"])
+        for df_id, entry in enumerate(dataset["history"]):
+            catalog.add_version(path_id, df_id, entry)
+
+    catalog.set_state(path_id=metadata.get("path_id"),
+                      df_id=metadata.get("df_id"),
+                      last_saved=metadata.get("last_saved"))
+
+    os.replace(json_path, f"{json_path}.migrated")
+    print(f"🔄 Migrated {json_path} to {db_path}")
+
+    return catalog
+
+
+if __name__ == "__main__":
+    # Usage: python -m lib.catalog path/to/metadata.json [...]
+    for json_path in sys.argv[1:]:
+        db_path = os.path.join(os.path.dirname(json_path), "catalog.sqlite")
+        migrate_metadata(json_path, db_path).close()
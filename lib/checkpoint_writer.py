@@ -0,0 +1,142 @@
+import atexit
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+
+class CheckpointWriter:
+    """
+    Runs checkpoint and state writes on a single background thread.
+
+    Jobs run in the order they were submitted, so a version can always use the
+    version written before it as its base. Jobs submitted with the same key while
+    an earlier one is still waiting are coalesced into a single run of the latest
+    job, which moves to the back of the queue so it still runs after every job
+    submitted before it.
+    """
+
+    def __init__(self, max_pending: int = 8) -> None:
+        """
+        Starts the writer thread.
+
+        Parameters
+        ------------
+        max_pending: int
+            Maximum number of queued jobs before `submit` blocks the caller.
+        """
+        self.max_pending = max_pending
+        self._jobs = deque()
+        self._pending_keys = {}
+        self._running = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, fn, key: str = None, callback=None) -> Future:
+        """
+        Queues a write job.
+
+        Parameters
+        ------------
+        fn: callable
+            The job to run on the writer thread.
+        key: str
+            Jobs sharing a key are coalesced while the earlier one has not started.
+        callback: callable
+            Called with the job's Future once the job has finished. Runs on the
+            writer thread.
+
+        Returns
+        ------------
+        Future: Resolves with the job's return value once it is on disk.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Checkpoint writer is closed.")
+
+            if key is not None and key in self._pending_keys:
+                future = self._pending_keys[key]
+                # A state save must not land before the versions queued ahead of it
+                self._jobs = deque(job for job in self._jobs if job[2] is not future)
+                self._jobs.append((fn, key, future))
+            else:
+                while len(self._jobs) >= self.max_pending:
+                    self._cond.wait()
+
+                future = Future()
+                self._jobs.append((fn, key, future))
+                if key is not None:
+                    self._pending_keys[key] = future
+                self._cond.notify_all()
+
+        if callback:
+            future.add_done_callback(callback)
+
+        return future
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Blocks until every submitted job has finished.
+
+        Parameters
+        ------------
+        timeout: float
+            Maximum number of seconds to wait, or None to wait indefinitely.
+
+        Returns
+        ------------
+        bool: True if the queue was drained, False if the timeout expired.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._jobs and not self._running, timeout)
+
+    def pending(self) -> int:
+        """
+        Returns the number of jobs that have not finished yet.
+        """
+        with self._cond:
+            return len(self._jobs) + self._running
+
+    def close(self) -> None:
+        """
+        Writes everything still queued and stops the writer thread.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+
+        self._thread.join()
+        # The exit hook would otherwise keep this writer alive until exit
+        atexit.unregister(self.close)
+
+    def _run(self) -> None:
+        """
+        Writer loop: takes jobs off the queue and resolves their futures.
+        """
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._jobs or self._closed)
+                if not self._jobs:
+                    return
+
+                fn, key, future = self._jobs.popleft()
+                if key is not None:
+                    del self._pending_keys[key]
+                self._running += 1
+                self._cond.notify_all()
+
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn())
+                except Exception as e:
+                    print(f"❌ Error writing checkpoint: {e}")
+                    future.set_exception(e)
+
+            with self._cond:
+                self._running -= 1
+                self._cond.notify_all()
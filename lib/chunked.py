@@ -0,0 +1,454 @@
+import itertools
+import math
+import os
+import shutil
+import tempfile
+import uuid
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .config import CONFIG
+from .plan import optimize_plan, run_stage
+from .dedup import dedup_parquet
+from .join import outer_join
+from .parquet_io import table_to_pandas, filter_mask, row_group_may_match
+from .column_stats import sketch_column, merge_sketches, summarize
+
+# Plan stages that only look at the row they produce, so batches run independently
+STREAMED = ('filter', 'columns')
+
+# Decoded batches take several times their Parquet size in memory, counting the
+# copies made while transforming them
+EXPANSION = 4
+
+
+class ChunkedFrame:
+    """
+    Handle over a dataset kept in a Parquet file instead of memory. Rows are read
+    a batch at a time, sized to CONFIG['chunked']['memory_bytes'], and rows are
+    numbered by position.
+    """
+
+    def __init__(self, path: str, temporary: bool = False) -> None:
+        """
+        Opens the file's metadata; no rows are read.
+
+        Parameters
+        ------------
+        path: str
+            The Parquet file.
+        temporary: bool
+            The file holds an intermediate result no version refers to, and is
+            removed once it is replaced.
+        """
+        metadata = pq.read_metadata(path)
+
+        self.path = path
+        self.temporary = temporary
+        self.schema = pq.read_schema(path)
+        self.group_rows = [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+        self.column_bytes = {}
+        for i in range(metadata.num_row_groups):
+            group = metadata.row_group(i)
+            for j in range(group.num_columns):
+                name = group.column(j).path_in_schema
+                self.column_bytes[name] = self.column_bytes.get(name, 0) + group.column(j).total_uncompressed_size
+
+    def __len__(self) -> int:
+        return sum(self.group_rows)
+
+    @property
+    def columns(self) -> pd.Index:
+        return pd.Index(self.schema.names)
+
+    @property
+    def shape(self) -> tuple:
+        return len(self), len(self.schema.names)
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0 or not len(self.schema.names)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Size of the data once decoded, as recorded in the file.
+        """
+        return sum(self.column_bytes.values())
+
+    def batch_rows(self) -> int:
+        """
+        Returns the number of rows read at a time to stay within the memory budget.
+        """
+        row_bytes = max(self.nbytes / max(len(self), 1), 1)
+        return max(int(CONFIG['chunked']['memory_bytes'] // (row_bytes * EXPANSION)), 1024)
+
+    def iter_batches(self, columns: list = None, filters: list = None, batch_rows: int = None):
+        """
+        Reads the rows a batch at a time.
+
+        Parameters
+        ------------
+        columns: list[str]
+            Columns to read, or None for all of them.
+        filters: list[tuple]
+            Row filters as (column, operator, value) tuples that must all hold.
+            Row groups whose statistics rule out a match are skipped.
+        batch_rows: int
+            Rows per batch, defaulting to what fits in the memory budget.
+
+        Returns
+        ------------
+        iterator of pd.DataFrame: The batches, indexed by row position when
+        unfiltered.
+        """
+        parquet = pq.ParquetFile(self.path, memory_map=True)
+        groups = list(range(len(self.group_rows)))
+        filters = filters or []
+        read_columns = None
+        if columns is not None:
+            read_columns = list(columns) + [col for col, _, _ in filters if col not in columns]
+
+        for col, op, value in filters:
+            position = self.schema.get_field_index(col)
+            if position < 0:
+                raise KeyError(f"Filter column not found: {col}")
+            groups = [g for g in groups if row_group_may_match(parquet.metadata.row_group(g), op, value, position)]
+
+        if not groups:
+            return
+
+        offset = 0
+        for batch in parquet.iter_batches(batch_size=batch_rows or self.batch_rows(),
+                                          row_groups=groups, columns=read_columns):
+            df = table_to_pandas(pa.Table.from_batches([batch]))
+            df.index = pd.RangeIndex(offset, offset + len(df))
+            offset += len(df)
+
+            if filters:
+                df = df[filter_mask(df, filters)]
+            yield df if columns is None else df[list(columns)]
+
+    def window(self, start: int = 0, stop: int = None) -> pd.DataFrame:
+        """
+        Reads a range of rows, decoding only the row groups holding them.
+
+        Parameters
+        ------------
+        start: int
+            Position of the first row.
+        stop: int
+            Position after the last row, defaulting to
+            CONFIG['chunked']['window_rows'] rows from the start.
+
+        Returns
+        ------------
+        pd.DataFrame: The rows, indexed by position.
+        """
+        stop = start + CONFIG['chunked']['window_rows'] if stop is None else stop
+        start, stop = max(start, 0), min(stop, len(self))
+
+        if start >= stop:
+            return table_to_pandas(self.schema.empty_table())
+
+        bounds = np.cumsum([0] + self.group_rows)
+        first = int(np.searchsorted(bounds, start, side='right')) - 1
+        last = int(np.searchsorted(bounds, stop, side='left'))
+
+        table = pq.ParquetFile(self.path, memory_map=True).read_row_groups(range(first, last))
+        df = table_to_pandas(table.slice(start - bounds[first], stop - start))
+        df.index = pd.RangeIndex(start, stop)
+
+        return df
+
+    def to_pandas(self) -> pd.DataFrame:
+        """
+        Reads every row into memory.
+        """
+        df = table_to_pandas(pq.read_table(self.path, memory_map=True))
+        df.index = pd.RangeIndex(len(df))
+        return df
+
+    def column_stats(self) -> dict:
+        """
+        Summarizes every column a batch at a time.
+
+        Returns
+        ------------
+        dict: Column names mapped to their statistics, from `column_stats.summarize`.
+        """
+        sketches = {name: sketch_column(pd.Series([], dtype=object)) for name in self.columns}
+        for batch in self.iter_batches():
+            for name in self.columns:
+                sketches[name] = merge_sketches([sketches[name], sketch_column(batch[name])])
+
+        return {name: summarize(sketch) for name, sketch in sketches.items()}
+
+    def filter(self, filters: list, target: str) -> "ChunkedFrame":
+        """
+        Writes the rows passing the filters to a new file.
+
+        Parameters
+        ------------
+        filters: list[tuple]
+            Row filters as (column, operator, value) tuples that must all hold.
+        target: str
+            The Parquet file to write.
+
+        Returns
+        ------------
+        ChunkedFrame: The filtered rows, as a temporary file.
+        """
+        return write_batches(self.iter_batches(filters=filters), target, self.schema)
+
+    def remove(self) -> None:
+        """
+        Deletes the file of a temporary result.
+        """
+        if self.temporary and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def write_batches(batches, target: str, schema: pa.Schema = None, temporary: bool = True) -> ChunkedFrame:
+    """
+    Writes dataframes one after another into a Parquet file, one or more row
+    groups each. Later batches are converted to the column types of the first.
+
+    Parameters
+    ------------
+    batches: iterable of pd.DataFrame
+        The rows to write.
+    target: str
+        The Parquet file to write.
+    schema: pyarrow.Schema
+        Columns of the file if there are no rows to write.
+    temporary: bool
+        Whether the file is an intermediate result, as for ChunkedFrame.
+
+    Returns
+    ------------
+    ChunkedFrame: The written file.
+    """
+    tmp_path = f"{target}.tmp"
+    writer = None
+    empty = None
+    rows = 0
+
+    try:
+        for batch in batches:
+            table = pa.Table.from_pandas(batch, preserve_index=False)
+            if not len(batch):
+                empty = table.schema if empty is None else empty
+                continue
+
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            elif not table.schema.equals(writer.schema):
+                try:
+                    table = table.select(writer.schema.names).cast(writer.schema)
+                except (KeyError, pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                    raise ValueError(f"Column types changed after row {rows}. ({e})")
+
+            writer.write_table(table)
+            rows += len(batch)
+
+        if writer is None:
+            empty = schema if empty is None else empty
+            if empty is None:
+                raise ValueError("No columns to write.")
+            pq.write_table(empty.empty_table(), tmp_path)
+        else:
+            writer.close()
+            writer = None
+        os.replace(tmp_path, target)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return ChunkedFrame(target, temporary=temporary)
+
+
+def execute_chunked(frame: ChunkedFrame, steps: list, load_dataset, directory: str) -> ChunkedFrame:
+    """
+    Runs recorded transformations on a dataset too large for memory, writing
+    each result to a new file. Consecutive filters and column additions stream
+    through in one pass, a batch at a time; duplicate removal and merges split
+    the data into hash partitions on disk that each fit in the memory budget.
+    Batches run on pandas whatever the configured backend.
+
+    Parameters
+    ------------
+    frame: ChunkedFrame
+        The data before the transformations.
+    steps: list[dict]
+        Transformations as recorded in history.
+    load_dataset: callable
+        Returns a stored version for merges, as for execute_plan.
+    directory: str
+        Where to write the results and spilled partitions.
+
+    Returns
+    ------------
+    ChunkedFrame: The transformed data, as a temporary file, or `frame` itself
+    when there is nothing to run.
+    """
+    stages = optimize_plan(steps)
+    current = frame
+
+    try:
+        i = 0
+        while i < len(stages):
+            target = os.path.join(directory, f"{uuid.uuid4()}.parquet")
+
+            if stages[i]['name'] in STREAMED:
+                run = []
+                while i < len(stages) and stages[i]['name'] in STREAMED:
+                    run.append(stages[i])
+                    i += 1
+                result = _stream_stages(current, run, load_dataset, target)
+
+            elif stages[i]['name'] == 'dedup':
+                stage = stages[i]
+                i += 1
+                subset = stage['subset'] or list(current.columns)
+                key_bytes = sum(current.column_bytes.get(col, 0) for col in subset)
+                dedup_parquet(current.path, target, subset, stage['keep'],
+                              partitions=_partitions(key_bytes), spill_dir=directory)
+                result = ChunkedFrame(target, temporary=True)
+
+            else:
+                stage = stages[i]
+                i += 1
+                right = load_dataset(stage['dataset'], stage['version'], stage['load_columns'])['df']
+                result = join_chunked(current, right, stage['columns'], target, directory)
+
+            if current is not frame:
+                current.remove()
+            current = result
+    except Exception:
+        if current is not frame:
+            current.remove()
+        raise
+
+    return current
+
+
+def join_chunked(frame: ChunkedFrame, right: pd.DataFrame, keys: list, target: str,
+                 spill_dir: str = None) -> ChunkedFrame:
+    """
+    Outer joins a dataset too large for memory with a dataframe, like
+    pd.merge(how="outer"). Both sides are split by a hash of their keys, the
+    dataset's partitions waiting on disk, and joined one partition at a time.
+    Rows come out sorted by key within each partition.
+
+    Parameters
+    ------------
+    frame: ChunkedFrame
+        The left side.
+    right: pd.DataFrame
+        The right side.
+    keys: list[str]
+        The join key columns.
+    target: str
+        The Parquet file to write.
+    spill_dir: str
+        Directory for the spilled partitions, defaulting to the system temp dir.
+
+    Returns
+    ------------
+    ChunkedFrame: The joined data, as a temporary file.
+    """
+    missing = [key for key in keys if key not in frame.columns or key not in right.columns]
+    if missing:
+        raise KeyError(f"Join keys not found: {missing}")
+
+    partitions = _partitions(frame.nbytes)
+    if partitions == 1:
+        return write_batches([outer_join(frame.to_pandas(), right, keys)], target)
+
+    right_part = key_partitions(right, keys, partitions)
+    spill = tempfile.mkdtemp(prefix="join_", dir=spill_dir)
+
+    try:
+        writers = {}
+        for batch in frame.iter_batches():
+            part = key_partitions(batch, keys, partitions)
+            for p in np.unique(part):
+                table = pa.Table.from_pandas(batch[part == p], preserve_index=False)
+                if p not in writers:
+                    writers[p] = pq.ParquetWriter(os.path.join(spill, f"{p}.parquet"), table.schema)
+                writers[p].write_table(table.cast(writers[p].schema))
+
+        for writer in writers.values():
+            writer.close()
+
+        def joined():
+            empty = table_to_pandas(frame.schema.empty_table())
+            yield outer_join(empty, right.iloc[:0], keys)
+            for p in range(partitions):
+                rows = right_part == p
+                if p not in writers and not rows.any():
+                    continue
+                left = table_to_pandas(pq.read_table(os.path.join(spill, f"{p}.parquet"))) \
+                    if p in writers else empty
+                yield outer_join(left, right[rows].reset_index(drop=True), keys)
+
+        return write_batches(joined(), target)
+    finally:
+        shutil.rmtree(spill, ignore_errors=True)
+
+
+def key_partitions(df: pd.DataFrame, keys: list, partitions: int) -> np.ndarray:
+    """
+    Assigns each row to a partition by a hash of its keys. Numbers are hashed as
+    floats and everything else by value, so equal keys stored with different
+    dtypes on two sides of a join, or as 0.0 and -0.0, land in the same partition.
+
+    Parameters
+    ------------
+    df: pd.DataFrame
+        The rows.
+    keys: list[str]
+        The key columns.
+    partitions: int
+        Number of partitions.
+
+    Returns
+    ------------
+    np.ndarray: The partition of each row.
+    """
+    normalized = {}
+    for key in keys:
+        values = df[key]
+        if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+            # Adding zero turns -0.0 into 0.0, which it equals
+            normalized[key] = values.to_numpy(dtype=np.float64, na_value=np.nan) + 0.0
+        else:
+            normalized[key] = values.astype(object).where(values.notna(), None).to_numpy()
+
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(normalized), index=False).to_numpy()
+    return (hashes % np.uint64(partitions)).astype(np.int64)
+
+
+def _stream_stages(frame: ChunkedFrame, stages: list, load_dataset, target: str) -> ChunkedFrame:
+    """
+    Runs row-local plan stages on each batch and writes the results.
+    """
+    def batches():
+        # An empty batch first, so the output has columns even without rows
+        for batch in itertools.chain([table_to_pandas(frame.schema.empty_table())], frame.iter_batches()):
+            for stage in stages:
+                batch = run_stage(batch, stage, load_dataset)
+            yield batch
+
+    return write_batches(batches(), target)
+
+
+def _partitions(nbytes: int) -> int:
+    """
+    Returns the number of hash partitions that keeps each within the memory budget.
+    """
+    return max(math.ceil(nbytes * EXPANSION / CONFIG['chunked']['memory_bytes']), 1)
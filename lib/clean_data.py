@@ -1,12 +1,24 @@
+import os
 import pandas as pd
+import pyarrow.parquet as pq
+from datetime import datetime
 from .manage_data import ManageData
+from .backends import get_backend
+from .version_cache import VersionCache
+from .parquet_io import FILTER_OPS
+from .import_engine import read_source, apply_specs
+from .chunked import ChunkedFrame, execute_chunked
+from .instrument import record_frame
+from .incremental import STATEFUL, IncrementalError, build_state, apply_incremental, concat_frames
+from .config import CONFIG
 
 class CleanData(ManageData):
     """
     Handles data cleaning and management for a given client and year.
     """
 
-    def __init__(self, client: str, year: str) -> None:
+    def __init__(self, client: str, year: str, lazy: bool = False, backend: str = None,
+                 out_of_core: bool = False) -> None:
         """
         Initializes CleanData with client and year, ensuring directory structure exists.
 
@@ -16,8 +28,147 @@ class CleanData(ManageData):
             The client name.
         year: str
             The year associated with the data.
+        lazy: bool
+            Record operations and run them together when the data is next used,
+            instead of applying each one immediately.
+        backend: str
+            Engine that runs the operations: pandas, polars or duckdb. Defaults to
+            the one configured for the client.
+        out_of_core: bool
+            Keep the active dataset in a Parquet file instead of memory and stream
+            operations through it, for data larger than RAM.
         """
-        super().__init__(client, year)
+        self.lazy = lazy
+        self.backend = get_backend(backend, client)
+        self.join_cache = VersionCache(CONFIG['join']['cache_bytes'])
+        self.plan = []
+        super().__init__(client, year, out_of_core=out_of_core)
+        self.instrument.caches.append(self.join_cache)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """
+        The active dataframe, with any pending lazy operations applied. Out of
+        core, a ChunkedFrame.
+        """
+        if self.plan:
+            self.collect()
+        return self._df
+
+    @df.setter
+    def df(self, value: pd.DataFrame) -> None:
+        # Replacing the data discards operations planned against the old data
+        self.plan = []
+        self._df = value
+
+    def collect(self, backend: str = None) -> pd.DataFrame:
+        """
+        Runs the pending lazy operations as one optimized plan. If the plan fails,
+        its operations are dropped from the transformations.
+
+        Parameters
+        ------------
+        backend: str
+            Engine to run this plan on, instead of the instance's backend.
+
+        Returns
+        ------------
+        pd.DataFrame: The active dataframe.
+        """
+        plan, self.plan = self.plan, []
+        if not plan:
+            return self._df
+
+        try:
+            engine = get_backend(backend) if backend else self.backend
+            with self.instrument.measure('Collected Plan', self._df, steps=len(plan)) as record:
+                self._df = self.execute(self._df, plan, engine)
+                record_frame(record, 'out', self._df)
+        except Exception as e:
+            print(f"❌ Error applying transformations: {e}")
+            pending = {id(step) for step in plan}
+            self.transformations = [t for t in self.transformations if id(t) not in pending]
+
+        return self._df
+
+    def load_join_table(self, path_id: str, df_index: int = None, columns: list = None) -> dict:
+        """
+        Returns a stored version for the right side of merges, keeping it with the
+        hash tables joins build on it so repeated merges reuse them.
+
+        Parameters
+        ------------
+        path_id: str
+            Unique identifier for the dataset.
+        df_index: int
+            The index of the version, or None for the latest.
+        columns: list[str]
+            Columns to load, or None for all of them.
+
+        Returns
+        ------------
+        dict: The version's 'df' and its hash tables by key in 'indexes'.
+        """
+        if df_index is None:
+            df_index = len(self.df_list[path_id]['history']) - 1
+
+        key = (path_id, df_index, tuple(columns) if columns else None)
+        table = self.join_cache.get(key)
+        if table is None:
+            with self.instrument.measure('Loaded Merge Table', dataset=path_id, version=df_index) as record:
+                table = {'df': self.load_version(path_id, df_index, columns=columns), 'indexes': {}}
+                record_frame(record, 'out', table['df'])
+            self.join_cache.put(key, table)
+
+        return table
+
+    def apply(self, steps: list) -> None:
+        """
+        Runs operations on the backend and adds them to the transformations. In
+        lazy mode they are only added to the pending plan.
+
+        Parameters
+        ------------
+        steps: list[dict]
+            The operations, in the form they are recorded in history.
+        """
+        if self.lazy:
+            self.plan.extend(steps)
+        else:
+            operation = ", ".join(step['name'] for step in steps)
+            with self.instrument.measure(operation, self._df, steps=len(steps)) as record:
+                self._df = self.execute(self._df, steps)
+                record_frame(record, 'out', self._df)
+
+        self.transformations.extend(steps)
+
+    def execute(self, df, steps: list, engine=None):
+        """
+        Runs operations on data in memory with a backend, or streams them through
+        new files when the data is out of core. Intermediate files the result
+        replaces are removed.
+
+        Parameters
+        ------------
+        df: pd.DataFrame or ChunkedFrame
+            The data before the operations.
+        steps: list[dict]
+            The operations, in the form they are recorded in history.
+        engine: Backend
+            Engine for data in memory, defaulting to the instance's backend.
+
+        Returns
+        ------------
+        pd.DataFrame or ChunkedFrame: The data after the operations.
+        """
+        if not isinstance(df, ChunkedFrame):
+            return (engine or self.backend).execute(df, steps, self.load_join_table)
+
+        result = execute_chunked(df, steps, self.load_join_table, self.chunked_path)
+        if result is not df:
+            df.remove()
+
+        return result
 
     def add_col(self, name: str, formula: str) -> None:
         """
@@ -30,57 +181,95 @@ class CleanData(ManageData):
         formula: str
             A formula to compute values for the new column.
         """
-        try:
-            # Replace brackets with proper pandas column references
-            formula = formula.replace("[", "").replace("]", "")
-            self.df[name] = pd.eval(formula, local_dict=self.df.to_dict("series"))
+        self.add_cols({name: formula})
 
-            trans_dict = {
+    def add_cols(self, formulas: dict) -> None:
+        """
+        Adds several formula columns in a single pass over the data. Each formula
+        may use the columns defined before it.
+
+        Parameters
+        ------------
+        formulas: dict
+            New column names mapped to their formulas, with columns written as
+            [column name].
+        """
+        try:
+            steps = [{
                 'name': 'Added Column',
                 'column_name': name,
                 'formula': formula
-            }
-            self.transformations.append(trans_dict)
+            } for name, formula in formulas.items()]
+            self.apply(steps)
 
         except Exception as e:
             print(f"❌ Error applying formula: {e}")
 
-    def filter_rows(self, filter_dict: dict) -> None:
+    def filter_rows(self, filter_dict) -> None:
         """
         Filters rows based on user-defined conditions.
 
         Parameters
         ------------
-        filter_dict: dict
-            Dictionary where keys are column names and values are filter expressions.
+        filter_dict: dict or list[tuple]
+            Dictionary where keys are column names and values are filter expressions,
+            or structured (column, operator, value) predicates such as
+            [('state', '==', 'CA'), ('amount', '>', 100)]. Structured predicates
+            are evaluated without parsing and, when versions are loaded with
+            them, skip the row groups on disk that can't match.
         """
         try:
-            query_list = [f"{col} {expr}" for col, expr in filter_dict.items()]
-            query_string = " & ".join(query_list)
-            self.df = self.df.query(query_string)
-
-            trans_dict = {
-                'name': 'Filtered Rows',
-                'filters': filter_dict
-            }
-            self.transformations.append(trans_dict)
+            if isinstance(filter_dict, dict):
+                trans_dict = {
+                    'name': 'Filtered Rows',
+                    'filters': filter_dict
+                }
+            else:
+                for _, op, _ in filter_dict:
+                    if op not in FILTER_OPS:
+                        raise ValueError(f"Unsupported filter operator: {op}")
+                trans_dict = {
+                    'name': 'Filtered Rows',
+                    'predicates': [list(predicate) for predicate in filter_dict]
+                }
+            self.apply([trans_dict])
 
         except Exception as e:
             print(f"❌ Error filtering data: {e}")
 
-    def remove_duplicates(self) -> None:
+    def remove_duplicates(self, subset: list = None, keep: str = 'first') -> int:
         """
         Removes duplicate rows from the active DataFrame.
+
+        Parameters
+        ------------
+        subset: list[str]
+            Columns that identify a duplicate, or None to compare whole rows.
+        keep: str
+            Which duplicate to keep: 'first', 'last' or 'none' to drop them all.
+
+        Returns
+        ------------
+        int: The number of rows removed, or None in lazy mode.
         """
-        if self.df is not None:
-            self.df.drop_duplicates(inplace=True)
+        if self._df is not None:
+            rows = len(self._df)
+            try:
+                trans_dict = {'name': 'Removed Duplicates', 'subset': subset, 'keep': keep}
+                self.apply([trans_dict])
+            except Exception as e:
+                print(f"❌ Error removing duplicates: {e}")
+                return None
 
-            trans_dict = {'name': 'Removed Duplicates'}
-            self.transformations.append(trans_dict)
+            if not self.lazy:
+                removed = rows - len(self._df)
+                print(f"🧹 Removed {removed:,} duplicate rows")
+                return removed
 
-    def merge_csv(self, df_index: str, merge_columns: list) -> None:
+    def merge_csv(self, df_index: str, merge_columns: list, columns: list = None) -> None:
         """
-        Merges the active DataFrame with another DataFrame from the stored history.
+        Merges the active DataFrame with the latest version of another stored
+        dataset.
 
         Parameters
         ------------
@@ -88,18 +277,233 @@ class CleanData(ManageData):
             The identifier of the stored DataFrame to merge with.
         merge_columns: list[str]
             List of columns on which to perform the merge.
+        columns: list[str]
+            Columns to bring in from the other dataset besides the merge columns,
+            or None for all of them. Only these are read from disk.
         """
         if df_index not in self.df_list:
             print(f"❌ Error: No dataset found with ID {df_index}")
             return
 
-        # Load the historical DataFrame
-        merge_df = self.df_list[df_index]["history"][-1]["data"]
+        load_columns = None
+        if columns is not None:
+            load_columns = list(merge_columns) + [col for col in columns if col not in merge_columns]
 
         try:
-            self.df = pd.merge(self.df, merge_df, on=merge_columns, how="outer")
-            trans_dict = {'name': 'Merged DataFrame', 'columns': merge_columns}
-            self.transformations.append(trans_dict)
+            trans_dict = {
+                'name': 'Merged DataFrame',
+                'dataset': df_index,
+                'version': len(self.df_list[df_index]['history']) - 1,
+                'columns': merge_columns,
+                'load_columns': load_columns
+            }
+            self.apply([trans_dict])
 
         except Exception as e:
-            print(f"❌ Error merging datasets: {e}")
\ No newline at end of file
+            print(f"❌ Error merging datasets: {e}")
+
+    def append_rows(self, path: str, df_new: pd.DataFrame = None, specs: dict = None) -> None:
+        """
+        Adds the rows of a supplemental file to the active dataset and cleans only
+        those rows with its transformations. The cleaned rows are stored as new
+        blobs after the existing ones, and the keys seen by duplicate removal and
+        merges are kept with the checkpoint so the next append can skip the
+        replay. When a transformation can't be applied to the new rows alone, the
+        whole dataset is cleaned again. Rows whose columns differ from those the
+        dataset was loaded with can't be cleaned the same way, and are added to
+        the cleaned rows as they are.
+
+        Parameters
+        ------------
+        path: str
+            The file the rows come from.
+        df_new: pd.DataFrame
+            The raw rows read from the file, or None to read them here using `specs`.
+        specs: dict
+            The import specs used to read the file.
+        """
+        if self.df is None:
+            print("❌ Error: No active dataset to append to")
+            return
+
+        if self.out_of_core:
+            print("❌ Error: Appending rows isn't supported for out-of-core datasets")
+            return
+
+        if df_new is None and specs is None:
+            raise ValueError("Either df_new or the import specs are required.")
+
+        if df_new is None:
+            df_new = apply_specs(read_source(path, specs), specs)
+
+        if self.is_dirty():
+            self.add_checkpoint()
+        self.flush()
+
+        history = self.df_list[self.path_id]['history']
+        steps = list(self.transformations)
+        info = self.incremental_info(self.path_id, self.df_id)
+
+        if {str(col) for col in df_new.columns} != set(self.raw_columns(info)):
+            print(f"⚠️ The columns of {path} don't match the dataset's; adding its rows without cleaning them")
+            self.df = pd.concat([self.df, df_new], ignore_index=True)
+            return
+
+        # Label the new raw rows after the existing ones, as if they had been loaded together
+        raw = df_new.reset_index(drop=True)
+        raw.index = pd.RangeIndex(info['raw_rows'], info['raw_rows'] + len(raw))
+
+        state = {}
+        for i, step in enumerate(steps):
+            saved = info['state'].get(str(i))
+            if step['name'] in STATEFUL and saved is not None and saved['step'] == step:
+                state[i] = self.store.read_keys(saved['keys'])
+
+        with self.instrument.measure('Appended Rows', self.df, source=path) as record:
+            try:
+                if any(step['name'] in STATEFUL and i not in state for i, step in enumerate(steps)):
+                    print("🔄 Rebuilding the keys seen by duplicate removal and merges")
+                    state = build_state(self.raw_rows(info), steps, self.load_join_table)
+
+                drop, rows, state = apply_incremental(self.df, raw, steps, state, self.load_join_table)
+                version = self.version
+                if drop.any():
+                    version = self.store.write_version(self.df[~drop], base=version, changed=set())
+                version = self.store.append_rows(version, self.align_rows(rows, version['df']))
+
+            except IncrementalError as e:
+                print(f"⚠️ {e}; cleaning the whole dataset again")
+                full = self.backend.execute(concat_frames([self.raw_rows(info), raw]), steps, self.load_join_table)
+                version = self.store.write_version(full, base=self.version)
+                rows, state = full.iloc[0:0], {}
+
+            incremental = {
+                'raw': info['raw'] + [self.store.write_version(raw)['manifest']],
+                'raw_rows': info['raw_rows'] + len(raw),
+                'state': {str(i): {'step': steps[i], 'keys': self.store.write_keys(keys)}
+                          for i, keys in state.items()}
+            }
+            record_frame(record, 'out', version['df'])
+
+        df_current = {
+            'comment': f"appended {len(raw):,} rows",
+            'timestamp': str(datetime.now()),
+            'parent': self.df_id,
+            'manifest': None,
+            'transformations': steps,
+            'incremental': incremental,
+            'metrics': self.instrument.take()
+        }
+
+        with self.state_lock:
+            history.append(df_current)
+            version_key = (self.path_id, len(history) - 1)
+        self.version = self.queue_version(version_key, df_current, version['df'], stored=version)
+
+        self.df_id = version_key[1]
+        self.df = version['df'].copy(deep=False)
+        self.redo_stack = []
+        self.mark_clean()
+        self.save_state()
+
+        print(f"✅ Appended {len(raw):,} rows from {path}, {len(self.df):,} rows after cleaning")
+
+    def incremental_info(self, path_id: str, df_index: int) -> dict:
+        """
+        Returns the appended raw rows and saved key state of a version, from the
+        nearest append among its ancestors.
+
+        Parameters
+        ------------
+        path_id: str
+            Unique identifier for the dataset.
+        df_index: int
+            The index of the version.
+
+        Returns
+        ------------
+        dict: Manifests of the appended raw rows in 'raw', the number of raw rows
+        in 'raw_rows', the raw version's 'root' index and the saved key 'state'.
+        """
+        history = self.df_list[path_id]['history']
+
+        index = df_index
+        info = None
+        while index is not None:
+            if info is None and 'incremental' in history[index]:
+                info = history[index]['incremental']
+            root = index
+            index = self.get_parent(path_id, index)
+
+        if info is None:
+            rows = len(self.load_version(path_id, root, columns=[]))
+            info = {'raw': [], 'raw_rows': rows, 'state': {}}
+
+        return dict(info, root=root)
+
+    def raw_columns(self, info: dict) -> list:
+        """
+        Returns the columns of the rows the active dataset was loaded with,
+        without loading them.
+
+        Parameters
+        ------------
+        info: dict
+            The dataset's appends, from incremental_info.
+
+        Returns
+        ------------
+        list[str]: The column names.
+        """
+        entry = self.df_list[self.path_id]['history'][info['root']]
+        if 'data_path' in entry:
+            names = pq.read_schema(os.path.join(self.data_path, entry['data_path'])).names
+            return [name for name in names if not name.startswith('__index_level_')]
+        return [column['name'] for column in entry['manifest']['columns']]
+
+    def raw_rows(self, info: dict) -> pd.DataFrame:
+        """
+        Loads every raw row of the active dataset: the rows it was loaded with and
+        those appended since.
+
+        Parameters
+        ------------
+        info: dict
+            The dataset's appends, from incremental_info.
+
+        Returns
+        ------------
+        pd.DataFrame: The raw rows.
+        """
+        frames = [self.get_version(self.path_id, info['root'])['df']]
+        frames += [self.store.read_version(manifest)['df'] for manifest in info['raw']]
+        return concat_frames(frames)
+
+    @staticmethod
+    def align_rows(rows: pd.DataFrame, existing: pd.DataFrame) -> pd.DataFrame:
+        """
+        Orders new rows' columns like the existing rows, converts them to the
+        existing types where possible, and relabels rows whose index label is
+        already taken.
+        """
+        missing = [col for col in existing.columns if col not in rows.columns]
+        extra = [col for col in rows.columns if col not in existing.columns]
+        if missing or extra:
+            raise ValueError(f"Appended rows don't match the dataset's columns: "
+                             f"missing {missing}, unexpected {extra}")
+
+        rows = rows[list(existing.columns)].copy(deep=False)
+        for col in rows.columns:
+            dtype = existing[col].dtype
+            if rows[col].dtype != dtype and not isinstance(dtype, pd.CategoricalDtype):
+                try:
+                    rows[col] = rows[col].astype(dtype)
+                except (TypeError, ValueError):
+                    pass
+
+        if rows.index.isin(existing.index).any() and pd.api.types.is_integer_dtype(existing.index):
+            start = int(existing.index.max()) + 1 if len(existing) else 0
+            rows.index = pd.RangeIndex(start, start + len(rows), name=existing.index.name)
+
+        return rows
+
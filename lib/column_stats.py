@@ -0,0 +1,227 @@
+import base64
+import json
+import math
+import numpy as np
+import pandas as pd
+
+# HyperLogLog registers are 2**HLL_PRECISION bytes per column, for a distinct
+# count within about 1.6%
+HLL_PRECISION = 12
+
+# Values kept in the quantile sketch of numeric columns: the 0th to 100th percentiles
+SKETCH_POINTS = 101
+
+# Quantiles reported in the statistics
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+def sketch_column(values) -> dict:
+    """
+    Summarizes a column in one pass: row and missing counts, min and max,
+    HyperLogLog registers for the distinct count and, for numeric columns, a
+    quantile sketch. Sketches of separate parts of a column combine with
+    `merge_sketches`.
+
+    Parameters
+    ------------
+    values: array-like
+        The column.
+
+    Returns
+    ------------
+    dict: The sketch, with 'registers' and 'points' as numpy arrays.
+    """
+    series = pd.Series(values, copy=False).reset_index(drop=True)
+    present = series.dropna()
+
+    sketch = {
+        'count': len(series),
+        'nulls': len(series) - len(present),
+        'min': None,
+        'max': None,
+        'registers': _hll_registers(pd.util.hash_pandas_object(present, index=False).to_numpy()),
+        'points': None
+    }
+    if not len(present):
+        return sketch
+
+    numeric = pd.api.types.is_numeric_dtype(present.dtype) and not pd.api.types.is_bool_dtype(present.dtype)
+    try:
+        if isinstance(present.dtype, pd.CategoricalDtype):
+            used = present.cat.remove_unused_categories()
+            if present.cat.ordered:
+                sketch['min'], sketch['max'] = used.min(), used.max()
+            else:
+                sketch['min'], sketch['max'] = min(used.cat.categories), max(used.cat.categories)
+        else:
+            sketch['min'], sketch['max'] = present.min(), present.max()
+    except TypeError:
+        # Mixed types that can't be ordered
+        pass
+
+    if numeric:
+        numbers = present.to_numpy(dtype=np.float64)
+        numbers = numbers[np.isfinite(numbers)]
+        if len(numbers):
+            sketch['points'] = np.quantile(numbers, np.linspace(0, 1, SKETCH_POINTS))
+
+    sketch['min'], sketch['max'] = _plain(sketch['min']), _plain(sketch['max'])
+    return sketch
+
+
+def merge_sketches(sketches: list) -> dict:
+    """
+    Combines the sketches of parts of a column, such as row groups or appended
+    rows, into the sketch of the whole column. Counts, bounds and distinct
+    counts combine exactly; quantiles to within the sketches' resolution.
+
+    Parameters
+    ------------
+    sketches: list[dict]
+        Sketches from `sketch_column` or `merge_sketches`.
+
+    Returns
+    ------------
+    dict: The combined sketch.
+    """
+    merged = {
+        'count': sum(sketch['count'] for sketch in sketches),
+        'nulls': sum(sketch['nulls'] for sketch in sketches),
+        'min': None,
+        'max': None,
+        'registers': np.maximum.reduce([sketch['registers'] for sketch in sketches]),
+        'points': None
+    }
+
+    for bound, pick in (('min', min), ('max', max)):
+        values = [sketch[bound] for sketch in sketches if sketch[bound] is not None]
+        try:
+            merged[bound] = pick(values) if values else None
+        except TypeError:
+            merged[bound] = None
+
+    parts = [(sketch['points'], sketch['count'] - sketch['nulls'])
+             for sketch in sketches if sketch['points'] is not None]
+    if len(parts) == 1:
+        merged['points'] = parts[0][0]
+    elif parts:
+        # The share of values below x is the row-weighted mean of each part's
+        # share, interpolated between its points; the merged points invert it
+        grid = np.unique(np.concatenate([part for part, _ in parts]))
+        total = sum(rows for _, rows in parts)
+        shares = sum(np.interp(grid, part, np.linspace(0, 1, len(part))) * rows / total for part, rows in parts)
+        merged['points'] = np.interp(np.linspace(0, 1, SKETCH_POINTS), shares, grid)
+
+    return merged
+
+
+def summarize(sketch: dict) -> dict:
+    """
+    Returns the statistics described by a sketch.
+
+    Parameters
+    ------------
+    sketch: dict
+        A sketch from `sketch_column` or `merge_sketches`.
+
+    Returns
+    ------------
+    dict: 'count' of rows, 'nulls', 'min', 'max', approximate 'distinct' values
+    and, for numeric columns, approximate 'quantiles' keyed by fraction.
+    """
+    summary = {
+        'count': int(sketch['count']),
+        'nulls': int(sketch['nulls']),
+        'min': sketch['min'],
+        'max': sketch['max'],
+        'distinct': min(_hll_estimate(sketch['registers']), int(sketch['count'] - sketch['nulls']))
+    }
+    if sketch['points'] is not None:
+        positions = np.linspace(0, 1, len(sketch['points']))
+        summary['quantiles'] = {str(q): float(np.interp(q, positions, sketch['points'])) for q in QUANTILES}
+
+    return summary
+
+
+def dumps_sketch(sketch: dict) -> str:
+    """
+    Serializes a sketch to JSON.
+    """
+    return json.dumps(dict(
+        sketch,
+        registers=base64.b64encode(sketch['registers'].tobytes()).decode('ascii'),
+        points=None if sketch['points'] is None else sketch['points'].tolist()
+    ))
+
+
+def loads_sketch(text: str) -> dict:
+    """
+    Reads a sketch serialized with `dumps_sketch`.
+    """
+    sketch = json.loads(text)
+    sketch['registers'] = np.frombuffer(base64.b64decode(sketch['registers']), dtype=np.uint8).copy()
+    if sketch['points'] is not None:
+        sketch['points'] = np.asarray(sketch['points'], dtype=np.float64)
+    return sketch
+
+
+def _hll_registers(hashes: np.ndarray) -> np.ndarray:
+    """
+    Builds HyperLogLog registers from 64-bit hashes: the first HLL_PRECISION bits
+    pick a register, which keeps the longest run of leading zeros seen in the rest.
+    """
+    registers = np.zeros(2 ** HLL_PRECISION, dtype=np.uint8)
+    if not len(hashes):
+        return registers
+
+    hashes = hashes.astype(np.uint64, copy=False)
+    buckets = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.int64)
+    rest = hashes << np.uint64(HLL_PRECISION)
+
+    # Position of the first set bit, found a byte at a time
+    rank = np.full(len(hashes), 64 - HLL_PRECISION + 1, dtype=np.uint8)
+    bits = 64 - HLL_PRECISION
+    for shift in range(0, bits, 8):
+        byte = ((rest << np.uint64(shift)) >> np.uint64(56)).astype(np.uint8)
+        first = _LEADING_ZEROS[byte] + shift + 1
+        unset = rank > bits
+        found = unset & (byte > 0)
+        rank[found] = np.minimum(first[found], bits + 1)
+
+    np.maximum.at(registers, buckets, rank)
+    return registers
+
+
+def _hll_estimate(registers: np.ndarray) -> int:
+    """
+    Estimates the number of distinct hashes behind a set of registers, counting
+    empty registers instead for small sets.
+    """
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+
+    empty = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and empty:
+        estimate = m * math.log(m / empty)
+
+    return int(round(estimate))
+
+
+def _plain(value):
+    """
+    Converts a numpy or pandas scalar to a value that can be saved as JSON.
+    """
+    if value is None or (np.ndim(value) == 0 and pd.isna(value)):
+        return None
+    if isinstance(value, (pd.Timestamp, pd.Timedelta, np.datetime64, np.timedelta64)):
+        return str(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+# Leading zero bits of every byte value
+_LEADING_ZEROS = np.array([8] + [7 - int(math.log2(b)) for b in range(1, 256)], dtype=np.uint8)
@@ -1,6 +1,96 @@
 import os
 ROOT = './'
 
+CONFIG = {
+    'paths': {
+        # Prefix for the client/year folders managed by ManageData
+        'data': 'data',
+    },
+    'cache': {
+        # Memory budget for loaded versions kept for fast switching
+        'max_bytes': 512 * 1024 ** 2,
+    },
+    'import': {
+        # Rows read per chunk when streaming a file into Parquet
+        'chunk_rows': 100_000,
+        # Bytes parsed per block by the fixed-width engine
+        'chunk_bytes': 64 * 1024 ** 2,
+        # Values checked before trying to parse a fixed-width field as a number
+        'infer_sample_rows': 1_000,
+        # Files at least this large are streamed instead of parsed in one go
+        'streaming_min_bytes': 64 * 1024 ** 2,
+        # Rows and bytes read from the start of a file for the import preview
+        'preview_rows': 1_000,
+        'preview_bytes': 1024 ** 2,
+        # Rows sampled from the rest of the file for the preview
+        'preview_sample_rows': 200,
+        # Text columns with at most this share of distinct values become categorical
+        'category_ratio': 0.5,
+    },
+    'store': {
+        # Rows per row group in column blobs; filters skip whole row groups
+        'row_group_rows': 64 * 1024,
+        # Write a Bloom filter per row group of text and integer columns, so
+        # equality filters can skip row groups whose value range would match
+        'bloom_filters': True,
+        'bloom_bits_per_value': 10,
+        # Save count, missing values, min/max, distinct count and quantiles of
+        # each column with every checkpoint
+        'column_stats': True,
+    },
+    'expressions': {
+        # Rows evaluated per chunk by the formula engine
+        'chunk_rows': 64 * 1024,
+        # Compiled formulas kept for reuse
+        'cache_size': 256,
+    },
+    'dedup': {
+        # Hash partitions spilled to disk when deduplicating files too large for memory
+        'partitions': 64,
+        # Rows read per batch while partitioning
+        'batch_rows': 1_000_000,
+    },
+    'join': {
+        # Memory budget for stored versions and hash tables kept for repeated merges
+        'cache_bytes': 256 * 1024 ** 2,
+        # Joins with more rows than this on both sides are split into hash partitions
+        'partition_rows': 5_000_000,
+        'partitions': 16,
+    },
+    'chunked': {
+        # Memory budget for out-of-core datasets; batches and the hash partitions
+        # of duplicate removal and merges are sized to fit in it
+        'memory_bytes': 1024 ** 3,
+        # Rows read at a time for display
+        'window_rows': 1_000,
+    },
+    'instrument': {
+        # Record the time, memory, rows and cache hits of each operation, saved
+        # with the next checkpoint
+        'enabled': True,
+    },
+    'benchmark': {
+        # Rows in the generated datasets
+        'scales': [10 ** 4, 10 ** 5, 10 ** 6],
+        # Runs per case; the median time is reported
+        'repeat': 3,
+        # Larger datasets are cleaned out of core
+        'in_memory_rows': 10 ** 7,
+        # Slowdown or memory growth, as a fraction of the baseline, reported as a regression
+        'tolerance': 0.15,
+        # Generated sources, kept between runs, and scratch client data
+        'work_dir': 'benchmarks/work/',
+        # Default file for the results
+        'results': 'benchmarks/results.json',
+    },
+    'backend': {
+        # Engine that runs cleaning operations: pandas, polars or duckdb
+        'default': 'pandas',
+        # Per-client overrides of the default engine
+        'clients': {},
+    },
+}
+
 class ClientPath:
     
     def __init__(self, client):
@@ -25,11 +115,14 @@ class ClientPath:
             },
             'named_specs': {
                 'specs': os.path.join(self.client_root, 'named_specs', spec_name, 'specs.json'),
+                'pipeline': os.path.join(self.client_root, 'named_specs', spec_name, 'pipeline.json'),
             },
             'years': {
                 'root': os.path.join(self.years_root, year),
                 'data': os.path.join(self.years_root, year, 'parsed_data.parquet'),
                 'metadata': os.path.join(self.years_root, year, 'metadata.json'),
+                'batch_report': os.path.join(self.years_root, year, 'batch_report.json'),
+                'replay_report': os.path.join(self.years_root, year, 'replay_report.json'),
             }
         }
 
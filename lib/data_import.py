@@ -1,10 +1,13 @@
 import json
 import os
 from PyQt6.QtWidgets import (
-    QApplication, QVBoxLayout, QPushButton, QLabel, QDialog, QFileDialog,
+    QApplication, QVBoxLayout, QPushButton, QLabel, QDialog,
     QRadioButton, QCheckBox, QHBoxLayout, QTextEdit, QWidget, QTabWidget, QFormLayout, QLineEdit
 )
-import pandas as pd
+from .config import CONFIG
+from .import_engine import (
+    read_source, apply_specs, stream_import, sniff_specs, preview_source, optimize_dtypes
+)
 
 class DataImport(QDialog):
     def __init__(self, paths, path: str, name=None, spec_file=None):
@@ -13,7 +16,7 @@ class DataImport(QDialog):
         self.paths = paths
 
         self.path = path
-        if self.name:
+        if name:
             self.name = name
         else:
             self.name = os.path.splitext(os.path.basename(path))[0]
@@ -23,6 +26,7 @@ class DataImport(QDialog):
 
         self.layout = QVBoxLayout()
         self.dataframe = None
+        self.dtypes = None
 
         self.spec_widgets = {
             'delimited': QRadioButton("Delimited (CSV, TSV, etc.)"),
@@ -30,12 +34,20 @@ class DataImport(QDialog):
             'contains_headers': QCheckBox("File contains headers"),
             'trim_spaces': QCheckBox("Trim leading/trailing spaces"),
             'utf8_encoding': QCheckBox("Use UTF-8 encoding"),
+            'lowercase': QCheckBox("Convert text to lowercase"),
+            'empty_to_null': QCheckBox("Treat empty text as missing"),
+            'optimize_dtypes': QCheckBox("Use compact column types"),
             'columns': {}
         }
         if spec_file:
             self.default_specs = self.load_specs(spec_file)
         else:
             self.default_specs = self.get_default_specs()
+            # Only reads the start of the file
+            self.default_specs.update(sniff_specs(path))
+
+        # Column types saved with the specs let repeat imports skip inference
+        self.dtypes = self.default_specs.get('dtypes')
 
         navigation = self.create_navigation_buttons()
 
@@ -76,7 +88,8 @@ class DataImport(QDialog):
         layout = QVBoxLayout()
         layout.addWidget(QLabel(f"Importing: {self.path}"))
 
-        curr_step_widgets = ['delimited', 'fixed_width', 'contains_headers', 'trim_spaces', 'utf8_encoding']
+        curr_step_widgets = ['delimited', 'fixed_width', 'contains_headers', 'trim_spaces', 'utf8_encoding',
+                             'lowercase', 'empty_to_null', 'optimize_dtypes']
 
         for widget in curr_step_widgets:
             layout.addWidget(self.spec_widgets[widget])
@@ -94,29 +107,54 @@ class DataImport(QDialog):
         self.spec_widgets['contains_headers'].setChecked(self.default_specs['contains_headers'])
         self.spec_widgets['trim_spaces'].setChecked(self.default_specs['trim_spaces'])
         self.spec_widgets['utf8_encoding'].setChecked(self.default_specs['utf8_encoding'])
+        self.spec_widgets['lowercase'].setChecked(self.default_specs.get('lowercase', False))
+        self.spec_widgets['empty_to_null'].setChecked(self.default_specs.get('empty_to_null', False))
+        self.spec_widgets['optimize_dtypes'].setChecked(self.default_specs.get('optimize_dtypes', False))
         
-    def import_data(self):
-        """Reads file based on user selections and returns a DataFrame."""
+    def preview_data(self):
+        """Parses the start of the file plus a sample from across it for the preview."""
         specs = self.get_current_specs()
 
-        import_type = "Delimited" if specs['delimited'] else "Fixed Width"
-        use_headers = 0 if specs['contains_headers'] else None
-        encoding = "utf-8" if specs['utf8_encoding'] else None
+        try:
+            # Columns are chosen after the preview, so keep all of them here
+            df = preview_source(self.path, specs, sample_rows=CONFIG['import']['preview_sample_rows'])
+            self.dataframe = apply_specs(df, dict(specs, columns={}))
+        except Exception as e:
+            print(f"Error previewing file: {e}")
+
+    def import_data(self):
+        """Reads the whole file based on user selections, once the specs are confirmed."""
+        specs = self.get_current_specs()
+        choose_dtypes = specs['optimize_dtypes'] and not specs['dtypes']
+
+        if self.is_streaming():
+            # Large files are streamed straight to Parquet by save_data, so column
+            # types are chosen from the preview rows
+            if choose_dtypes and self.dataframe is not None:
+                selected = [col for col, (include, _) in specs['columns'].items() if include]
+                _, self.dtypes, _ = optimize_dtypes(self.dataframe[selected])
+            return
 
         try:
-            if import_type == "Delimited":
-                df = pd.read_csv(self.path, delimiter=None, header=use_headers, encoding=encoding)
-            else:
-                df = pd.read_fwf(self.path, header=use_headers, encoding=encoding)
+            df = read_source(self.path, specs)
+            df = apply_specs(df, specs)
 
-            if specs['trim_spaces']:
-                df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
+            if choose_dtypes:
+                df, dtypes, report = optimize_dtypes(df)
+                # Specs refer to columns by their names in the source file
+                source_names = {mapping: col for col, (include, mapping) in specs['columns'].items()}
+                self.dtypes = {source_names.get(col, col): dtype for col, dtype in dtypes.items()}
+                print(f"Memory use reduced from {report['before_bytes']:,} to {report['after_bytes']:,} bytes")
 
             self.dataframe = df
             print(df.head())
         except Exception as e:
             print(f"Error importing file: {e}")
 
+    def is_streaming(self):
+        """Whether the file is large enough to be streamed instead of parsed in one go."""
+        return os.path.getsize(self.path) >= CONFIG['import']['streaming_min_bytes']
+
     def step_2_data_preview(self):
         """Step 2: Data Preview."""
         if self.tab_count < 2:
@@ -130,7 +168,8 @@ class DataImport(QDialog):
 
             if self.dataframe is not None:
                 preview_text = self.dataframe.head().to_string(index=False)
-                self.data_preview.setText(preview_text)
+                dtypes_text = self.dataframe.dtypes.to_string()
+                self.data_preview.setText(f"{preview_text}\n\nColumn types:\n{dtypes_text}")
             else:
                 self.data_preview.setText("No data loaded.")
 
@@ -183,28 +222,14 @@ class DataImport(QDialog):
 
             self.tab_count += 1
 
-    def apply_column_selection(self):
-        """Applies column selection and renaming based on user input."""
-        selected_columns = []
-        renamed_columns = {}
-
-        # Loop through the column widgets to check selected columns and their new names
-        for col, (checkbox, rename_input) in self.spec_widgets['columns'].items():
-            if checkbox.isChecked():  # If the column is selected
-                selected_columns.append(col)
-                renamed_columns[col] = rename_input.text()  # Rename column if input is provided
-
-        # Apply selection and renaming
-        self.dataframe = self.dataframe[selected_columns].rename(columns=renamed_columns)
-
     def next_step(self):
         """Handles Next button click."""
 
         tab_ops = {
-            1: [self.import_data,
+            1: [self.preview_data,
                 self.step_2_data_preview],
             2: [self.step_3_column_selection],
-            3: [self.apply_column_selection,
+            3: [self.import_data,
                 self.save_specs,
                 self.save_data,
                 self.accept]
@@ -224,7 +249,7 @@ class DataImport(QDialog):
             self.tabs.setCurrentIndex(current_index - 1)  # Switch to the previous tab
 
     def get_dataframe(self):
-        """Returns the imported DataFrame."""
+        """Returns the imported DataFrame, or only the preview rows for streamed files."""
         return self.dataframe
 
     def save_specs(self):
@@ -255,18 +280,34 @@ class DataImport(QDialog):
 
         if path:
             try:
-                self.dataframe.to_parquet(path, index=False)
+                if self.is_streaming():
+                    self.stream_data(path)
+                else:
+                    self.dataframe.to_parquet(path, index=False)
                 print(f"Data saved to {path}")
             except Exception as e:
                 print(f"Error saving data: {e}")
 
+    def stream_data(self, path):
+        """Stream the source file into Parquet chunk by chunk using the current specs."""
+        summary = stream_import(self.path, self.get_current_specs(), path, progress=self.report_progress)
+        print(f"Imported {summary['rows']:,} rows in {summary['seconds']:.1f}s")
+
+    def report_progress(self, bytes_read, total_bytes, rows):
+        """Print streaming import progress."""
+        percent = 100 * bytes_read / total_bytes if total_bytes else 100
+        print(f"⏳ {percent:.0f}% ({bytes_read:,} of {total_bytes:,} bytes, {rows:,} rows)")
+
     def get_default_specs(self):
         return {
             'delimited': True,
             'fixed_width': False,
             'contains_headers': True,
             'trim_spaces': False,
-            'utf8_encoding': False
+            'utf8_encoding': False,
+            'lowercase': False,
+            'empty_to_null': False,
+            'optimize_dtypes': False
         }
     
     def get_current_specs(self):
@@ -286,6 +327,11 @@ class DataImport(QDialog):
             'contains_headers': self.spec_widgets['contains_headers'].isChecked(),
             'trim_spaces': self.spec_widgets['trim_spaces'].isChecked(),
             'utf8_encoding': self.spec_widgets['utf8_encoding'].isChecked(),
+            'lowercase': self.spec_widgets['lowercase'].isChecked(),
+            'empty_to_null': self.spec_widgets['empty_to_null'].isChecked(),
+            'optimize_dtypes': self.spec_widgets['optimize_dtypes'].isChecked(),
+            'delimiter': self.default_specs.get('delimiter'),
+            'dtypes': self.dtypes,
             'columns': col_dict
         }
     
@@ -0,0 +1,239 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .config import CONFIG
+
+# Keep policies and their pandas equivalents
+KEEP = {
+    'first': 'first',
+    'last': 'last',
+    'none': False,
+}
+
+# Position of each row in the source, kept alongside spilled keys
+ROW_NUMBER = "__row_number__"
+
+# Nullable pandas types for spilled keys, so a batch with missing values hashes
+# the same as one without
+NULLABLE_TYPES = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+    pa.uint8(): pd.UInt8Dtype(),
+    pa.uint16(): pd.UInt16Dtype(),
+    pa.uint32(): pd.UInt32Dtype(),
+    pa.uint64(): pd.UInt64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+    pa.float32(): pd.Float32Dtype(),
+    pa.float64(): pd.Float64Dtype(),
+    pa.string(): pd.StringDtype(),
+    pa.large_string(): pd.StringDtype(),
+}
+
+
+def row_hashes(df: pd.DataFrame, subset: list = None, stable: bool = True) -> np.ndarray:
+    """
+    Hashes each row's key columns to one 64-bit value.
+
+    Parameters
+    ------------
+    df: pd.DataFrame
+        The data to hash.
+    subset: list[str]
+        Key columns, or None for all of them.
+    stable: bool
+        Hash the values themselves, so the same row hashes the same in any frame.
+        Otherwise text columns are replaced by codes first, which is faster but
+        only consistent within this frame.
+
+    Returns
+    ------------
+    np.ndarray: One uint64 hash per row.
+    """
+    keys = df if subset is None else df[subset]
+
+    # -0.0 equals 0.0 but hashes differently, and adding zero turns it into 0.0
+    if any(pd.api.types.is_float_dtype(dtype) for dtype in keys.dtypes):
+        keys = pd.DataFrame({i: keys.iloc[:, i] + 0.0 if pd.api.types.is_float_dtype(keys.dtypes.iloc[i])
+                             else keys.iloc[:, i] for i in range(keys.shape[1])})
+
+    if not stable:
+        keys = pd.DataFrame({i: keys.iloc[:, i] if pd.api.types.is_numeric_dtype(keys.dtypes.iloc[i])
+                             else pd.factorize(keys.iloc[:, i])[0] for i in range(keys.shape[1])})
+
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+def duplicate_mask(df: pd.DataFrame, subset: list = None, keep: str = 'first') -> np.ndarray:
+    """
+    Finds duplicate rows by their hashes. Rows whose hash is unique cannot have
+    a duplicate, so only rows sharing a hash are compared by value, which also
+    guards against hash collisions.
+
+    Parameters
+    ------------
+    df: pd.DataFrame
+        The data to check.
+    subset: list[str]
+        Key columns, or None for all of them.
+    keep: str
+        Which duplicate survives: 'first', 'last' or 'none'.
+
+    Returns
+    ------------
+    np.ndarray: Boolean mask of the rows to drop.
+    """
+    if keep not in KEEP:
+        raise ValueError(f"Unsupported keep policy: {keep}")
+
+    keys = df if subset is None else df[subset]
+    codes, uniques = pd.factorize(row_hashes(keys, stable=False))
+
+    # Compare each row sharing a hash with the first row of that hash
+    first = np.empty(len(uniques), dtype=np.intp)
+    first[codes[::-1]] = np.arange(len(codes))[::-1]
+    candidates = np.flatnonzero(np.bincount(codes, minlength=len(uniques))[codes] > 1)
+
+    if _rows_equal(keys, candidates, first[codes[candidates]]):
+        return pd.Series(codes, copy=False).duplicated(keep=KEEP[keep]).to_numpy()
+
+    # A hash collision, so compare the candidates by value
+    mask = np.zeros(len(df), dtype=bool)
+    mask[candidates] = keys.iloc[candidates].duplicated(keep=KEEP[keep]).to_numpy()
+    return mask
+
+
+def drop_duplicate_rows(df: pd.DataFrame, subset: list = None, keep: str = 'first') -> pd.DataFrame:
+    """
+    Removes duplicate rows, like DataFrame.drop_duplicates but hashing the keys
+    instead of factorizing every column.
+
+    Parameters
+    ------------
+    df: pd.DataFrame
+        The data to deduplicate.
+    subset: list[str]
+        Key columns, or None for all of them.
+    keep: str
+        Which duplicate survives: 'first', 'last' or 'none'.
+
+    Returns
+    ------------
+    pd.DataFrame: The rows that were kept, in their original order.
+    """
+    mask = duplicate_mask(df, subset, keep)
+    return df[~mask] if mask.any() else df
+
+
+def dedup_parquet(source: str, target: str, subset: list = None, keep: str = 'first',
+                  partitions: int = None, spill_dir: str = None) -> dict:
+    """
+    Removes duplicate rows from a Parquet file too large to load at once. Key
+    columns are spilled to disk in partitions by row hash, so every duplicate
+    group lands in one partition and each partition fits in memory. The rows that
+    survive are then copied from the source in their original order.
+
+    Parameters
+    ------------
+    source: str
+        The Parquet file to deduplicate.
+    target: str
+        Where to write the result.
+    subset: list[str]
+        Key columns, or None for all of them.
+    keep: str
+        Which duplicate survives: 'first', 'last' or 'none'.
+    partitions: int
+        Number of hash partitions, defaulting to CONFIG['dedup']['partitions'].
+    spill_dir: str
+        Directory for the spilled partitions, defaulting to the system temp dir.
+
+    Returns
+    ------------
+    dict: Row counts before and after, and the number removed.
+    """
+    if keep not in KEEP:
+        raise ValueError(f"Unsupported keep policy: {keep}")
+
+    partitions = partitions or CONFIG['dedup']['partitions']
+    batch_rows = CONFIG['dedup']['batch_rows']
+    parquet = pq.ParquetFile(source)
+    total = parquet.metadata.num_rows
+    subset = subset or parquet.schema_arrow.names
+
+    spill = tempfile.mkdtemp(prefix="dedup_", dir=spill_dir)
+    try:
+        # Spill the key columns of each row to its hash partition
+        writers = {}
+        offset = 0
+        for batch in parquet.iter_batches(batch_size=batch_rows, columns=subset):
+            keys = batch.to_pandas(types_mapper=NULLABLE_TYPES.get)
+            keys[ROW_NUMBER] = np.arange(offset, offset + len(keys))
+            offset += len(keys)
+
+            part = row_hashes(keys, subset) % partitions
+            for p in np.unique(part):
+                table = pa.Table.from_pandas(keys[part == p], preserve_index=False)
+                if p not in writers:
+                    writers[p] = pq.ParquetWriter(os.path.join(spill, f"{p}.parquet"), table.schema)
+                writers[p].write_table(table)
+
+        for writer in writers.values():
+            writer.close()
+
+        # Mark the rows to drop, one partition in memory at a time
+        drop = np.zeros(total, dtype=bool)
+        for p in writers:
+            keys = pq.read_table(os.path.join(spill, f"{p}.parquet")).to_pandas(types_mapper=NULLABLE_TYPES.get)
+            mask = duplicate_mask(keys, subset, keep)
+            drop[keys[ROW_NUMBER].to_numpy()[mask]] = True
+
+        # Copy the surviving rows in source order
+        tmp_path = f"{target}.tmp"
+        writer = None
+        offset = 0
+        for batch in parquet.iter_batches(batch_size=batch_rows):
+            table = pa.Table.from_batches([batch])
+            table = table.filter(pa.array(~drop[offset:offset + len(table)]))
+            offset += batch.num_rows
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table)
+
+        if writer is None:
+            pq.write_table(parquet.schema_arrow.empty_table(), tmp_path)
+        else:
+            writer.close()
+        os.replace(tmp_path, target)
+    finally:
+        shutil.rmtree(spill, ignore_errors=True)
+
+    removed = int(drop.sum())
+    return {
+        'rows_before': total,
+        'rows_after': total - removed,
+        'removed': removed
+    }
+
+
+def _rows_equal(keys: pd.DataFrame, rows: np.ndarray, others: np.ndarray) -> bool:
+    """
+    Checks that each of the rows holds the same values as its counterpart, with
+    missing values equal to each other.
+    """
+    for i in range(keys.shape[1]):
+        values = keys.iloc[:, i].to_numpy()
+        left, right = values[rows], values[others]
+        missing = pd.isna(left)
+        if not (missing == pd.isna(right)).all():
+            return False
+        # Compare only present values, since pd.NA can't be compared
+        equal = left[~missing] == right[~missing]
+        if not isinstance(equal, np.ndarray) or not equal.all():
+            return False
+    return True
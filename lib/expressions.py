@@ -0,0 +1,306 @@
+import ast
+import io
+import re
+import tokenize
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from .config import CONFIG
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+# Column references written as [column name]
+COLUMN_REF = re.compile(r"\[([^\[\]]+)\]")
+
+# Functions formulas may call, matching those supported by pd.eval
+FUNCTIONS = {
+    'abs': np.abs,
+    'sqrt': np.sqrt,
+    'exp': np.exp,
+    'expm1': np.expm1,
+    'log': np.log,
+    'log1p': np.log1p,
+    'log10': np.log10,
+    'sin': np.sin,
+    'cos': np.cos,
+    'tan': np.tan,
+    'arcsin': np.arcsin,
+    'arccos': np.arccos,
+    'arctan': np.arctan,
+    'arctan2': np.arctan2,
+    'sinh': np.sinh,
+    'cosh': np.cosh,
+    'tanh': np.tanh,
+    'arcsinh': np.arcsinh,
+    'arccosh': np.arccosh,
+    'arctanh': np.arctanh,
+    'where': np.where,
+}
+
+BIN_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+           ast.BitAnd, ast.BitOr, ast.BitXor)
+UNARY_OPS = (ast.UAdd, ast.USub, ast.Invert)
+COMPARE_OPS = (ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+
+# Operator symbols for writing rewritten formulas back out as source
+SYMBOLS = {
+    ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/', ast.FloorDiv: '//', ast.Mod: '%', ast.Pow: '**',
+    ast.BitAnd: '&', ast.BitOr: '|', ast.BitXor: '^', ast.UAdd: '+', ast.USub: '-', ast.Invert: '~',
+    ast.Eq: '==', ast.NotEq: '!=', ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=',
+}
+
+
+class _Rewriter(ast.NodeTransformer):
+    """
+    Checks a parsed formula against the allowed syntax and renames column
+    references to positional arguments. Like pd.eval, `and`, `or` and `not` act
+    element-wise.
+    """
+
+    def __init__(self, placeholders: dict) -> None:
+        self.placeholders = placeholders
+        self.columns = []
+
+    def argument(self, column: str) -> ast.Name:
+        if column not in self.columns:
+            self.columns.append(column)
+        return ast.Name(id=f"_c{self.columns.index(column)}", ctx=ast.Load())
+
+    def visit_Name(self, node):
+        if node.id in self.placeholders:
+            return self.argument(self.placeholders[node.id])
+        if node.id in FUNCTIONS:
+            return node
+        # Bare names are columns, as in formulas saved before the bracket syntax
+        return self.argument(node.id)
+
+    def visit_Constant(self, node):
+        return node
+
+    def visit_BinOp(self, node):
+        if not isinstance(node.op, BIN_OPS):
+            raise ValueError(f"Unsupported operator: {type(node.op).__name__}")
+        return ast.BinOp(left=self.visit(node.left), op=node.op, right=self.visit(node.right))
+
+    def visit_UnaryOp(self, node):
+        operand = self.visit(node.operand)
+        if isinstance(node.op, ast.Not):
+            return ast.UnaryOp(op=ast.Invert(), operand=operand)
+        if not isinstance(node.op, UNARY_OPS):
+            raise ValueError(f"Unsupported operator: {type(node.op).__name__}")
+        return ast.UnaryOp(op=node.op, operand=operand)
+
+    def visit_BoolOp(self, node):
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        values = [self.visit(value) for value in node.values]
+        result = values[0]
+        for value in values[1:]:
+            result = ast.BinOp(left=result, op=op, right=value)
+        return result
+
+    def visit_Compare(self, node):
+        left = self.visit(node.left)
+        result = None
+        # Chained comparisons become element-wise ands of each pair
+        for op, right in zip(node.ops, node.comparators):
+            if not isinstance(op, COMPARE_OPS):
+                raise ValueError(f"Unsupported comparison: {type(op).__name__}")
+            right = self.visit(right)
+            pair = ast.Compare(left=left, ops=[op], comparators=[right])
+            result = pair if result is None else ast.BinOp(left=result, op=ast.BitAnd(), right=pair)
+            left = right
+        return result
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+            name = node.func.id if isinstance(node.func, ast.Name) else type(node.func).__name__
+            raise ValueError(f"Unsupported function call: {name}")
+        return ast.Call(func=node.func, args=[self.visit(arg) for arg in node.args], keywords=[])
+
+    def generic_visit(self, node):
+        raise ValueError(f"Unsupported syntax in formula: {type(node).__name__}")
+
+
+@lru_cache(maxsize=CONFIG['expressions']['cache_size'])
+def compile_formula(formula: str) -> dict:
+    """
+    Parses a formula once and compiles it to a function of the columns it uses.
+    Results are cached, so the same formula used on other datasets or years is
+    not parsed again.
+
+    Parameters
+    ------------
+    formula: str
+        The formula, with columns written as [column name].
+
+    Returns
+    ------------
+    dict: 'columns' referenced in argument order, the rewritten 'source' and the
+    compiled 'kernel'.
+    """
+    placeholders = {}
+
+    def placeholder(match):
+        name = f"__col{len(placeholders)}__"
+        placeholders[name] = match.group(1)
+        return name
+
+    try:
+        tree = ast.parse(_replace_booleans(COLUMN_REF.sub(placeholder, formula).strip()), mode="eval")
+    except (SyntaxError, tokenize.TokenError) as e:
+        raise ValueError(f"Invalid formula: {formula}") from e
+
+    rewriter = _Rewriter(placeholders)
+    body = rewriter.visit(tree.body)
+
+    args = ast.arguments(posonlyargs=[], args=[ast.arg(arg=f"_c{i}") for i in range(len(rewriter.columns))],
+                         kwonlyargs=[], kw_defaults=[], defaults=[])
+    kernel_tree = ast.fix_missing_locations(ast.Expression(body=ast.Lambda(args=args, body=body)))
+    kernel = eval(compile(kernel_tree, "<formula>", "eval"), {"__builtins__": {}, **FUNCTIONS})
+
+    return {
+        'columns': tuple(rewriter.columns),
+        'source': _source(body),
+        'kernel': kernel
+    }
+
+
+def _source(node: ast.AST) -> str:
+    """
+    Writes a rewritten formula back out as source, fully parenthesized. Only
+    the syntax _Rewriter allows can appear.
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Constant):
+        return repr(node.value)
+    if isinstance(node, ast.BinOp):
+        return f"({_source(node.left)} {SYMBOLS[type(node.op)]} {_source(node.right)})"
+    if isinstance(node, ast.UnaryOp):
+        return f"({SYMBOLS[type(node.op)]}{_source(node.operand)})"
+    if isinstance(node, ast.Compare):
+        return f"({_source(node.left)} {SYMBOLS[type(node.ops[0])]} {_source(node.comparators[0])})"
+    return f"{node.func.id}({', '.join(_source(arg) for arg in node.args)})"
+
+
+def _replace_booleans(source: str) -> str:
+    """
+    Turns & and | into `and` and `or`, so they bind looser than comparisons as
+    they do in pd.eval and DataFrame.query.
+    """
+    tokens = []
+    for token in tokenize.generate_tokens(io.StringIO(source).readline):
+        if token.type == tokenize.OP and token.string in ("&", "|"):
+            token = token._replace(string=" and " if token.string == "&" else " or ")
+        tokens.append((token.type, token.string))
+    return tokenize.untokenize(tokens)
+
+
+def evaluate(df: pd.DataFrame, formulas: dict, chunk_rows: int = None) -> dict:
+    """
+    Computes one or more formula columns in a single pass. Each formula may use
+    the columns defined before it. Numeric columns are evaluated in row chunks so
+    intermediate results stay in cache; other columns are evaluated whole with
+    pandas semantics.
+
+    Parameters
+    ------------
+    df: pd.DataFrame
+        The data the formulas read.
+    formulas: dict
+        New column names mapped to their formulas, in evaluation order.
+    chunk_rows: int
+        Rows per chunk, defaulting to CONFIG['expressions']['chunk_rows'].
+
+    Returns
+    ------------
+    dict: New column names mapped to their values as Series aligned to df.
+    """
+    chunk_rows = chunk_rows or CONFIG['expressions']['chunk_rows']
+    compiled = {name: compile_formula(formula) for name, formula in formulas.items()}
+
+    # Only the referenced columns are read
+    inputs = {}
+    defined = set()
+    for name, expression in compiled.items():
+        for col in expression['columns']:
+            if col in defined or col in inputs:
+                continue
+            if col not in df.columns:
+                raise KeyError(f"Column not found: {col}")
+            inputs[col] = df[col]
+        defined.add(name)
+
+    numeric = all(isinstance(series.dtype, np.dtype) and series.dtype.kind in "biuf"
+                  for series in inputs.values())
+
+    with np.errstate(all="ignore"):
+        if numeric:
+            results = _evaluate_chunked({col: series.to_numpy() for col, series in inputs.items()},
+                                        compiled, len(df), chunk_rows)
+        else:
+            results = _evaluate_series(inputs, compiled, len(df))
+
+    return {name: pd.Series(values, index=df.index, name=name) if not isinstance(values, pd.Series)
+            else values.rename(name) for name, values in results.items()}
+
+
+def _evaluate_chunked(arrays: dict, compiled: dict, n_rows: int, chunk_rows: int) -> dict:
+    """
+    Evaluates formulas over NumPy arrays one chunk of rows at a time, filling
+    preallocated outputs.
+    """
+    outputs = {}
+
+    for start in range(0, max(n_rows, 1), chunk_rows):
+        stop = min(start + chunk_rows, n_rows)
+        env = {col: values[start:stop] for col, values in arrays.items()}
+
+        for name, expression in compiled.items():
+            result = _run(expression, [env[col] for col in expression['columns']], numeric=True)
+            result = np.broadcast_to(result, (stop - start,))
+
+            if name not in outputs:
+                outputs[name] = np.empty(n_rows, dtype=result.dtype)
+            elif not np.can_cast(result.dtype, outputs[name].dtype, casting="same_kind"):
+                outputs[name] = outputs[name].astype(np.result_type(outputs[name], result))
+
+            outputs[name][start:stop] = result
+            env[name] = outputs[name][start:stop]
+
+    return outputs
+
+
+def _evaluate_series(inputs: dict, compiled: dict, n_rows: int) -> dict:
+    """
+    Evaluates formulas over whole Series, for text, nullable and other extension
+    dtypes.
+    """
+    env = dict(inputs)
+    outputs = {}
+
+    for name, expression in compiled.items():
+        result = _run(expression, [env[col] for col in expression['columns']], numeric=False)
+        if np.ndim(result) == 0:
+            result = np.full(n_rows, result)
+        outputs[name] = env[name] = result
+
+    return outputs
+
+
+def _run(expression: dict, args: list, numeric: bool):
+    """
+    Runs a compiled formula, through numexpr when it is installed and the inputs
+    are plain numeric arrays.
+    """
+    if numeric and numexpr is not None and args:
+        try:
+            return numexpr.evaluate(expression['source'],
+                                    local_dict={f"_c{i}": arg for i, arg in enumerate(args)})
+        except (KeyError, NotImplementedError, SyntaxError, TypeError, ValueError):
+            pass
+
+    return expression['kernel'](*args)
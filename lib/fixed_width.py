@@ -0,0 +1,310 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from .config import CONFIG
+
+NEWLINE = ord("\n")
+CARRIAGE_RETURN = ord("\r")
+SPACE = ord(" ")
+
+NUMERIC_PATTERNS = [
+    (pa.int64(), r"^[+-]?\d+$"),
+    (pa.float64(), r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$"),
+]
+
+ARROW_TYPES = {
+    'int64': pa.int64(),
+    'float64': pa.float64(),
+    'string': pa.string(),
+}
+
+
+def line_bounds(buf: np.ndarray) -> tuple:
+    """
+    Finds where each line of a byte buffer starts and how long it is, not counting
+    line endings.
+
+    Parameters
+    ------------
+    buf: np.ndarray
+        The raw bytes as a uint8 array.
+
+    Returns
+    ------------
+    tuple: Arrays of line start offsets and line lengths.
+    """
+    newlines = np.flatnonzero(buf == NEWLINE)
+    ends = newlines
+    if len(buf) and buf[-1] != NEWLINE:
+        ends = np.append(ends, len(buf))
+
+    starts = np.concatenate(([0], newlines + 1))[:len(ends)]
+
+    # Drop the carriage return of Windows line endings
+    has_cr = (ends > starts) & (buf[np.maximum(ends - 1, 0)] == CARRIAGE_RETURN)
+    lengths = ends - starts - has_cr
+
+    return starts, lengths
+
+
+def slice_field(buf: np.ndarray, starts: np.ndarray, lengths: np.ndarray, start: int, end: int) -> np.ndarray:
+    """
+    Cuts one fixed-width field out of every line at once. Lines too short to hold
+    the whole field are padded with spaces.
+
+    Parameters
+    ------------
+    buf: np.ndarray
+        The raw bytes as a uint8 array.
+    starts: np.ndarray
+        Start offset of each line.
+    lengths: np.ndarray
+        Length of each line.
+    start: int
+        Offset of the field within a line.
+    end: int
+        Offset just past the field.
+
+    Returns
+    ------------
+    np.ndarray: One fixed-size byte string per line.
+    """
+    width = end - start
+    positions = start + np.arange(width)
+
+    stride = int(starts[1] - starts[0]) if len(starts) > 1 else 0
+
+    if len(starts) and lengths.min() >= end and (
+            len(starts) == 1 or np.array_equal(np.diff(starts), np.full(len(starts) - 1, stride))):
+        # Records of equal length: view the buffer as a 2D array instead of gathering
+        field = np.lib.stride_tricks.as_strided(buf[starts[0] + start:], shape=(len(starts), width),
+                                                strides=(stride, 1), writeable=False)
+    elif len(starts) and lengths.min() >= end:
+        # Every line holds the whole field, so no padding is needed
+        field = buf[starts[:, None] + positions]
+    else:
+        index = np.minimum(starts[:, None] + positions, max(len(buf) - 1, 0))
+        field = buf[index] if len(buf) else np.zeros((len(starts), width), dtype=np.uint8)
+        field[positions[None, :] >= lengths[:, None]] = SPACE
+
+    return np.ascontiguousarray(field).view(f"S{width}").ravel()
+
+
+def convert_field(raw: np.ndarray, encoding: str = None, arrow_type=None):
+    """
+    Converts raw field bytes to a trimmed Arrow array, inferring integers and
+    floats when no type is given. Blank numeric fields become nulls.
+
+    Parameters
+    ------------
+    raw: np.ndarray
+        Fixed-size byte strings, one per line.
+    encoding: str
+        The file encoding, or None for UTF-8.
+    arrow_type: pyarrow.DataType
+        The type to convert to, or None to infer it.
+
+    Returns
+    ------------
+    pyarrow.Array: The converted values.
+    """
+    if encoding in (None, "utf-8", "utf8"):
+        text = pc.cast(pa.array(raw, type=pa.binary()), pa.string())
+    else:
+        text = pa.array(np.char.decode(raw, encoding), type=pa.string())
+
+    text = pc.utf8_trim_whitespace(text)
+
+    if arrow_type == pa.string():
+        return text
+
+    numeric = pc.if_else(pc.equal(text, ""), pa.scalar(None, pa.string()), text)
+    if arrow_type is not None:
+        return pc.cast(numeric, arrow_type)
+
+    # Check a sample against cheap patterns first, failed casts over a whole
+    # column are expensive
+    sample = numeric.drop_null()[:CONFIG['import']['infer_sample_rows']]
+
+    for candidate, pattern in NUMERIC_PATTERNS:
+        if not pc.all(pc.match_substring_regex(sample, pattern)).as_py():
+            continue
+        try:
+            return pc.cast(numeric, candidate)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            continue
+
+    return text
+
+
+def first_invalid(text: pa.Array, arrow_type) -> tuple:
+    """
+    Finds the first value that can't be converted to a type.
+
+    Parameters
+    ------------
+    text: pyarrow.Array
+        Trimmed field values.
+    arrow_type: pyarrow.DataType
+        The type they should convert to.
+
+    Returns
+    ------------
+    tuple: The position and value of the first bad field, or (None, None).
+    """
+    for position, value in enumerate(text.to_pylist()):
+        if not value:
+            continue
+        try:
+            pc.cast(pa.array([value]), arrow_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            return position, value
+
+    return None, None
+
+
+def parse_fixed_width(buf: np.ndarray, columns: list, encoding: str = None, types: dict = None,
+                      first_line: int = 1) -> pa.Table:
+    """
+    Parses a buffer of complete fixed-width lines into an Arrow table. Columns
+    typed in the layout must convert to that type; columns with an inferred type
+    from `types` are widened to what the values need when they don't fit it.
+
+    Parameters
+    ------------
+    buf: np.ndarray
+        The raw bytes as a uint8 array, ending at a line boundary.
+    columns: list[dict]
+        Column layout, each with 'name', 'start' and 'end' offsets and an
+        optional 'type' of int64, float64 or string.
+    encoding: str
+        The file encoding, or None for UTF-8.
+    types: dict
+        Arrow types inferred for earlier lines per column name, used unless the
+        values don't fit them.
+    first_line: int
+        Line number of the buffer's first line in the file, for error messages.
+
+    Returns
+    ------------
+    pyarrow.Table: One column per layout entry.
+    """
+    starts, lengths = line_bounds(buf)
+    types = types or {}
+
+    arrays = []
+    for col in columns:
+        raw = slice_field(buf, starts, lengths, col['start'], col['end'])
+        layout_type = ARROW_TYPES.get(col.get('type'))
+
+        if layout_type is not None:
+            try:
+                arrays.append(convert_field(raw, encoding, layout_type))
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                position, value = first_invalid(convert_field(raw, encoding, pa.string()), layout_type)
+                raise ValueError(f"Column {col['name']} on line {first_line + (position or 0)}: "
+                                 f"{value!r} is not a valid {col['type']}")
+            continue
+
+        try:
+            arrays.append(convert_field(raw, encoding, types.get(col['name'])))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            # Infer again, which only ever finds a wider type than the one that failed
+            arrays.append(convert_field(raw, encoding))
+
+    return pa.Table.from_arrays(arrays, names=[col['name'] for col in columns])
+
+
+def iter_fixed_width(path: str, specs: dict, chunk_bytes: int = None, types: dict = None):
+    """
+    Parses a fixed-width file through a memory map, one block of whole lines at a
+    time. Column types are inferred from the first block and kept for the rest,
+    unless a later block holds values that don't fit: integers then widen to
+    floats and numbers to text from that block on.
+
+    Parameters
+    ------------
+    path: str
+        The file to read.
+    specs: dict
+        Import specs with the layout under 'fixed_width_columns'.
+    chunk_bytes: int
+        Approximate bytes per block, defaulting to CONFIG['import']['chunk_bytes'].
+    types: dict
+        Arrow types per column name to start from instead of inferring them. The
+        types in use are written back to it as blocks are parsed, so a caller
+        can parse the file again with the widest types found.
+
+    Returns
+    ------------
+    iterator of tuple: Each parsed block as an Arrow table with the number of bytes
+    read so far.
+    """
+    chunk_bytes = chunk_bytes or CONFIG['import']['chunk_bytes']
+    encoding = "utf-8" if specs.get('utf8_encoding') else None
+    columns = specs['fixed_width_columns']
+    types = {} if types is None else types
+
+    # Empty files cannot be memory mapped
+    mm = np.memmap(path, dtype=np.uint8, mode="r") if os.path.getsize(path) else np.zeros(0, np.uint8)
+    pos = 0
+    line = 1
+
+    if specs.get('contains_headers'):
+        first = np.flatnonzero(mm[:chunk_bytes] == NEWLINE)
+        pos = int(first[0]) + 1 if len(first) else len(mm)
+        line = 2
+
+    while pos < len(mm):
+        end = min(pos + chunk_bytes, len(mm))
+        while end < len(mm):
+            # End the block after its last complete line
+            newlines = np.flatnonzero(mm[pos:end] == NEWLINE)
+            if len(newlines):
+                end = pos + int(newlines[-1]) + 1
+                break
+            # A single line longer than the block, so widen it
+            end = min(end + chunk_bytes, len(mm))
+
+        table = parse_fixed_width(np.asarray(mm[pos:end]), columns, encoding, types, line)
+        types.update({name: table.schema.field(name).type for name in table.column_names})
+
+        pos = end
+        line += table.num_rows
+        yield table, pos
+
+
+def read_fixed_width(path: str, specs: dict, chunked: bool = False):
+    """
+    Reads a fixed-width file described by explicit column offsets.
+
+    Parameters
+    ------------
+    path: str
+        The file to read.
+    specs: dict
+        Import specs with the layout under 'fixed_width_columns'.
+    chunked: bool
+        Return an iterator of dataframes, one per block, instead of one dataframe.
+        A column widened by a later block has the wider type from that block on.
+
+    Returns
+    ------------
+    pd.DataFrame or iterator of pd.DataFrame: The data, chunked if requested.
+    """
+    if chunked:
+        return (table.to_pandas() for table, _ in iter_fixed_width(path, specs))
+
+    types = {}
+    tables = [table for table, _ in iter_fixed_width(path, specs, types=types)]
+    if not tables:
+        return pd.DataFrame(columns=[col['name'] for col in specs['fixed_width_columns']])
+
+    if any(table.schema.field(name).type != types[name] for table in tables for name in types):
+        # A later block widened a column, so parse the earlier ones again with the
+        # final types rather than casting values that were already converted
+        tables = [table for table, _ in iter_fixed_width(path, specs, types=dict(types))]
+
+    return pa.concat_tables(tables).to_pandas()
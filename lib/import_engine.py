@@ -0,0 +1,694 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import random
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .config import CONFIG
+from .fixed_width import read_fixed_width, iter_fixed_width, parse_fixed_width
+
+
+def hash_source(path: str, specs: dict = None, block_size: int = 1024 ** 2) -> str:
+    """
+    Hashes a source file together with the specs used to import it, reading the
+    file in blocks so memory use stays constant.
+
+    Parameters
+    ------------
+    path: str
+        The source file.
+    specs: dict
+        The import specs, so the same file imported differently gets another key.
+    block_size: int
+        Bytes read per block.
+
+    Returns
+    ------------
+    str: Hex digest identifying the file contents and specs.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(specs or {}, sort_keys=True, default=str).encode())
+
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    with open(path, "rb") as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            digest.update(view[:size])
+
+    return digest.hexdigest()
+
+
+def sniff_delimiter(path: str, encoding: str = None, sample_bytes: int = 64 * 1024) -> str:
+    """
+    Guesses the delimiter of a delimited file from its first bytes.
+
+    Parameters
+    ------------
+    path: str
+        The file to inspect.
+    encoding: str
+        The file encoding, or None for the platform default.
+    sample_bytes: int
+        How much of the start of the file to look at.
+
+    Returns
+    ------------
+    str: The detected delimiter, or a comma if none could be detected.
+    """
+    with open(path, "r", encoding=encoding, errors="replace", newline="") as f:
+        sample = f.read(sample_bytes)
+
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","
+
+
+def sniff_specs(path: str, encoding: str = None, sample_bytes: int = 64 * 1024) -> dict:
+    """
+    Guesses the delimiter and whether the first row is a header from the start of
+    a file, without parsing the rest of it.
+
+    Parameters
+    ------------
+    path: str
+        The file to inspect.
+    encoding: str
+        The file encoding, or None for the platform default.
+    sample_bytes: int
+        How much of the start of the file to look at.
+
+    Returns
+    ------------
+    dict: Detected 'delimiter' and 'contains_headers' specs.
+    """
+    with open(path, "r", encoding=encoding, errors="replace", newline="") as f:
+        sample = f.read(sample_bytes)
+
+    sniffer = csv.Sniffer()
+    specs = {'delimiter': sniff_delimiter(path, encoding, sample_bytes)}
+
+    try:
+        specs['contains_headers'] = sniffer.has_header(sample)
+    except csv.Error:
+        specs['contains_headers'] = True
+
+    return specs
+
+
+def head_lines(path: str, nrows: int, encoding: str = None, max_bytes: int = None) -> list:
+    """
+    Returns the first lines of a file.
+
+    Parameters
+    ------------
+    path: str
+        The file to read.
+    nrows: int
+        Number of lines to return.
+    encoding: str
+        The file encoding, or None for the platform default.
+    max_bytes: int
+        Stop early once this many characters were read.
+
+    Returns
+    ------------
+    list[str]: The lines, each ending with a newline.
+    """
+    lines = []
+    size = 0
+
+    with open(path, "r", encoding=encoding, errors="replace", newline="") as f:
+        for line in f:
+            lines.append(line if line.endswith("\n") else line + "\n")
+            size += len(line)
+            if len(lines) >= nrows or (max_bytes and size >= max_bytes):
+                break
+
+    return lines
+
+
+def sample_lines(path: str, k: int, start: int = 0, encoding: str = None, seed: int = None) -> list:
+    """
+    Samples lines from across a file by seeking to random offsets, so the cost
+    depends on the sample size and not on the file size. Longer lines are
+    slightly more likely to be picked.
+
+    Parameters
+    ------------
+    path: str
+        The file to sample.
+    k: int
+        Number of lines to sample.
+    start: int
+        Byte offset before which no lines are sampled, e.g. the end of the header.
+    encoding: str
+        The file encoding, or None for UTF-8.
+    seed: int
+        Seed for reproducible samples.
+
+    Returns
+    ------------
+    list[str]: The sampled lines in file order, each ending with a newline.
+    """
+    total_bytes = os.path.getsize(path)
+    if total_bytes <= start or k <= 0:
+        return []
+
+    rng = random.Random(seed)
+    offsets = sorted(rng.randrange(start, total_bytes) for _ in range(k))
+
+    lines = {}
+    with open(path, "rb") as f:
+        for offset in offsets:
+            # Skip the line the offset landed in, it is probably partial
+            f.seek(max(offset - 1, 0))
+            f.readline()
+            line_start = f.tell()
+            line = f.readline()
+            if line.strip() and line_start >= start:
+                lines[line_start] = line
+
+    decoded = [lines[pos].decode(encoding or "utf-8", errors="replace") for pos in sorted(lines)]
+    return [line if line.endswith("\n") else line + "\n" for line in decoded]
+
+
+def preview_source(path: str, specs: dict, nrows: int = None, sample_rows: int = 0, seed: int = None) -> pd.DataFrame:
+    """
+    Parses only the start of a file, plus optionally lines sampled from across it,
+    so previews cost the same regardless of file size. Column dtypes are inferred
+    from the preview rows.
+
+    Parameters
+    ------------
+    path: str
+        The file to preview.
+    specs: dict
+        Import specs, as saved by DataImport.
+    nrows: int
+        Data rows to read from the start, defaulting to CONFIG['import']['preview_rows'].
+    sample_rows: int
+        Additional rows to sample from the rest of the file.
+    seed: int
+        Seed for reproducible samples.
+
+    Returns
+    ------------
+    pd.DataFrame: The preview rows.
+    """
+    nrows = nrows or CONFIG['import']['preview_rows']
+    options = read_options(path, specs)
+    encoding = options.pop('encoding')
+
+    header_rows = 1 if specs.get('contains_headers') else 0
+    lines = head_lines(path, nrows + header_rows, encoding, max_bytes=CONFIG['import']['preview_bytes'])
+
+    if sample_rows:
+        head_bytes = sum(len(line.encode(encoding or "utf-8")) for line in lines)
+        lines += sample_lines(path, sample_rows, start=head_bytes, encoding=encoding, seed=seed)
+
+    if uses_column_offsets(specs):
+        if header_rows:
+            lines = lines[1:]
+        buf = np.frombuffer("".join(lines).encode(encoding or "utf-8"), dtype=np.uint8)
+        return parse_fixed_width(buf, specs['fixed_width_columns'], encoding).to_pandas()
+
+    text = io.StringIO("".join(lines))
+
+    if specs.get('delimited', True):
+        return pd.read_csv(text, **options)
+
+    return pd.read_fwf(text, **options)
+
+
+def read_options(path: str, specs: dict) -> dict:
+    """
+    Translates import specs into pandas reader arguments.
+
+    Parameters
+    ------------
+    path: str
+        The file being imported.
+    specs: dict
+        Import specs, as saved by DataImport.
+
+    Returns
+    ------------
+    dict: Keyword arguments for `pd.read_csv` or `pd.read_fwf`.
+    """
+    encoding = "utf-8" if specs.get('utf8_encoding') else None
+    options = {
+        'header': 0 if specs.get('contains_headers') else None,
+        'encoding': encoding,
+    }
+
+    if specs.get('dtypes'):
+        options['dtype'] = reader_dtypes(specs['dtypes'])
+
+    if specs.get('delimited', True):
+        options['sep'] = specs.get('delimiter') or sniff_delimiter(path, encoding)
+
+    return options
+
+
+def read_source(path: str, specs: dict, chunksize: int = None):
+    """
+    Reads a source file as described by its import specs.
+
+    Parameters
+    ------------
+    path: str
+        The file to read.
+    specs: dict
+        Import specs, as saved by DataImport.
+    chunksize: int
+        Rows per chunk, or None to read the whole file at once.
+
+    Returns
+    ------------
+    pd.DataFrame or iterator of pd.DataFrame: The data, chunked if requested.
+    """
+    if uses_column_offsets(specs):
+        return read_fixed_width(path, specs, chunked=bool(chunksize))
+
+    options = read_options(path, specs)
+
+    if specs.get('delimited', True):
+        return pd.read_csv(path, chunksize=chunksize, **options)
+
+    return pd.read_fwf(path, chunksize=chunksize, **options)
+
+
+def reader_dtypes(dtypes: dict) -> dict:
+    """
+    Widens the column types saved in import specs to ones no value can overflow,
+    for reading. Compact types were chosen to fit the file the specs were made
+    from; `narrow_dtypes` only applies them where a later file's values fit too.
+
+    Parameters
+    ------------
+    dtypes: dict
+        Column names mapped to their saved types.
+
+    Returns
+    ------------
+    dict: Column names mapped to nullable 64-bit integers, 64-bit floats or the
+    saved text type.
+    """
+    widened = {}
+    for col, dtype in dtypes.items():
+        kind = pd.api.types.pandas_dtype(dtype).kind
+        if kind in "iu":
+            widened[col] = "Int64"
+        elif kind == "f":
+            widened[col] = "float64"
+        else:
+            widened[col] = dtype
+
+    return widened
+
+
+def narrow_dtypes(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """
+    Casts columns to the compact types saved in import specs where every value
+    survives unchanged. Columns whose values don't fit keep the type they were
+    read with.
+
+    Parameters
+    ------------
+    df: pd.DataFrame
+        Data as read from the source file.
+    dtypes: dict
+        Source column names mapped to their saved types.
+
+    Returns
+    ------------
+    pd.DataFrame: The data with compact types where they fit.
+    """
+    df = df.copy(deep=False)
+
+    for col in df.columns:
+        dtype = dtypes.get(str(col))
+        if dtype is None or str(df[col].dtype) == dtype:
+            continue
+
+        series = df[col]
+        try:
+            narrowed = series.astype(dtype)
+        except (TypeError, ValueError, OverflowError):
+            continue
+
+        # Integer casts wrap around and float casts round without raising
+        if narrowed.dtype.kind in "iuf":
+            if series.dtype.kind not in "iuf" or not np.array_equal(
+                    series.to_numpy(dtype="float64", na_value=np.nan),
+                    narrowed.to_numpy(dtype="float64", na_value=np.nan), equal_nan=True):
+                print(f"⚠️ Column {col} doesn't fit {dtype}; keeping {series.dtype}")
+                continue
+
+        df[col] = narrowed
+
+    return df
+
+
+def uses_column_offsets(specs: dict) -> bool:
+    """
+    Whether the specs describe a fixed-width file with explicit column offsets,
+    which is read by the fixed-width engine instead of `pd.read_fwf`.
+    """
+    return not specs.get('delimited', True) and bool(specs.get('fixed_width_columns'))
+
+
+def normalize_strings(df: pd.DataFrame, trim: bool = False, lowercase: bool = False,
+                      empty_to_null: bool = False) -> pd.DataFrame:
+    """
+    Normalizes text columns with vectorized string methods, one column at a time.
+    Columns without text are left untouched, as are non-text values in mixed columns.
+
+    Parameters
+    ------------
+    df: pd.DataFrame
+        The data to normalize.
+    trim: bool
+        Strip leading and trailing whitespace.
+    lowercase: bool
+        Fold text to lowercase.
+    empty_to_null: bool
+        Replace empty strings, after trimming, with missing values.
+
+    Returns
+    ------------
+    pd.DataFrame: The normalized data.
+    """
+    if not (trim or lowercase or empty_to_null):
+        return df
+
+    df = df.copy(deep=False)
+
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Normalize each category once instead of every value
+            categories = series.cat.categories.to_series()
+            if pd.api.types.infer_dtype(categories) == "string":
+                normalized = _normalize_text(categories, trim, lowercase, empty_to_null)
+                df[col] = series.map(normalized.to_dict()).astype("category")
+            continue
+
+        if pd.api.types.is_object_dtype(series.dtype):
+            inferred = pd.api.types.infer_dtype(series, skipna=True)
+            if inferred == "string":
+                is_text = None
+            elif inferred.startswith("mixed"):
+                is_text = series.map(type).eq(str).to_numpy()
+            else:
+                continue
+        elif pd.api.types.is_string_dtype(series.dtype):
+            is_text = None
+        else:
+            continue
+
+        text = series if is_text is None else series[is_text]
+        text = _normalize_text(text, trim, lowercase, empty_to_null)
+
+        if is_text is None:
+            df[col] = text
+        else:
+            series = series.copy()
+            series[is_text] = text
+            df[col] = series
+
+    return df
+
+
+def _normalize_text(text: pd.Series, trim: bool, lowercase: bool, empty_to_null: bool) -> pd.Series:
+    """
+    Applies the selected normalizations to a series holding only text.
+    """
+    if trim:
+        text = text.str.strip()
+    if lowercase:
+        text = text.str.lower()
+    if empty_to_null:
+        text = text.mask(text == "")
+
+    return text
+
+
+def optimize_dtypes(df: pd.DataFrame, category_ratio: float = None) -> tuple:
+    """
+    Shrinks column dtypes: integers and floats are downcast where no value changes,
+    low-cardinality text becomes categorical and other text uses Arrow strings.
+
+    Parameters
+    ------------
+    df: pd.DataFrame
+        The data to optimize.
+    category_ratio: float
+        Text columns with at most this share of distinct values become categorical,
+        defaulting to CONFIG['import']['category_ratio'].
+
+    Returns
+    ------------
+    tuple: The optimized dataframe, the chosen dtype per column (usable as the
+    'dtypes' import spec) and a report of the memory footprint before and after.
+    """
+    if category_ratio is None:
+        category_ratio = CONFIG['import']['category_ratio']
+
+    before = int(df.memory_usage(index=True, deep=True).sum())
+    df = df.copy(deep=False)
+    dtypes = {}
+
+    for col in df.columns:
+        series = df[col]
+
+        if pd.api.types.is_bool_dtype(series.dtype):
+            continue
+        elif pd.api.types.is_integer_dtype(series.dtype):
+            optimized = pd.to_numeric(series, downcast="integer")
+            # Saved as a nullable type so later files with missing values still load
+            dtypes[col] = str(optimized.dtype).capitalize() if optimized.dtype.kind == "i" else str(optimized.dtype)
+        elif pd.api.types.is_float_dtype(series.dtype):
+            optimized = series.astype("float32")
+            if not np.allclose(optimized.to_numpy(dtype="float64"), series.to_numpy(dtype="float64"),
+                               rtol=0, atol=0, equal_nan=True):
+                continue
+            dtypes[col] = "float32"
+        elif pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+            if pd.api.types.infer_dtype(series, skipna=True) != "string":
+                continue
+            if len(series) and series.nunique(dropna=True) <= category_ratio * len(series):
+                optimized = series.astype("category")
+                dtypes[col] = "category"
+            else:
+                optimized = series.astype("string[pyarrow]")
+                dtypes[col] = "string[pyarrow]"
+        else:
+            continue
+
+        df[col] = optimized
+
+    after = int(df.memory_usage(index=True, deep=True).sum())
+    report = {'before_bytes': before, 'after_bytes': after}
+
+    return df, dtypes, report
+
+
+def apply_specs(df: pd.DataFrame, specs: dict) -> pd.DataFrame:
+    """
+    Applies the text normalization, column selection and renaming from import specs.
+
+    Parameters
+    ------------
+    df: pd.DataFrame
+        Data as read from the source file.
+    specs: dict
+        Import specs, as saved by DataImport.
+
+    Returns
+    ------------
+    pd.DataFrame: The data ready to be saved.
+    """
+    df = normalize_strings(df,
+                           trim=specs.get('trim_spaces', False),
+                           lowercase=specs.get('lowercase', False),
+                           empty_to_null=specs.get('empty_to_null', False))
+
+    if specs.get('optimize_dtypes') and specs.get('dtypes'):
+        df = narrow_dtypes(df, specs['dtypes'])
+
+    # Saved specs key columns by their string names, headerless files use numbers
+    columns = {str(col): value for col, value in specs.get('columns', {}).items()}
+    if columns:
+        selected = [col for col in df.columns if columns.get(str(col), (True, None))[0]]
+        renamed = {col: columns[str(col)][1] for col in selected
+                   if str(col) in columns and columns[str(col)][1]}
+        df = df[selected].rename(columns=renamed)
+
+    return df
+
+
+def widen_dtype(first, later) -> str:
+    """
+    Returns a type that holds the values of two guessed column types: floats
+    for two different numeric types, text otherwise.
+
+    Parameters
+    ------------
+    first: dtype
+        The type guessed for earlier rows.
+    later: dtype
+        The type guessed for later rows.
+
+    Returns
+    ------------
+    str: The wider type, for the `dtype` argument of the pandas readers.
+    """
+    kinds = {pd.api.types.pandas_dtype(first).kind, pd.api.types.pandas_dtype(later).kind}
+    if kinds <= set("iuf"):
+        return "float64"
+    return "str"
+
+
+def iter_chunks(path: str, specs: dict, chunksize: int = None, types: dict = None):
+    """
+    Reads a source file chunk by chunk as described by its import specs.
+
+    Parameters
+    ------------
+    path: str
+        The file to read.
+    specs: dict
+        Import specs, as saved by DataImport.
+    chunksize: int
+        Rows per chunk, defaulting to CONFIG['import']['chunk_rows']. Files with
+        column offsets are read in blocks of CONFIG['import']['chunk_bytes'].
+    types: dict
+        Types to read columns with, updated as chunks widen them: Arrow types
+        per column for files with column offsets, see `iter_fixed_width`, or
+        pandas types for the columns whose guessed type changed between chunks.
+
+    Returns
+    ------------
+    iterator of tuple: Each chunk as a dataframe with the number of bytes read so far.
+    """
+    if uses_column_offsets(specs):
+        for table, bytes_read in iter_fixed_width(path, specs, types=types):
+            yield table.to_pandas(), bytes_read
+        return
+
+    chunksize = chunksize or CONFIG['import']['chunk_rows']
+    options = read_options(path, specs)
+    reader = pd.read_csv if specs.get('delimited', True) else pd.read_fwf
+    if types:
+        options['dtype'] = {**options.get('dtype', {}), **types}
+
+    # The readers guess each chunk's column types separately
+    seen = {}
+    with open(path, "rb") as source:
+        for chunk in reader(source, chunksize=chunksize, **options):
+            if types is not None:
+                for col, dtype in chunk.dtypes.items():
+                    if col in seen and dtype != seen[col]:
+                        types[col] = seen[col] = widen_dtype(seen[col], dtype)
+                    seen.setdefault(col, dtype)
+            yield chunk, source.tell()
+
+
+def stream_import(path: str, specs: dict, target_path: str, chunksize: int = None, progress=None) -> dict:
+    """
+    Imports a source file chunk by chunk into a Parquet file, so memory use stays
+    bounded by the chunk size instead of the file size. Each chunk becomes one
+    row group of the target file. Saved compact column types aren't applied,
+    since a later chunk may not fit the type an earlier one was written with.
+    When a later chunk's column doesn't fit the type an earlier one was written
+    with, the file is imported again with the wider type: floats for mixed
+    numbers, text otherwise.
+
+    Parameters
+    ------------
+    path: str
+        The file to import.
+    specs: dict
+        Import specs, as saved by DataImport.
+    target_path: str
+        The Parquet file to write.
+    chunksize: int
+        Rows per chunk, defaulting to CONFIG['import']['chunk_rows'].
+    progress: callable
+        Called after each chunk with (bytes_read, total_bytes, rows_written).
+
+    Returns
+    ------------
+    dict: Summary with the rows, bytes and row groups written and the elapsed time.
+    """
+    total_bytes = os.path.getsize(path)
+
+    start = time.perf_counter()
+    writer = None
+    tmp_path = f"{target_path}.tmp"
+    types = {}
+
+    try:
+        widened = True
+        while widened:
+            widened = False
+            rows = 0
+            row_groups = 0
+            before = dict(types)
+
+            for chunk, bytes_read in iter_chunks(path, specs, chunksize, types):
+                chunk = apply_specs(chunk, dict(specs, optimize_dtypes=False))
+                chunk.columns = [str(col) for col in chunk.columns]
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                elif not table.schema.equals(writer.schema):
+                    try:
+                        table = table.cast(writer.schema)
+                    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                        if types == before:
+                            raise ValueError(f"Column types changed after row {rows}; "
+                                             f"set 'dtypes' in the import specs. ({e})")
+                        # `types` now holds the wider types, so start over with them
+                        print(f"🔄 Column types widened after row {rows}, importing again")
+                        writer.close()
+                        writer = None
+                        widened = True
+                        break
+
+                writer.write_table(table)
+                rows += len(chunk)
+                row_groups += 1
+
+                if progress:
+                    progress(bytes_read, total_bytes, rows)
+
+        if writer is not None:
+            writer.close()
+            writer = None
+            os.replace(tmp_path, target_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return {
+        'source': path,
+        'target': target_path,
+        'rows': rows,
+        'bytes': total_bytes,
+        'row_groups': row_groups,
+        'seconds': time.perf_counter() - start
+    }
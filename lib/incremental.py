@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+from .plan import execute_plan
+from .dedup import row_hashes, duplicate_mask
+from .join import key_index, outer_join
+from .version_store import VersionStore
+
+# Steps that only look at the row they produce, so new rows can be cleaned alone
+ROW_LOCAL = ('Added Column', 'Filtered Rows')
+
+# Steps that depend on the other rows, through the keys seen so far
+STATEFUL = ('Removed Duplicates', 'Merged DataFrame')
+
+
+class IncrementalError(ValueError):
+    """
+    Raised when appended rows can't be cleaned without redoing the whole dataset.
+    """
+
+
+def step_keys(step: dict, df: pd.DataFrame) -> list:
+    """
+    Returns the key columns of a duplicate removal or merge, as seen by the rows
+    reaching it.
+    """
+    if step['name'] == 'Merged DataFrame':
+        return list(step['columns'])
+    return list(step.get('subset') or df.columns)
+
+
+def build_state(df: pd.DataFrame, steps: list, load_dataset) -> dict:
+    """
+    Replays transformations on raw rows, recording the keys of the rows reaching
+    each duplicate removal and merge.
+
+    Parameters
+    ------------
+    df: pd.DataFrame
+        Every raw row of the dataset.
+    steps: list[dict]
+        Transformations as recorded in history.
+    load_dataset: callable
+        Loads the other side of merges, as for execute_plan.
+
+    Returns
+    ------------
+    dict: Step positions mapped to the sorted, distinct hashes of their keys.
+    """
+    state = {}
+    for i, step in enumerate(steps):
+        if step['name'] in STATEFUL:
+            state[i] = np.unique(row_hashes(df, step_keys(step, df)))
+        df = execute_plan(df, [step], load_dataset)
+
+    return state
+
+
+def apply_incremental(existing: pd.DataFrame, rows: pd.DataFrame, steps: list, state: dict,
+                      load_dataset) -> tuple:
+    """
+    Cleans appended raw rows with a dataset's transformations without touching
+    the rows already cleaned. Row-local steps run on the new rows only. Duplicate
+    removal and merges compare the new rows' keys with the keys earlier rows
+    brought to the same step, and drop the cleaned rows a new row replaces: the
+    earlier duplicate under keep='last' or 'none', or a merged row that stood
+    alone until a new row matched it.
+
+    Parameters
+    ------------
+    existing: pd.DataFrame
+        The cleaned dataset.
+    rows: pd.DataFrame
+        The appended raw rows.
+    steps: list[dict]
+        Transformations as recorded in history.
+    state: dict
+        Keys seen by each duplicate removal and merge, from build_state or an
+        earlier append.
+    load_dataset: callable
+        Loads the other side of merges, as for execute_plan.
+
+    Returns
+    ------------
+    tuple: The mask of cleaned rows to drop, the cleaned new rows, and the state
+    including the new rows' keys.
+    """
+    drop = np.zeros(len(existing), dtype=bool)
+    state = dict(state)
+
+    for i, step in enumerate(steps):
+        if step['name'] in ROW_LOCAL:
+            rows = execute_plan(rows, [step], load_dataset)
+            continue
+
+        if step['name'] not in STATEFUL:
+            raise IncrementalError(f"{step['name']} can't be applied to appended rows alone")
+
+        keys = step_keys(step, rows)
+        hashes = row_hashes(rows, keys)
+        seen = _contains(state[i], hashes)
+
+        if step['name'] == 'Removed Duplicates':
+            keep = step.get('keep', 'first')
+            if keep == 'first':
+                rows = rows[~(seen | duplicate_mask(rows, keys, 'first'))]
+            else:
+                drop |= _locate(existing, rows, keys, steps[i + 1:])
+                dropped = duplicate_mask(rows, keys, 'last') if keep == 'last' else \
+                    seen | duplicate_mask(rows, keys, 'none')
+                rows = rows[~dropped]
+
+        else:
+            right = load_dataset(step['dataset'], step.get('version'), step.get('load_columns'))['df']
+            right_keys = key_index(right, keys)
+            new_keys = key_index(rows, keys)
+
+            # Right rows no earlier row matched were kept on their own, and now
+            # pair with the new rows instead
+            newly_matched = np.asarray(new_keys.isin(right_keys)) & ~seen
+            if newly_matched.any():
+                drop |= _locate(existing, rows[newly_matched], keys, steps[i + 1:])
+
+            rows = outer_join(rows, right[np.asarray(right_keys.isin(new_keys))], keys)
+
+        state[i] = np.union1d(state[i], hashes)
+
+    return drop, rows, state
+
+
+def _contains(seen: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    """
+    Checks which hashes are in a sorted array of distinct hashes.
+    """
+    if not len(seen):
+        return np.zeros(len(hashes), dtype=bool)
+    positions = np.minimum(np.searchsorted(seen, hashes), len(seen) - 1)
+    return seen[positions] == hashes
+
+
+def _locate(existing: pd.DataFrame, rows: pd.DataFrame, keys: list, later: list) -> np.ndarray:
+    """
+    Finds the cleaned rows sharing a key with any of the rows. Later steps must
+    leave the key columns as they were, so the keys can still be matched.
+    """
+    overwritten = [step['column_name'] for step in later
+                   if step['name'] == 'Added Column' and step['column_name'] in keys]
+    missing = [key for key in keys if key not in existing.columns]
+    if overwritten or missing:
+        raise IncrementalError(f"Key columns {overwritten + missing} change after the step that uses them")
+
+    return np.asarray(key_index(existing, keys).isin(key_index(rows, keys)))
+
+
+def concat_frames(frames: list) -> pd.DataFrame:
+    """
+    Stacks frames with the same columns, keeping categorical columns
+    categorical.
+
+    Parameters
+    ------------
+    frames: list[pd.DataFrame]
+        The frames, in row order.
+
+    Returns
+    ------------
+    pd.DataFrame: The rows of every frame, with their index labels.
+    """
+    if len(frames) == 1:
+        return frames[0]
+
+    columns = frames[0].columns
+    data = {col: VersionStore.concat_values([frame[col].reset_index(drop=True) for frame in frames])
+            for col in columns}
+    index = frames[0].index.append([frame.index for frame in frames[1:]])
+
+    return pd.DataFrame({col: values.array for col, values in data.items()}, index=index, columns=columns)
@@ -0,0 +1,204 @@
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+import pandas as pd
+from .config import CONFIG
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where memory isn't measured
+    resource = None
+
+
+class Instrument:
+    """
+    Records how long operations take, how much memory and data they use and the
+    cache hits they get. Records pile up until taken, so they can be saved with
+    the next checkpoint.
+    """
+
+    def __init__(self, caches: list = None) -> None:
+        """
+        Initializes an empty record list.
+
+        Parameters
+        ------------
+        caches: list[VersionCache]
+            Caches whose hits and misses are counted for each operation.
+        """
+        self.caches = list(caches or [])
+        self.records = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, operation: str, df=None, records: list = None, **details):
+        """
+        Measures the operation run inside the block. Add its output to the
+        yielded record with `record_frame`. An operation that raises is recorded
+        with its error.
+
+        Parameters
+        ------------
+        operation: str
+            Name of the operation.
+        df: pd.DataFrame or ChunkedFrame
+            The data the operation starts from, or None.
+        records: list
+            Where to add the record, instead of the records waiting to be taken.
+        details:
+            Extra fields for the record, such as the version loaded.
+
+        Returns
+        ------------
+        dict: The record being filled in.
+        """
+        if not CONFIG['instrument']['enabled']:
+            yield {}
+            return
+
+        record = {'operation': operation, **details}
+        record_frame(record, 'in', df)
+
+        hits, misses = self._cache_counts()
+        peak = _peak_rss()
+        started = time.time()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+
+        try:
+            yield record
+        except Exception as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            end_hits, end_misses = self._cache_counts()
+            end_peak = _peak_rss()
+            record.update({
+                'started': started,
+                'wall_seconds': time.perf_counter() - wall,
+                'cpu_seconds': time.process_time() - cpu,
+                'memory_peak_delta': None if peak is None else end_peak - peak,
+                'cache_hits': end_hits - hits,
+                'cache_misses': end_misses - misses,
+                'thread': threading.current_thread().name
+            })
+            with self.lock:
+                (self.records if records is None else records).append(record)
+
+    def take(self) -> list:
+        """
+        Returns the records made so far and starts a new list.
+
+        Returns
+        ------------
+        list[dict]: The records, oldest first.
+        """
+        with self.lock:
+            records, self.records = self.records, []
+        return records
+
+    def pending(self) -> list:
+        """
+        Returns the records made so far without removing them.
+        """
+        with self.lock:
+            return list(self.records)
+
+    def _cache_counts(self) -> tuple:
+        """
+        Sums the hits and misses of the watched caches.
+        """
+        return sum(cache.hits for cache in self.caches), sum(cache.misses for cache in self.caches)
+
+
+def record_frame(record: dict, side: str, df) -> None:
+    """
+    Adds the rows and bytes of data going into or out of an operation to its record.
+
+    Parameters
+    ------------
+    record: dict
+        The record from Instrument.measure.
+    side: str
+        'in' or 'out'.
+    df: pd.DataFrame or ChunkedFrame
+        The data, or None.
+    """
+    if df is None or not isinstance(record, dict):
+        return
+
+    record[f'rows_{side}'] = len(df)
+    if isinstance(df, pd.DataFrame):
+        # Shallow sizes: counting text values would take longer than some operations
+        record[f'bytes_{side}'] = int(df.memory_usage(index=True, deep=False).sum())
+    else:
+        record[f'bytes_{side}'] = int(df.nbytes)
+
+
+def chrome_trace(records: list) -> dict:
+    """
+    Converts operation records to the Chrome trace event format, viewable in
+    chrome://tracing or Perfetto.
+
+    Parameters
+    ------------
+    records: list[dict]
+        Records from Instrument.measure.
+
+    Returns
+    ------------
+    dict: The trace, ready to be saved as JSON.
+    """
+    threads = {}
+    events = []
+    for record in records:
+        tid = threads.setdefault(record.get('thread', 'main'), len(threads))
+        args = {key: value for key, value in record.items()
+                if key not in ('operation', 'started', 'wall_seconds', 'thread')}
+        events.append({
+            'name': record['operation'],
+            'cat': 'cleaning',
+            'ph': 'X',
+            'ts': record['started'] * 1e6,
+            'dur': record['wall_seconds'] * 1e6,
+            'pid': 0,
+            'tid': tid,
+            'args': args
+        })
+
+    for name, tid in threads.items():
+        events.append({'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': tid, 'args': {'name': name}})
+
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def save_records(records: list, path: str, chrome: bool = True) -> None:
+    """
+    Saves operation records as a Chrome trace or as a plain JSON list.
+
+    Parameters
+    ------------
+    records: list[dict]
+        Records from Instrument.measure.
+    path: str
+        The JSON file to write.
+    chrome: bool
+        Write the Chrome trace event format instead of the records as they are.
+    """
+    with open(path, 'w') as f:
+        json.dump(chrome_trace(records) if chrome else records, f, indent=4, default=str)
+
+
+def _peak_rss():
+    """
+    Returns the process's peak resident memory in bytes, or None where it can't
+    be read.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
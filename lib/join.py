@@ -0,0 +1,319 @@
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+from .config import CONFIG
+
+
+def key_index(df: pd.DataFrame, keys: list) -> pd.Index:
+    """
+    Returns the join keys of each row as an index, with one level per key column.
+    """
+    if len(keys) == 1:
+        return pd.Index(df[keys[0]])
+    return pd.MultiIndex.from_frame(df[keys])
+
+
+def build_index(df: pd.DataFrame, keys: list) -> dict:
+    """
+    Builds the hash table for one side of a join: the distinct keys, and the rows
+    holding each key grouped together. Missing keys match each other, as in
+    pd.merge.
+
+    Parameters
+    ------------
+    df: pd.DataFrame
+        The build side of the join.
+    keys: list[str]
+        The join key columns.
+
+    Returns
+    ------------
+    dict: 'uniques' keys, each row's key 'codes', and the row 'order', 'starts'
+    and 'counts' of each key's group.
+    """
+    codes, uniques = key_index(df, keys).factorize(use_na_sentinel=False)
+    counts = np.bincount(codes, minlength=len(uniques))
+
+    return {
+        'uniques': uniques,
+        'codes': codes,
+        'order': np.argsort(codes, kind="stable"),
+        'starts': np.cumsum(counts) - counts,
+        'counts': counts
+    }
+
+
+def match_rows(index: dict, probe: pd.Index) -> tuple:
+    """
+    Pairs every probe row with the build rows sharing its key, keeping probe rows
+    without a match.
+
+    Parameters
+    ------------
+    index: dict
+        The build side, from build_index.
+    probe: pd.Index
+        The probe side's keys.
+
+    Returns
+    ------------
+    tuple: Probe and build row positions of each pair, -1 where a side has no
+    row, and the build rows no probe row matched.
+    """
+    found = index['uniques'].get_indexer(probe)
+    matched = found >= 0
+
+    if not len(index['order']):
+        probe_rows = np.arange(len(probe))
+        build_rows = np.full(len(probe), -1)
+    elif index['counts'].max() == 1:
+        # Unique build keys, so each probe row has at most one match
+        probe_rows = np.arange(len(probe))
+        build_rows = np.where(matched, index['order'][index['starts'][np.maximum(found, 0)]], -1)
+    else:
+        repeats = np.ones(len(found), dtype=np.intp)
+        repeats[matched] = index['counts'][found[matched]]
+
+        probe_rows = np.repeat(np.arange(len(probe)), repeats)
+        found = np.repeat(found, repeats)
+        within = np.arange(len(probe_rows)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+
+        positions = np.minimum(index['starts'][np.maximum(found, 0)] + within, len(index['order']) - 1)
+        build_rows = np.where(found >= 0, index['order'][positions], -1)
+
+    hit = np.zeros(len(index['uniques']), dtype=bool)
+    hit[found[found >= 0]] = True
+    unmatched = np.flatnonzero(~hit[index['codes']])
+
+    return probe_rows, build_rows, unmatched
+
+
+def outer_join_rows(left: pd.DataFrame, right: pd.DataFrame, keys: list, right_index: dict = None) -> tuple:
+    """
+    Finds the left and right rows of each output row of a full outer join, in
+    pd.merge(how="outer") order: sorted by key, then by left row, then right row.
+    The hash table is built on the smaller side unless one is given for the right.
+
+    Parameters
+    ------------
+    left: pd.DataFrame
+        The left side.
+    right: pd.DataFrame
+        The right side.
+    keys: list[str]
+        The join key columns.
+    right_index: dict
+        A hash table already built on the right side, from build_index.
+
+    Returns
+    ------------
+    tuple: Left and right row positions of each output row, -1 where missing.
+    """
+    left_rows, right_rows = _match_all(left, right, keys, right_index)
+    order = _merge_order(left, right, keys, left_rows, right_rows)
+
+    return left_rows[order], right_rows[order]
+
+
+def partitioned_outer_join_rows(left: pd.DataFrame, right: pd.DataFrame, keys: list,
+                                partitions: int = None) -> tuple:
+    """
+    Finds the rows of a full outer join one partition of keys at a time, split by
+    the low bits of each key's code, so each hash table stays small enough to
+    probe quickly. Both sides and their keys stay in memory; merges of data too
+    large for memory go through chunked.join_chunked, which partitions on disk.
+
+    Parameters
+    ------------
+    left: pd.DataFrame
+        The left side.
+    right: pd.DataFrame
+        The right side.
+    keys: list[str]
+        The join key columns.
+    partitions: int
+        Number of partitions, defaulting to CONFIG['join']['partitions'].
+
+    Returns
+    ------------
+    tuple: Left and right row positions of each output row, -1 where missing.
+    """
+    partitions = partitions or CONFIG['join']['partitions']
+
+    # Code the keys of both sides together, so equal keys of different dtypes
+    # land in the same partition
+    both = pd.concat([left[keys], right[keys]], ignore_index=True)
+    codes = key_index(both, keys).factorize(use_na_sentinel=False)[0]
+    part = codes % partitions
+
+    sides = []
+    for df, side_part in ((left, part[:len(left)]), (right, part[len(left):])):
+        order = np.argsort(side_part, kind="stable")
+        bounds = np.searchsorted(side_part[order], np.arange(partitions + 1))
+        sides.append((df[keys].take(order).reset_index(drop=True), order, bounds))
+
+    left_parts, right_parts = [], []
+    for p in range(partitions):
+        pieces = [frame.iloc[bounds[p]:bounds[p + 1]].reset_index(drop=True) for frame, _, bounds in sides]
+
+        left_rows, right_rows = _match_all(pieces[0], pieces[1], keys, None)
+        left_parts.append(_source_rows(sides[0], p, left_rows))
+        right_parts.append(_source_rows(sides[1], p, right_rows))
+
+    left_rows = np.concatenate(left_parts)
+    right_rows = np.concatenate(right_parts)
+    order = _merge_order(left, right, keys, left_rows, right_rows)
+
+    return left_rows[order], right_rows[order]
+
+
+def outer_join(left: pd.DataFrame, right: pd.DataFrame, keys: list, right_index: dict = None) -> pd.DataFrame:
+    """
+    Joins two dataframes like pd.merge(how="outer"): keys coalesced, other shared
+    columns suffixed _x and _y, and a fresh range index. Inputs with more than
+    CONFIG['join']['partition_rows'] rows on both sides are joined by partition.
+
+    Parameters
+    ------------
+    left: pd.DataFrame
+        The left side.
+    right: pd.DataFrame
+        The right side.
+    keys: list[str]
+        The join key columns.
+    right_index: dict
+        A hash table already built on the right side, from build_index.
+
+    Returns
+    ------------
+    pd.DataFrame: The joined data.
+    """
+    missing = [key for key in keys if key not in left.columns or key not in right.columns]
+    if missing:
+        raise KeyError(f"Join keys not found: {missing}")
+
+    limit = CONFIG['join']['partition_rows']
+    if right_index is None and min(len(left), len(right)) > limit:
+        left_rows, right_rows = partitioned_outer_join_rows(left, right, keys)
+    else:
+        left_rows, right_rows = outer_join_rows(left, right, keys, right_index)
+
+    shared = [col for col in left.columns if col in right.columns and col not in keys]
+    columns = {}
+    for col in left.columns:
+        if col in keys:
+            columns[col] = _coalesce(left[col], right[col], left_rows, right_rows)
+        else:
+            columns[f"{col}_x" if col in shared else col] = _take(left[col], left_rows)
+    for col in right.columns:
+        if col not in keys:
+            columns[f"{col}_y" if col in shared else col] = _take(right[col], right_rows)
+
+    return pd.DataFrame(columns, index=pd.RangeIndex(len(left_rows)))
+
+
+def join_stored(left: pd.DataFrame, table: dict, keys: list) -> pd.DataFrame:
+    """
+    Outer joins a dataframe with a stored version, reusing the version's hash
+    table for these keys when one was built by an earlier join. A new one is built
+    and kept when the stored version is the smaller side.
+
+    Parameters
+    ------------
+    left: pd.DataFrame
+        The left side.
+    table: dict
+        The stored version's 'df' and its hash tables by key in 'indexes'.
+    keys: list[str]
+        The join key columns.
+
+    Returns
+    ------------
+    pd.DataFrame: The joined data.
+    """
+    right = table['df']
+    index = table['indexes'].get(tuple(keys))
+
+    if index is None and len(right) <= len(left) and len(right) <= CONFIG['join']['partition_rows']:
+        index = table['indexes'][tuple(keys)] = build_index(right, keys)
+
+    return outer_join(left, right, keys, index)
+
+
+def _take(series: pd.Series, rows: np.ndarray):
+    """
+    Gathers values by position, with missing values where the position is -1.
+    """
+    return take(series.array, rows, allow_fill=True)
+
+
+def _coalesce(left: pd.Series, right: pd.Series, left_rows: np.ndarray, right_rows: np.ndarray):
+    """
+    Gathers key values from the left row, or from the right row where there is
+    no left row.
+    """
+    both = pd.concat([left, right], ignore_index=True)
+    return take(both.array, np.where(left_rows >= 0, left_rows, len(left) + right_rows), allow_fill=True)
+
+
+def _match_all(left: pd.DataFrame, right: pd.DataFrame, keys: list, right_index: dict) -> tuple:
+    """
+    Pairs matching rows and appends the unmatched rows of both sides, building
+    the hash table on the smaller side unless one is given for the right.
+    """
+    if right_index is not None or len(right) <= len(left):
+        index = right_index if right_index is not None else build_index(right, keys)
+        left_rows, right_rows, unmatched = match_rows(index, key_index(left, keys))
+        return (np.concatenate([left_rows, np.full(len(unmatched), -1)]),
+                np.concatenate([right_rows, unmatched]))
+
+    right_rows, left_rows, unmatched = match_rows(build_index(left, keys), key_index(right, keys))
+    return (np.concatenate([left_rows, unmatched]),
+            np.concatenate([right_rows, np.full(len(unmatched), -1)]))
+
+
+def _merge_order(left: pd.DataFrame, right: pd.DataFrame, keys: list,
+                 left_rows: np.ndarray, right_rows: np.ndarray) -> np.ndarray:
+    """
+    Orders joined rows by key with missing keys last, then by left row and right
+    row. Rows unmatched on the left come after matched ones.
+    """
+    # Put pairs in left row order first, so one stable sort by key finishes the job
+    by_row = _stable_order(np.where(left_rows < 0, len(left), left_rows))
+    if not (by_row[1:] > by_row[:-1]).all():
+        left_rows, right_rows = left_rows[by_row], right_rows[by_row]
+    else:
+        by_row = None
+
+    if len(keys) == 1:
+        rank, uniques = pd.Index(_coalesce(left[keys[0]], right[keys[0]], left_rows, right_rows)).factorize(sort=True)
+        rank[rank < 0] = len(uniques)
+    else:
+        joined_keys = pd.DataFrame({key: _coalesce(left[key], right[key], left_rows, right_rows) for key in keys})
+        rank = joined_keys.groupby(keys, sort=True, dropna=False).ngroup().to_numpy()
+
+    order = _stable_order(rank)
+    return order if by_row is None else by_row[order]
+
+
+def _stable_order(values: np.ndarray) -> np.ndarray:
+    """
+    Returns the stable sort order of non-negative integers. Pairing each value
+    with its position makes every key distinct, so the much faster unstable sort
+    gives the same order.
+    """
+    n = len(values)
+    if n == 0 or int(values.max()) >= np.iinfo(np.int64).max // n - 1:
+        return np.argsort(values, kind="stable")
+    return np.sort(values.astype(np.int64) * n + np.arange(n)) % n
+
+
+def _source_rows(side: tuple, partition: int, rows: np.ndarray) -> np.ndarray:
+    """
+    Maps row positions within a partition back to positions in the whole side.
+    """
+    _, order, bounds = side
+    positions = order[bounds[partition]:bounds[partition + 1]]
+    if not len(positions):
+        return np.full(len(rows), -1)
+    return np.where(rows >= 0, positions[np.maximum(rows, 0)], -1)
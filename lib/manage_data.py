@@ -3,15 +3,26 @@ import json
 import numpy as np
 from datetime import datetime
 import os
+import threading
 import uuid
+from concurrent.futures import Future
 from .config import CONFIG
+from .version_store import VersionStore
+from .checkpoint_writer import CheckpointWriter
+from .catalog import VersionCatalog, migrate_metadata
+from .version_cache import VersionCache
+from .parquet_io import read_parquet, filter_mask
+from .import_engine import optimize_dtypes, hash_source, read_source, apply_specs, stream_import
+from .chunked import ChunkedFrame, write_batches
+from .plan import changed_columns
+from .instrument import Instrument, record_frame, save_records
 
 class ManageData:
     """
     Handles data cleaning and management for a given client and year.
     """
     
-    def __init__(self, client: str, year: str) -> None:
+    def __init__(self, client: str, year: str, out_of_core: bool = False) -> None:
         """
         Initializes CleanData with client and year, ensuring directory structure exists.
 
@@ -21,80 +32,261 @@ class ManageData:
             The client name.
         year: str
             The year associated with the data.
+        out_of_core: bool
+            Keep the active dataset in a Parquet file instead of memory, for data
+            larger than RAM. `df` is then a ChunkedFrame.
         """
         self.client = client
         self.year = year
+        self.out_of_core = out_of_core
         self.path_id = None
         self.df_id = None
         self.df_list = {}
         self.df = None
         self.transformations = []
+        self.version = None
+        self.clean_df = None
+        self.clean_count = 0
+        self.redo_stack = []
+        self.source_keys = {}
+        self.source_stats = {}
+        self.unsaved_versions = {}
+        self.state_lock = threading.Lock()
 
         data_path = CONFIG['paths']['data']
 
         # Ensure directory structure exists
         self.save_path = f"{data_path}{self.client}/{self.year}/metadata.json"
+        self.catalog_path = f"{data_path}{self.client}/{self.year}/catalog.sqlite"
         self.data_path = f"{data_path}{self.client}/{self.year}/data"
+        self.chunked_path = os.path.join(self.data_path, "chunked")
         os.makedirs(self.data_path, exist_ok=True)
+        if out_of_core:
+            os.makedirs(self.chunked_path, exist_ok=True)
+        self.store = VersionStore(self.data_path)
+        self.writer = CheckpointWriter()
+        self.cache = VersionCache(CONFIG['cache']['max_bytes'])
+        self.instrument = Instrument([self.cache])
 
         # Load previous state if available
         self.load_state()
 
     def load_state(self) -> None:
         """
-        Load saved progress from a JSON file if it exists.
+        Load saved progress from the version catalog, converting a metadata.json
+        file from earlier versions on first use.
         """
-        if os.path.exists(self.save_path):
-            with open(self.save_path, "r") as f:
-                metadata = json.load(f)
-            
-            self.df_list = metadata["df_list"]
-            self.set_active_df(path_id=metadata["path_id"],
-                               df_index=metadata["df_id"])
+        if not os.path.exists(self.catalog_path) and os.path.exists(self.save_path):
+            self.catalog = migrate_metadata(self.save_path, self.catalog_path)
+        else:
+            self.catalog = VersionCatalog(self.catalog_path)
+
+        self.df_list = self.catalog.load_df_list()
+        state = self.catalog.get_state()
+
+        for path_id, dataset in self.df_list.items():
+            self.register_source(path_id, dataset['metadata'])
+
+        if self.df_list and state.get("path_id") in self.df_list:
+            # A state saved by an older version could point past the versions on disk
+            df_index = min(state["df_id"], len(self.df_list[state["path_id"]]['history']) - 1)
+            self.set_active_df(path_id=state["path_id"],
+                               df_index=df_index)
             print(f"🔄 Loaded saved data for {self.client} - {self.year}")
         else:
             print(f"🆕 No savepoint found. Starting fresh for {self.client} - {self.year}")
 
-    def add_checkpoint(self, comment: str = "modified") -> None:
+    def add_checkpoint(self, comment: str = "modified", on_saved=None) -> Future:
         """
-        Saves a checkpoint of the current dataframe.
+        Saves a checkpoint of the current dataframe in the background.
 
         Parameters
         ------------
         comment: str
             A short description of the checkpoint.
+        on_saved: callable
+            Called with the returned Future once the version and metadata are on disk.
+
+        Returns
+        ------------
+        Future: Resolves once the version and metadata are on disk.
         """
-        df_filename = f"{self.path_id}_{len(self.df_list[self.path_id]['history'])}.parquet"
-        df_filepath = os.path.join(self.data_path, df_filename)
-        
-        self.df.to_parquet(df_filepath)
-        
+        df = self.df
+
+        # Columns the recorded operations left alone aren't hashed again; a frame
+        # replaced without recording an operation is checked column by column
+        changed = None
+        if df is self.clean_df or len(self.transformations) > self.clean_count:
+            changed = changed_columns(self.transformations[self.clean_count:])
+
         df_current = {
             'comment': comment,
             'timestamp': str(datetime.now()),
-            'data_path': df_filename,
-            'transformations': self.transformations.copy()
+            'parent': self.df_id,
+            'manifest': None,
+            'transformations': self.transformations.copy(),
+            'metrics': self.instrument.take()
         }
-        self.df_list[self.path_id]['history'].append(df_current)
-        self.save_state()
-    
-    def save_state(self) -> None:
+
+        with self.state_lock:
+            history = self.df_list[self.path_id]['history']
+            history.append(df_current)
+            version_key = (self.path_id, len(history) - 1)
+
+        self.version = self.queue_version(version_key, df_current, df, base=self.version, changed=changed)
+
+        # The new checkpoint becomes the active version, starting a new branch
+        self.df_id = version_key[1]
+        self.redo_stack = []
+        self.mark_clean()
+
+        return self.save_state(on_saved=on_saved)
+
+    def mark_clean(self) -> None:
         """
-        Saves the current state to a JSON file.
+        Records the active dataframe as matching its saved version.
         """
-        metadata = {
-            "client": self.client,
-            "year": self.year,
-            "last_saved": str(datetime.now()),
-            "path_id": self.path_id,
-            "df_id": self.df_id,
-            "df_list": self.df_list
-        }
-        with open(self.save_path, "w") as f:
-            json.dump(metadata, f, indent=4)
+        self.clean_df = self.df
+        self.clean_count = len(self.transformations)
+
+    def is_dirty(self) -> bool:
+        """
+        Checks whether the active dataframe changed since it was loaded or saved,
+        either through a recorded transformation or by being replaced.
+
+        Returns
+        ------------
+        bool: True if the active dataframe has unsaved changes.
+        """
+        return self.df is not self.clean_df or len(self.transformations) != self.clean_count
+
+    def queue_version(self, version_key: tuple, df_current: dict, df: pd.DataFrame, base: dict = None,
+                      changed: set = None, stored: dict = None) -> dict:
+        """
+        Snapshots a dataframe and queues it to be written as a new version.
+        Versions already in the store, such as rows appended in place, only have
+        their history entry saved.
+
+        Parameters
+        ------------
+        version_key: tuple
+            The (path_id, index) of the history entry being written.
+        df_current: dict
+            The history entry, whose manifest is filled in once written.
+        df: pd.DataFrame
+            The dataframe to store.
+        base: dict
+            The version `df` was derived from, or None.
+        changed: set
+            Columns that may differ from `base`, or None when unknown.
+        stored: dict
+            The version, when the store already holds it, as returned by
+            `VersionStore.append_rows`.
+
+        Returns
+        ------------
+        dict: The version, usable as a base right away and completed once written.
+        """
+        if isinstance(df, ChunkedFrame):
+            # Out-of-core data is already in a file, which becomes the version
+            df.temporary = False
+            df_current['data_path'] = os.path.relpath(df.path, self.data_path)
+
+            def record():
+                stats = df.column_stats() if CONFIG['store']['column_stats'] else {}
+                with self.state_lock:
+                    df_current['stats'] = stats
+                    entry = dict(df_current, transformations=list(df_current['transformations']))
+                self.catalog.add_version(*version_key, entry)
+
+            self.writer.submit(record)
+            return {'df': df}
+
+        # Shallow copy: shares column buffers with the working frame instead of copying them
+        version = stored if stored is not None else {'df': df.copy(deep=False)}
+
+        # Versions built on a partially loaded base are only complete once written
+        if base is None or not base.get('omitted'):
+            self.unsaved_versions[version_key] = version
+            self.cache.put(version_key, version)
+
+        def write():
+            write_base = base if base is not None and 'manifest' in base else None
+            timing = []
+            if stored is None:
+                with self.instrument.measure('Wrote Checkpoint', version['df'], records=timing,
+                                             version=version_key[1]):
+                    version.update(self.store.write_version(version['df'], base=write_base, changed=changed))
+
+            with self.state_lock:
+                df_current['manifest'] = version['manifest']
+                df_current['stats'] = version['stats']
+                df_current['metrics'] = list(df_current.get('metrics', [])) + timing
+                entry = dict(df_current, transformations=list(df_current['transformations']))
+
+            self.catalog.add_version(*version_key, entry)
+
+            with self.state_lock:
+                self.unsaved_versions.pop(version_key, None)
+
+        self.writer.submit(write)
+        return version
+
+    def save_state(self, on_saved=None) -> Future:
+        """
+        Saves the active dataset and version to the catalog in the background.
+        Saves requested while an earlier one is still queued are written once.
+
+        Parameters
+        ------------
+        on_saved: callable
+            Called with the returned Future once the state is on disk.
+
+        Returns
+        ------------
+        Future: Resolves once the state is on disk.
+        """
+        return self.writer.submit(self.write_state, key="state", callback=on_saved)
+
+    def write_state(self) -> None:
+        """
+        Writes the active dataset and version to the catalog.
+        """
+        self.catalog.set_state(path_id=self.path_id,
+                               df_id=self.df_id,
+                               last_saved=str(datetime.now()))
         print(f"✅ Progress saved for {self.client} - {self.year}")
 
-    def set_active_df(self, path_id: str, df_index: int) -> None:
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Blocks until every queued checkpoint and state save is on disk.
+
+        Parameters
+        ------------
+        timeout: float
+            Maximum number of seconds to wait, or None to wait indefinitely.
+
+        Returns
+        ------------
+        bool: True if everything was written, False if the timeout expired.
+        """
+        return self.writer.flush(timeout)
+
+    def close(self) -> None:
+        """
+        Writes every queued checkpoint and state save, then stops the checkpoint
+        writer and closes the catalog. Nothing can be saved afterwards.
+        """
+        self.writer.close()
+        self.catalog.close()
+
+    def __enter__(self) -> "ManageData":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def set_active_df(self, path_id: str, df_index: int, columns: list = None, filters: list = None) -> None:
         """
         Sets the active dataframe based on the path_id and index in history.
 
@@ -104,29 +296,258 @@ class ManageData:
             Unique identifier for the dataset.
         df_index: int
             The index of the dataframe version to load.
+        columns: list[str]
+            Columns to load, or None for all of them. Columns left out are kept
+            unchanged in checkpoints made from this version.
+        filters: list[tuple]
+            Row filters as (column, operator, value) tuples that must all hold.
+            They are applied while reading, skipping row groups that can't match,
+            and recorded as the first new transformation.
         """
-        if self.df is not None:
+        if self.out_of_core and columns is not None:
+            raise ValueError("Out-of-core datasets are always loaded with every column.")
+
+        if self.df is not None and self.is_dirty():
             self.add_checkpoint()
-        
+
+        if path_id != self.path_id:
+            self.redo_stack = []
+            # Records left over from the previous dataset led to no version of this one
+            self.instrument.take()
+
         self.path_id = path_id
         self.df_id = df_index
 
+        with self.instrument.measure('Loaded Version', dataset=path_id, version=df_index) as record:
+            if self.out_of_core:
+                self.version = {'df': self.open_chunked(path_id, df_index)}
+                self.df = self.version['df']
+                if filters:
+                    self.df = self.df.filter(filters, self.chunked_file())
+            else:
+                self.version = self.get_version(path_id, df_index, columns=columns, filters=filters)
+                self.df = self.version['df'].copy(deep=False)
+            record_frame(record, 'out', self.df)
+
+        # Copy so later operations don't edit the stored history while it is being saved
+        df_metadata = self.df_list[path_id]['history'][df_index]
+        self.transformations = list(df_metadata['transformations'])
+        self.mark_clean()
+
+        if filters:
+            self.transformations.append({
+                'name': 'Filtered Rows',
+                'predicates': [list(predicate) for predicate in filters]
+            })
+
+    def get_version(self, path_id: str, df_index: int, columns: list = None, filters: list = None) -> dict:
+        """
+        Returns a stored version, from memory when it is queued for writing or
+        cached, otherwise from disk.
+
+        Parameters
+        ------------
+        path_id: str
+            Unique identifier for the dataset.
+        df_index: int
+            The index of the dataframe version.
+        columns: list[str]
+            Columns to load, or None for all of them.
+        filters: list[tuple]
+            Row filters as (column, operator, value) tuples that must all hold.
+
+        Returns
+        ------------
+        dict: The version, usable as the base for the next checkpoint.
+        """
+        version_key = (path_id, df_index)
+        df_metadata = self.df_list[path_id]['history'][df_index]
+
+        with self.state_lock:
+            version = self.unsaved_versions.get(version_key)
+
+        if version is None:
+            version = self.cache.get(version_key)
+
+        if version is not None and columns is None and not filters:
+            return version
+
+        if 'data_path' in df_metadata:
+            # Versions saved before delta checkpoints are single Parquet files,
+            # which can only be loaded whole
+            df_filepath = os.path.join(self.data_path, df_metadata['data_path'])
+            df = pd.read_parquet(df_filepath)
+            version = {'df': df[filter_mask(df, filters)] if filters else df}
+        else:
+            if not df_metadata.get('manifest'):
+                self.flush()
+            if not df_metadata.get('manifest'):
+                raise RuntimeError(f"Version {df_index} of {path_id} could not be written.")
+
+            if version is not None and not filters:
+                version = self.store.project_version(version, columns)
+            else:
+                version = self.store.read_version(df_metadata['manifest'], columns=columns, filters=filters)
+
+        if columns is None and not filters:
+            self.cache.put(version_key, version)
+
+        return version
+
+    def load_version(self, path_id: str, df_index: int, columns: list = None,
+                     filters: list = None, arrow_dtypes: bool = False) -> pd.DataFrame:
+        """
+        Reads part of a stored version without making it active. Only the requested
+        columns and rows are decoded, through memory-mapped Parquet reads.
+
+        Parameters
+        ------------
+        path_id: str
+            Unique identifier for the dataset.
+        df_index: int
+            The index of the dataframe version.
+        columns: list[str]
+            Columns to load, or None for all of them.
+        filters: list[tuple]
+            Row filters as (column, operator, value) tuples that must all hold.
+        arrow_dtypes: bool
+            Keep the Arrow buffers as pandas ArrowDtype columns instead of
+            converting them to NumPy.
+
+        Returns
+        ------------
+        pd.DataFrame: The selected rows and columns.
+        """
+        version_key = (path_id, df_index)
+        df_metadata = self.df_list[path_id]['history'][df_index]
+
+        with self.state_lock:
+            version = self.unsaved_versions.get(version_key)
+
+        if version is None:
+            version = self.cache.get(version_key)
+
+        if version is not None:
+            df = version['df']
+            if filters:
+                df = df[filter_mask(df, filters)]
+            return df[columns] if columns is not None else df.copy(deep=False)
+
+        if 'data_path' in df_metadata:
+            df_filepath = os.path.join(self.data_path, df_metadata['data_path'])
+            return read_parquet(df_filepath, columns=columns, filters=filters, arrow_dtypes=arrow_dtypes)
+
+        if not df_metadata.get('manifest'):
+            self.flush()
+
+        return self.store.read_frame(df_metadata['manifest'], columns=columns,
+                                     filters=filters, arrow_dtypes=arrow_dtypes)
+
+    def undo(self) -> None:
+        """
+        Switches back to the version the active one was derived from, saving any
+        unsaved changes first so they can be restored with `redo`.
+        """
+        if self.df is None:
+            print("❌ Error: No active dataframe.")
+            return
+
+        if self.is_dirty():
+            self.add_checkpoint()
+
+        parent = self.get_parent(self.path_id, self.df_id)
+        if parent is None:
+            print("⚠️ Nothing to undo.")
+            return
+
+        self.redo_stack.append(self.df_id)
+        self.set_active_df(self.path_id, parent)
+
+    def redo(self) -> None:
+        """
+        Switches forward to the version most recently left with `undo`. Saving new
+        changes starts a new branch, which clears what can be redone.
+        """
+        if self.df is not None and self.is_dirty():
+            self.add_checkpoint()
+
+        if not self.redo_stack:
+            print("⚠️ Nothing to redo.")
+            return
+
+        self.set_active_df(self.path_id, self.redo_stack.pop())
+
+    def get_parent(self, path_id: str, df_index: int):
+        """
+        Returns the index of the version another version was derived from.
+
+        Parameters
+        ------------
+        path_id: str
+            Unique identifier for the dataset.
+        df_index: int
+            The index of the dataframe version.
+
+        Returns
+        ------------
+        int: The parent version's index, or None for the raw version.
+        """
         df_metadata = self.df_list[path_id]['history'][df_index]
-        df_filepath = os.path.join(self.data_path, df_metadata['data_path'])
-        self.df = pd.read_parquet(df_filepath)
-        self.transformations = df_metadata['transformations']
 
-    def load_df(self, path: str, df_new: pd.DataFrame) -> None:
+        # History saved before parents were recorded is a straight line
+        default = df_index - 1 if df_index > 0 else None
+        return df_metadata.get('parent', default)
+
+    def load_df(self, path: str, df_new: pd.DataFrame = None, optimize: bool = False, specs: dict = None) -> None:
         """
-        Loads a CSV file and saves its initial state.
+        Loads a CSV file and saves its initial state. When import specs are given,
+        a file already imported with the same contents and specs is reused instead
+        of being parsed and stored again.
 
         Parameters
         ------------
         path: str
             The file path of the CSV to load.
+        df_new: pd.DataFrame
+            The data read from the file, or None to read it here using `specs`.
+        optimize: bool
+            Shrink column dtypes before saving the raw version. Not available out
+            of core.
+        specs: dict
+            The import specs used to read the file.
         """
         if not os.path.exists(path):
             raise FileNotFoundError(f"File not found: {path}")
+
+        if df_new is None and specs is None:
+            raise ValueError("Either df_new or the import specs are required.")
+
+        source_key = None
+        source_stat = None
+        if specs is not None:
+            spec_key = dict(specs, optimize=optimize)
+            source_stat = self.stat_key(path, spec_key)
+            source_key = self.source_stats.get(source_stat) or hash_source(path, spec_key)
+
+            if source_key in self.source_keys:
+                self.source_stats[source_stat] = source_key
+                print(f"♻️ Reusing earlier import of {path}")
+                self.set_active_df(self.source_keys[source_key], df_index=0)
+                self.save_state()
+                return
+
+        # Kept apart from the records of the active dataset, which stay with it
+        timing = []
+        with self.instrument.measure('Imported File', records=timing, source=path) as record:
+            if self.out_of_core:
+                df_new = self.import_chunked(path, df_new, specs)
+            elif df_new is None:
+                df_new = apply_specs(read_source(path, specs), specs)
+
+            if optimize and not self.out_of_core:
+                df_new, _, report = optimize_dtypes(df_new)
+                print(f"🗜️ Memory use reduced from {report['before_bytes']:,} to {report['after_bytes']:,} bytes")
+            record_frame(record, 'out', df_new)
         
         path_id = str(uuid.uuid4())
         df_history = []
@@ -135,30 +556,153 @@ class ManageData:
             'source': path,
             'loaded_at': str(datetime.now()),
         }
-        
-        df_filename = f"{path_id}_0.parquet"
-        df_filepath = os.path.join(self.data_path, df_filename)
-        df_new.to_parquet(df_filepath)
+        if source_key:
+            metadata['source_key'] = source_key
+            metadata['source_stat'] = source_stat
         
         df_current = {
             'comment': 'raw',
             'timestamp': str(datetime.now()),
-            'data_path': df_filename,
-            'transformations': []
+            'parent': None,
+            'manifest': None,
+            'transformations': [],
+            'metrics': timing
         }
         
         df_history.append(df_current)
         
-        self.df_list[path_id] = {
-            'metadata': metadata,
-            'history': df_history
-        }
+        with self.state_lock:
+            self.df_list[path_id] = {
+                'metadata': metadata,
+                'history': df_history
+            }
+        self.register_source(path_id, metadata)
+
+        self.writer.submit(lambda: self.catalog.add_dataset(path_id, metadata))
+        self.queue_version((path_id, 0), df_current, df_new)
         
         self.set_active_df(path_id, df_index=0)
+        self.save_state()
+
+    def import_chunked(self, path: str, df_new: pd.DataFrame = None, specs: dict = None) -> ChunkedFrame:
+        """
+        Writes the raw data of an out-of-core dataset to a Parquet file, streaming
+        the source file chunk by chunk when it hasn't been read yet.
+
+        Parameters
+        ------------
+        path: str
+            The file to import.
+        df_new: pd.DataFrame
+            The data read from the file, or None to read it here using `specs`.
+        specs: dict
+            The import specs used to read the file.
+
+        Returns
+        ------------
+        ChunkedFrame: The raw data.
+        """
+        target = self.chunked_file()
+
+        if df_new is None:
+            stream_import(path, specs, target)
+            return ChunkedFrame(target, temporary=True)
+
+        df_new = df_new.reset_index(drop=True)
+        df_new.columns = [str(col) for col in df_new.columns]
+        return write_batches([df_new], target)
+
+    def open_chunked(self, path_id: str, df_index: int) -> ChunkedFrame:
+        """
+        Returns a stored version as an out-of-core dataset. Versions kept as
+        column blobs are copied into a Parquet file a batch at a time on first use.
+
+        Parameters
+        ------------
+        path_id: str
+            Unique identifier for the dataset.
+        df_index: int
+            The index of the dataframe version.
+
+        Returns
+        ------------
+        ChunkedFrame: The version's data.
+        """
+        df_metadata = self.df_list[path_id]['history'][df_index]
+
+        if 'data_path' in df_metadata:
+            return ChunkedFrame(os.path.join(self.data_path, df_metadata['data_path']))
+
+        if not df_metadata.get('manifest'):
+            self.flush()
+        if not df_metadata.get('manifest'):
+            raise RuntimeError(f"Version {df_index} of {path_id} could not be written.")
+
+        target = os.path.join(self.chunked_path, f"{path_id}_{df_index}.parquet")
+        if not os.path.exists(target):
+            batches = (batch.reset_index(drop=True) for batch in
+                       self.store.iter_frames(df_metadata['manifest'], CONFIG['store']['row_group_rows']))
+            write_batches(batches, target, temporary=False)
+
+        return ChunkedFrame(target)
+
+    def chunked_file(self) -> str:
+        """
+        Returns a new file name for out-of-core data.
+        """
+        return os.path.join(self.chunked_path, f"{uuid.uuid4()}.parquet")
+
+    def window(self, start: int = 0, stop: int = None) -> pd.DataFrame:
+        """
+        Returns a range of rows of the active dataframe for display. Out of core,
+        only those rows are read.
+
+        Parameters
+        ------------
+        start: int
+            Position of the first row.
+        stop: int
+            Position after the last row, defaulting to
+            CONFIG['chunked']['window_rows'] rows from the start.
+
+        Returns
+        ------------
+        pd.DataFrame: The rows, or None without an active dataframe.
+        """
+        if self.df is None:
+            return None
+
+        stop = start + CONFIG['chunked']['window_rows'] if stop is None else stop
+        if isinstance(self.df, ChunkedFrame):
+            return self.df.window(start, stop)
+
+        return self.df.iloc[start:stop]
+
+    def register_source(self, path_id: str, metadata: dict) -> None:
+        """
+        Indexes a dataset by the content hash of its source file, and by the file's
+        path, size and modification time so unchanged files skip rehashing.
+        """
+        if metadata.get('source_key'):
+            self.source_keys[metadata['source_key']] = path_id
+        if metadata.get('source_stat'):
+            self.source_stats[metadata['source_stat']] = metadata['source_key']
+
+    @staticmethod
+    def stat_key(path: str, specs: dict) -> str:
+        """
+        Returns a key for a file's path, size and modification time with the specs.
+        """
+        stat = os.stat(path)
+        spec_text = json.dumps(specs, sort_keys=True, default=str)
+        return f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{spec_text}"
 
     def get_active_df_info(self) -> dict:
         """
-        Returns metadata about the currently active dataframe.
+        Returns metadata about the currently active dataframe, with the column
+        statistics saved with its checkpoint. The statistics describe the
+        checkpoint as saved, without any changes made since, and are None until
+        it has been written.
 
         Returns
         ------------
@@ -168,6 +712,8 @@ class ManageData:
             return {"message": "No active dataframe."}
         
         metadata = self.df_list[self.path_id]["metadata"]
+        with self.state_lock:
+            stats = self.df_list[self.path_id]["history"][self.df_id].get("stats")
         return {
             "client": self.client,
             "year": self.year,
@@ -176,5 +722,53 @@ class ManageData:
             "active_dataset": self.path_id,
             "active_version": self.df_id,
             "rows": len(self.df),
-            "columns": list(self.df.columns)
-        }
\ No newline at end of file
+            "columns": list(self.df.columns),
+            "column_stats": stats
+        }
+
+    def get_metrics(self, path_id: str = None, df_index: int = None) -> list:
+        """
+        Returns the time, memory, rows and cache hits recorded for each operation
+        that led to a version, including writing it.
+
+        Parameters
+        ------------
+        path_id: str
+            Unique identifier for the dataset, defaulting to the active one.
+        df_index: int
+            The index of the version, or None for the operations not saved in a
+            checkpoint yet.
+
+        Returns
+        ------------
+        list[dict]: One record per operation, oldest first.
+        """
+        if df_index is None:
+            return self.instrument.pending()
+
+        history = self.df_list[path_id or self.path_id]['history']
+        return list(history[df_index].get('metrics', []))
+
+    def export_metrics(self, path: str, path_id: str = None, chrome: bool = True) -> None:
+        """
+        Saves the operation records of every version of a dataset, with those not
+        saved yet for the active dataset, as a Chrome trace or plain JSON.
+
+        Parameters
+        ------------
+        path: str
+            The JSON file to write.
+        path_id: str
+            Unique identifier for the dataset, defaulting to the active one.
+        chrome: bool
+            Write the Chrome trace event format, viewable in chrome://tracing or
+            Perfetto, instead of the records as they are.
+        """
+        path_id = path_id or self.path_id
+        records = [record for entry in self.df_list[path_id]['history'] for record in entry.get('metrics', [])]
+        if path_id == self.path_id:
+            records += self.instrument.pending()
+
+        records.sort(key=lambda record: record['started'])
+        save_records(records, path, chrome)
+        print(f"✅ Saved {len(records):,} operation records to {path}")
@@ -211,6 +211,8 @@ class DataCleanerApp(QMainWindow):
             self.status_label.setText("⚠️ Please select a valid client and year.")
             return
         
+        if self.cleaner:
+            self.cleaner.close()
         self.cleaner = CleanData(client=selected_client, year=selected_year)
         self.status_label.setText(f"✅ Loaded data for {selected_client} - {selected_year}")
 
@@ -302,9 +304,9 @@ class DataCleanerApp(QMainWindow):
         return addColumnSection
 
     def display_dataframe(self):
-        """Display the loaded DataFrame in the table widget."""
-        if self.cleaner.df is not None and not self.cleaner.df.empty:
-            df = self.cleaner.df
+        """Display the loaded DataFrame in the table widget, or its first rows out of core."""
+        df = self.cleaner.window() if self.cleaner.out_of_core else self.cleaner.df
+        if df is not None and not df.empty:
             self.table_widget.setRowCount(df.shape[0])
             self.table_widget.setColumnCount(df.shape[1])
             self.table_widget.setHorizontalHeaderLabels(df.columns)
@@ -336,11 +338,15 @@ class DataCleanerApp(QMainWindow):
         """Merge another CSV into the existing DataFrame."""
         file_path, _ = QFileDialog.getOpenFileName(self, "Open CSV to Merge", "", "CSV Files (*.csv)")
         if file_path:
-            merge_df = pd.read_csv(file_path)
-            if self.cleaner.df is not None:
-                self.cleaner.df = pd.concat([self.cleaner.df, merge_df], ignore_index=True)
-            else:
-                self.cleaner.df = merge_df
+            try:
+                merge_df = pd.read_csv(file_path)
+                if self.cleaner.df is not None:
+                    self.cleaner.append_rows(file_path, merge_df)
+                else:
+                    self.cleaner.df = merge_df
+            except Exception as e:
+                self.status_label.setText(f"❌ Error merging {os.path.basename(file_path)}: {e}")
+                return
             self.display_dataframe()
 
     def export_csv(self):
@@ -0,0 +1,149 @@
+import operator
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+FILTER_OPS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'in': lambda series, value: series.isin(value),
+    'not in': lambda series, value: ~series.isin(value),
+}
+
+
+def read_parquet(path: str, columns: list = None, filters: list = None, arrow_dtypes: bool = False) -> pd.DataFrame:
+    """
+    Reads a Parquet file through a memory map, decoding only the requested columns
+    and the rows that pass the filters.
+
+    Parameters
+    ------------
+    path: str
+        The Parquet file to read.
+    columns: list[str]
+        Columns to load, or None for all of them.
+    filters: list[tuple]
+        Row filters as (column, operator, value) tuples that must all hold, with
+        operators from FILTER_OPS.
+    arrow_dtypes: bool
+        Keep the Arrow buffers as pandas ArrowDtype columns instead of converting
+        them to NumPy, avoiding a copy of the data.
+
+    Returns
+    ------------
+    pd.DataFrame: The loaded data.
+    """
+    table = pq.read_table(path, columns=columns, filters=filters or None, memory_map=True)
+    return table_to_pandas(table, arrow_dtypes)
+
+
+def table_to_pandas(table, arrow_dtypes: bool = False) -> pd.DataFrame:
+    """
+    Converts an Arrow table to pandas without consolidating columns into blocks.
+
+    Parameters
+    ------------
+    table: pyarrow.Table
+        The table to convert.
+    arrow_dtypes: bool
+        Keep the Arrow buffers as pandas ArrowDtype columns.
+
+    Returns
+    ------------
+    pd.DataFrame: The converted data.
+    """
+    if arrow_dtypes:
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    return table.to_pandas(split_blocks=True)
+
+
+def filter_mask(data, filters: list) -> np.ndarray:
+    """
+    Evaluates row filters against in-memory columns.
+
+    Parameters
+    ------------
+    data: pd.DataFrame or dict
+        Columns referenced by the filters.
+    filters: list[tuple]
+        Row filters as (column, operator, value) tuples that must all hold.
+
+    Returns
+    ------------
+    np.ndarray: Boolean mask of the rows passing every filter.
+    """
+    mask = None
+
+    for col, op, value in filters:
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unsupported filter operator: {op}")
+
+        passed = FILTER_OPS[op](pd.Series(data[col], copy=False), value)
+        passed = passed.fillna(False).to_numpy(dtype=bool)
+        mask = passed if mask is None else mask & passed
+
+    return mask
+
+
+def row_group_may_match(row_group, op: str, value, column: int = 0) -> bool:
+    """
+    Checks a row group's min/max statistics against a row filter. A False means
+    no row in the group can pass; a True means some might.
+
+    Parameters
+    ------------
+    row_group: pyarrow.parquet.RowGroupMetaData
+        Metadata of a row group.
+    op: str
+        The filter operator, from FILTER_OPS.
+    value:
+        The value compared against, or the list of values for `in` and `not in`.
+    column: int
+        Position of the filtered column in the file.
+
+    Returns
+    ------------
+    bool: Whether the row group has to be read.
+    """
+    stats = row_group.column(column).statistics
+    if stats is None:
+        return True
+
+    nulls = stats.null_count if stats.has_null_count else None
+
+    try:
+        if op in ('!=', 'not in'):
+            # Missing values pass these, so only a group holding nothing but an
+            # excluded value can be skipped
+            if nulls != 0 or not stats.has_min_max or stats.min != stats.max:
+                return True
+            return bool(stats.min != value) if op == '!=' else stats.min not in list(value)
+
+        if not stats.has_min_max:
+            return nulls != row_group.num_rows
+
+        low, high = stats.min, stats.max
+        if op == '==':
+            return bool(low <= value <= high)
+        if op == 'in':
+            # `in` matches missing values when it lists one
+            return any(pd.isna(item) or low <= item <= high for item in value)
+        if op == '<':
+            return bool(low < value)
+        if op == '<=':
+            return bool(low <= value)
+        if op == '>':
+            return bool(high > value)
+        if op == '>=':
+            return bool(high >= value)
+    except (TypeError, ValueError):
+        # Values that can't be compared with the statistics, such as text
+        # against numbers, are left to the exact filter
+        return True
+
+    return True
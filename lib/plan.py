@@ -0,0 +1,209 @@
+import ast
+import pandas as pd
+from .expressions import compile_formula, evaluate
+from .dedup import drop_duplicate_rows
+from .join import join_stored
+from .parquet_io import filter_mask
+
+# Steps a row filter can be moved in front of without changing the result
+FILTER_PASSES = ('Added Column', 'Removed Duplicates')
+
+
+def filter_query(filters: dict) -> str:
+    """
+    Builds a DataFrame.query string from a filter dictionary.
+
+    Parameters
+    ------------
+    filters: dict
+        Column names mapped to filter expressions, such as {'a': '> 5'}.
+
+    Returns
+    ------------
+    str: The conditions joined with &.
+    """
+    return " & ".join(f"{col} {expr}" for col, expr in filters.items())
+
+
+def step_reads(step: dict):
+    """
+    Returns the columns a recorded transformation reads, or None when it may
+    read any of them.
+    """
+    if step['name'] == 'Added Column':
+        return set(compile_formula(step['formula'])['columns'])
+
+    if step['name'] == 'Filtered Rows' and 'predicates' in step:
+        return {col for col, _, _ in step['predicates']}
+
+    if step['name'] == 'Filtered Rows':
+        try:
+            tree = ast.parse(filter_query(step['filters']), mode="eval")
+        except SyntaxError:
+            return None
+        return {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+
+    return None
+
+
+def changed_columns(steps: list):
+    """
+    Returns the columns recorded transformations may have added or given new
+    values, or None when they may have changed any column. Filters and duplicate
+    removal only drop rows, so they change no column.
+    """
+    changed = set()
+    for step in steps:
+        if step['name'] == 'Added Column':
+            changed.add(step['column_name'])
+        elif step['name'] not in ('Filtered Rows', 'Removed Duplicates'):
+            return None
+
+    return changed
+
+
+def optimize_plan(steps: list) -> list:
+    """
+    Rewrites recorded transformations into as few passes over the data as
+    possible. Filters move ahead of column additions that they do not read and
+    of duplicate removal on their key columns, consecutive filters share one row
+    selection, consecutive column additions are evaluated together, and columns
+    overwritten before anything reads them are never computed. Columns are not
+    pruned from reads: every transformation keeps all columns in its output, so
+    each stage needs the whole frame.
+
+    Parameters
+    ------------
+    steps: list[dict]
+        Transformations as recorded in history.
+
+    Returns
+    ------------
+    list[dict]: Execution stages, each a 'filter', 'columns', 'dedup' or 'merge'.
+    """
+    steps = list(steps)
+
+    # Push filters towards the start of the plan
+    for i in range(len(steps)):
+        if steps[i]['name'] != 'Filtered Rows':
+            continue
+        reads = step_reads(steps[i])
+        j = i
+        while j > 0 and reads is not None and steps[j - 1]['name'] in FILTER_PASSES:
+            if steps[j - 1]['name'] == 'Added Column' and steps[j - 1]['column_name'] in reads:
+                break
+            # Deduplicating on a subset keeps one row per key, so only filters on
+            # the key columns pass the whole group or none of it
+            if steps[j - 1]['name'] == 'Removed Duplicates' and steps[j - 1].get('subset') \
+                    and not reads <= set(steps[j - 1]['subset']):
+                break
+            steps[j - 1], steps[j] = steps[j], steps[j - 1]
+            j -= 1
+
+    stages = []
+    for step in steps:
+        last = stages[-1] if stages else None
+
+        if step['name'] == 'Filtered Rows':
+            if not (last and last['name'] == 'filter'):
+                last = {'name': 'filter', 'queries': [], 'predicates': []}
+                stages.append(last)
+            if 'predicates' in step:
+                last['predicates'].extend(tuple(predicate) for predicate in step['predicates'])
+            else:
+                last['queries'].append(filter_query(step['filters']))
+
+        elif step['name'] == 'Added Column':
+            name, formula = step['column_name'], step['formula']
+            # A column can't join the stage if it replaces one the stage already reads
+            if not (last and last['name'] == 'columns') or _is_read(last['formulas'], name) or (
+                    name in last['formulas'] and _is_read({name: formula}, name)):
+                last = {'name': 'columns', 'formulas': {}}
+                stages.append(last)
+            # An earlier definition nothing has read yet is dead
+            last['formulas'].pop(name, None)
+            last['formulas'][name] = formula
+
+        elif step['name'] == 'Removed Duplicates':
+            stages.append({'name': 'dedup', 'subset': step.get('subset'), 'keep': step.get('keep', 'first')})
+
+        elif step['name'] == 'Merged DataFrame':
+            stages.append({'name': 'merge', 'dataset': step['dataset'], 'version': step.get('version'),
+                           'columns': step['columns'], 'load_columns': step.get('load_columns')})
+
+        else:
+            raise ValueError(f"Cannot plan transformation: {step['name']}")
+
+    return stages
+
+
+def execute_plan(df: pd.DataFrame, steps: list, load_dataset) -> pd.DataFrame:
+    """
+    Optimizes and runs recorded transformations against a dataframe.
+
+    Parameters
+    ------------
+    df: pd.DataFrame
+        The data before the transformations.
+    steps: list[dict]
+        Transformations as recorded in history.
+    load_dataset: callable
+        Returns a stored version for merges as a dict with its 'df', given the
+        path_id, version index or None for the latest, and columns to load.
+
+    Returns
+    ------------
+    pd.DataFrame: The transformed data.
+    """
+    for stage in optimize_plan(steps):
+        df = run_stage(df, stage, load_dataset)
+
+    return df
+
+
+def run_stage(df: pd.DataFrame, stage: dict, load_dataset) -> pd.DataFrame:
+    """
+    Runs one stage of an optimized plan against a dataframe.
+
+    Parameters
+    ------------
+    df: pd.DataFrame
+        The data before the stage.
+    stage: dict
+        A stage from optimize_plan.
+    load_dataset: callable
+        Returns a stored version for merges, as for execute_plan.
+
+    Returns
+    ------------
+    pd.DataFrame: The data after the stage.
+    """
+    if stage['name'] == 'filter':
+        mask = filter_mask(df, stage['predicates']) if stage['predicates'] else None
+        for query in stage['queries']:
+            passed = df.eval(query)
+            mask = passed if mask is None else mask & passed
+        if not mask.all():
+            df = df[mask]
+
+    elif stage['name'] == 'columns':
+        results = evaluate(df, stage['formulas'])
+        df = df.copy(deep=False)
+        for name, values in results.items():
+            df[name] = values
+
+    elif stage['name'] == 'dedup':
+        df = drop_duplicate_rows(df, stage['subset'], stage['keep'])
+
+    elif stage['name'] == 'merge':
+        table = load_dataset(stage['dataset'], stage['version'], stage['load_columns'])
+        df = join_stored(df, table, stage['columns'])
+
+    return df
+
+
+def _is_read(formulas: dict, name: str) -> bool:
+    """
+    Checks whether any formula in a stage reads a column.
+    """
+    return any(name in compile_formula(formula)['columns'] for formula in formulas.values())
@@ -0,0 +1,354 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import pandas as pd
+from .config import CONFIG, ClientPath
+from .catalog import VersionCatalog, migrate_metadata
+from .clean_data import CleanData
+from .batch_import import find_sources
+
+
+def recorded_transformations(client: str, year: str, path_id: str = None, df_index: int = None) -> list:
+    """
+    Returns the transformations recorded for a checkpoint, without loading any data.
+
+    Parameters
+    ------------
+    client: str
+        The client name.
+    year: str
+        The year the checkpoint belongs to.
+    path_id: str
+        Unique identifier for the dataset, defaulting to the active one.
+    df_index: int
+        The index of the version, defaulting to the active one.
+
+    Returns
+    ------------
+    list[dict]: The transformations that produced the checkpoint from its raw data.
+    """
+    data_path = CONFIG['paths']['data']
+    catalog_path = f"{data_path}{client}/{year}/catalog.sqlite"
+    save_path = f"{data_path}{client}/{year}/metadata.json"
+
+    if not os.path.exists(catalog_path) and os.path.exists(save_path):
+        catalog = migrate_metadata(save_path, catalog_path)
+    elif os.path.exists(catalog_path):
+        catalog = VersionCatalog(catalog_path)
+    else:
+        raise FileNotFoundError(f"No saved data for {client} - {year}")
+
+    try:
+        if path_id is None:
+            state = catalog.get_state()
+            path_id = state.get("path_id")
+            df_index = state.get("df_id") if df_index is None else df_index
+        entry = catalog.get_version(path_id, df_index)
+    finally:
+        catalog.close()
+
+    if entry is None:
+        raise KeyError(f"Version {df_index} of {path_id} not found for {client} - {year}")
+
+    return list(entry['transformations'])
+
+
+def check_replayable(transformations: list) -> None:
+    """
+    Checks that a transformation chain can run on other data. Merges can't,
+    since they name a dataset of the client and year they were recorded in.
+
+    Parameters
+    ------------
+    transformations: list[dict]
+        The transformations, as recorded in history.
+    """
+    for position, step in enumerate(transformations, start=1):
+        if step['name'] == 'Merged DataFrame':
+            raise ValueError(f"Step {position} merges dataset {step['dataset']} of the data it was recorded on, "
+                             f"which other clients and years don't have; remove the merge to replay the chain.")
+
+
+def save_pipeline(client: str, name: str, transformations: list, spec_name: str = None) -> str:
+    """
+    Saves a transformation chain as a named pipeline under the client's
+    named_specs, so it can be replayed on other data.
+
+    Parameters
+    ------------
+    client: str
+        The client name.
+    name: str
+        The pipeline name.
+    transformations: list[dict]
+        The transformations, as recorded in history.
+    spec_name: str
+        Name of the saved import spec that reads the raw files, if any.
+
+    Returns
+    ------------
+    str: Path of the saved pipeline.
+    """
+    check_replayable(transformations)
+    pipeline_path = ClientPath(client).get('named_specs', 'pipeline', create=True, spec_name=name)
+
+    with open(pipeline_path, 'w') as f:
+        json.dump({'spec_name': spec_name, 'transformations': transformations}, f, indent=4)
+
+    return pipeline_path
+
+
+def load_pipeline(client: str, name: str) -> dict:
+    """
+    Loads a named pipeline saved with save_pipeline.
+
+    Parameters
+    ------------
+    client: str
+        The client name.
+    name: str
+        The pipeline name.
+
+    Returns
+    ------------
+    dict: The pipeline's 'transformations' and import 'spec_name'.
+    """
+    pipeline_path = ClientPath(client).get('named_specs', 'pipeline', spec_name=name)
+
+    with open(pipeline_path, 'r') as f:
+        return json.load(f)
+
+
+def replay_job(client: str, year: str, sources: list, transformations: list,
+               spec_name: str = None, comment: str = "replayed") -> dict:
+    """
+    Loads raw files for one client and year, applies a transformation chain to
+    each and saves the results as checkpoints, one file after another since they
+    share the year's catalog. Errors are returned in the result instead of
+    raised, so one bad file or job does not stop a replay.
+
+    Parameters
+    ------------
+    client: str
+        The client name.
+    year: str
+        The year the files belong to.
+    sources: list[str or tuple]
+        Raw files to clean: files read with an import spec, or Parquet files
+        written by an earlier import when there is none. A (file, spec_name)
+        pair names the spec for that file.
+    transformations: list[dict]
+        The transformations, as recorded in history.
+    spec_name: str
+        Name of the saved import spec that reads files given without one.
+    comment: str
+        Comment for the saved checkpoints.
+
+    Returns
+    ------------
+    dict: The job summary with a 'status' of 'ok' or 'error' and one result per
+    source.
+    """
+    start = time.perf_counter()
+    results = []
+
+    try:
+        check_replayable(transformations)
+        cleaner = CleanData(client, year)
+    except Exception as e:
+        return _job_result(client, year, results, start, f"{type(e).__name__}: {e}")
+
+    with cleaner:
+        loaded_specs = {}
+        for source in sources:
+            source, source_spec = source if isinstance(source, (tuple, list)) else (source, spec_name)
+            source_start = time.perf_counter()
+            try:
+                specs = None
+                if source_spec:
+                    if source_spec not in loaded_specs:
+                        with open(ClientPath(client).get('named_specs', 'specs', spec_name=source_spec), 'r') as f:
+                            loaded_specs[source_spec] = json.load(f)
+                    specs = loaded_specs[source_spec]
+
+                if specs is not None:
+                    cleaner.load_df(source, specs=specs)
+                else:
+                    cleaner.load_df(source, df_new=pd.read_parquet(source))
+                rows_before = len(cleaner.df)
+
+                cleaner.apply([dict(step) for step in transformations])
+                cleaner.add_checkpoint(comment)
+                cleaner.flush()
+
+                results.append({
+                    'source': source,
+                    'spec_name': source_spec,
+                    'status': 'ok',
+                    'path_id': cleaner.path_id,
+                    'df_id': cleaner.df_id,
+                    'rows_before': rows_before,
+                    'rows_after': len(cleaner.df),
+                    'seconds': time.perf_counter() - source_start,
+                    'metrics': cleaner.get_metrics(cleaner.path_id, cleaner.df_id)
+                })
+            except Exception as e:
+                results.append({
+                    'source': source,
+                    'spec_name': source_spec,
+                    'status': 'error',
+                    'error': f"{type(e).__name__}: {e}",
+                    'seconds': time.perf_counter() - source_start
+                })
+
+    return _job_result(client, year, results, start)
+
+
+def replay(jobs: list, transformations: list = None, pipeline: str = None, workers: int = None,
+           progress=None) -> dict:
+    """
+    Replays a transformation chain on many client/year pairs in parallel, one
+    process per core by default. Sources of the same client and year run in one
+    process, one after another, since they share a catalog and report, whatever
+    import spec reads them. Each client's report is saved under its years.
+    Chains with merges are rejected before anything runs.
+
+    Parameters
+    ------------
+    jobs: list[dict]
+        One dict per client and year with 'client', 'year' and the raw files in
+        'sources' (files, directories or glob patterns), and optionally the
+        'spec_name' of the import spec that reads them.
+    transformations: list[dict]
+        The chain to apply, as recorded in history.
+    pipeline: str
+        Name of a pipeline saved for each job's client, used instead of
+        `transformations`.
+    workers: int
+        Number of worker processes, defaulting to the number of cores.
+    progress: callable
+        Called with (done, total, result) as each job finishes.
+
+    Returns
+    ------------
+    dict: The replay report with one result per job.
+    """
+    if (transformations is None) == (pipeline is None):
+        raise ValueError("Give either the transformations or a pipeline name.")
+
+    if transformations is not None:
+        check_replayable(transformations)
+
+    start = time.perf_counter()
+    results = []
+    futures = {}
+
+    # Jobs for the same client and year share a catalog, so they run together,
+    # each file keeping the import spec of the job that listed it
+    merged = {}
+    for job in jobs:
+        sources = [job['sources']] if isinstance(job['sources'], str) else list(job['sources'])
+        merged.setdefault((job['client'], str(job['year'])), []).append((sources, job.get('spec_name')))
+    jobs = [{'client': client, 'year': year, 'sources': sources}
+            for (client, year), sources in merged.items()]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for job in jobs:
+            client, year = job['client'], job['year']
+            try:
+                steps, default_spec = transformations, None
+                if pipeline is not None:
+                    saved = load_pipeline(client, pipeline)
+                    steps, default_spec = saved['transformations'], saved.get('spec_name')
+                    check_replayable(steps)
+
+                sources = [(source, spec_name or default_spec)
+                           for patterns, spec_name in job['sources'] for source in find_sources(patterns)]
+                future = executor.submit(replay_job, client, year, sources,
+                                         steps, None, f"replayed {pipeline or 'transformations'}")
+                futures[future] = (client, year)
+            except Exception as e:
+                results.append(_job_result(client, year, [], start, f"{type(e).__name__}: {e}"))
+                if progress:
+                    progress(len(results), len(jobs), results[-1])
+
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process died, taking only this job with it
+                result = _job_result(*futures[future], [], start, f"{type(e).__name__}: {e}")
+            results.append(result)
+            if progress:
+                progress(len(results), len(jobs), result)
+
+    results.sort(key=lambda result: (result['client'], result['year']))
+    report = {
+        'pipeline': pipeline,
+        'finished_at': str(datetime.now()),
+        'seconds': time.perf_counter() - start,
+        'jobs': len(jobs),
+        'succeeded': sum(result['status'] == 'ok' for result in results),
+        'failed': sum(result['status'] == 'error' for result in results),
+        'results': results
+    }
+
+    for result in results:
+        report_path = ClientPath(result['client']).get('years', 'replay_report', create=True, year=result['year'])
+        with open(report_path, 'w') as f:
+            json.dump(dict(report, results=[result]), f, indent=4)
+
+    return report
+
+
+def print_progress(done: int, total: int, result: dict) -> None:
+    """
+    Prints one line per finished job.
+    """
+    name = f"{result['client']} - {result['year']}"
+    if result['status'] == 'ok':
+        print(f"✅ [{done}/{total}] {name}: {len(result['sources'])} files in {result['seconds']:.1f}s")
+    else:
+        print(f"❌ [{done}/{total}] {name}: {result['error']}")
+
+
+def _job_result(client: str, year: str, sources: list, start: float, error: str = None) -> dict:
+    """
+    Summarizes a job from its per-source results. A job fails when it could not
+    start or any of its sources failed.
+    """
+    failed = [source for source in sources if source['status'] == 'error']
+    if error is None and failed:
+        error = f"{len(failed)} of {len(sources)} files failed: {failed[0]['error']}"
+
+    result = {
+        'client': client,
+        'year': str(year),
+        'status': 'error' if error else 'ok',
+        'sources': sources,
+        'seconds': time.perf_counter() - start
+    }
+    if error:
+        result['error'] = error
+
+    return result
+
+
+if __name__ == "__main__":
+    # Usage: python -m lib.replay PIPELINE JOBS_FILE [--workers N]
+    # JOBS_FILE is a JSON list of {"client", "year", "sources"} objects
+    parser = argparse.ArgumentParser(description="Replay a named pipeline on many clients and years in parallel.")
+    parser.add_argument("pipeline")
+    parser.add_argument("jobs_file")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.jobs_file, 'r') as f:
+        jobs = json.load(f)
+
+    report = replay(jobs, pipeline=args.pipeline, workers=args.workers, progress=print_progress)
+    print(f"Replayed {report['succeeded']} of {report['jobs']} jobs in {report['seconds']:.1f}s, "
+          f"{report['failed']} failed")
@@ -0,0 +1,164 @@
+from collections import OrderedDict
+import threading
+import numpy as np
+import pandas as pd
+
+# Rows measured to estimate the size of the text held by object columns
+SAMPLE_ROWS = 1_000
+
+
+def estimate_bytes(df: pd.DataFrame) -> int:
+    """
+    Estimates the memory a dataframe holds without visiting every value. Column
+    buffers are counted exactly; the Python objects referenced by object columns
+    are measured on evenly spread sample rows and scaled up.
+
+    Parameters
+    ------------
+    df: pd.DataFrame
+        The dataframe.
+
+    Returns
+    ------------
+    int: The estimated size in bytes.
+    """
+    nbytes = int(df.memory_usage(index=True, deep=False).sum())
+    if not len(df):
+        return nbytes
+
+    sample = df
+    if len(df) > SAMPLE_ROWS:
+        sample = df.iloc[np.linspace(0, len(df) - 1, SAMPLE_ROWS).astype(np.int64)]
+
+    scale = len(df) / len(sample)
+
+    # Objects referenced by the sampled rows, beyond their pointers
+    extra = (sample.memory_usage(index=False, deep=True).to_numpy()
+             - sample.memory_usage(index=False, deep=False).to_numpy())
+    for position, dtype in enumerate(df.dtypes):
+        if isinstance(dtype, pd.CategoricalDtype):
+            # Categories are shared by every row, so they are counted once
+            nbytes += int(df.iloc[:, position].cat.categories.memory_usage(deep=True))
+        else:
+            nbytes += int(extra[position] * scale)
+
+    nbytes += int((sample.index.memory_usage(deep=True) - sample.index.memory_usage(deep=False)) * scale)
+    return nbytes
+
+
+class VersionCache:
+    """
+    In-memory cache of loaded dataframe versions with a byte budget.
+
+    Versions are evicted least recently used first once their combined memory
+    footprint exceeds the budget.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        """
+        Initializes an empty cache.
+
+        Parameters
+        ------------
+        max_bytes: int
+            Memory budget for all cached versions, in bytes.
+        """
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: tuple):
+        """
+        Returns a cached version and marks it as recently used.
+
+        Parameters
+        ------------
+        key: tuple
+            The (path_id, df_id) of the version.
+
+        Returns
+        ------------
+        dict: The cached version, or None on a miss.
+        """
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key][0]
+
+    def put(self, key: tuple, version: dict) -> None:
+        """
+        Adds a version, evicting older ones until the cache fits its budget.
+        Versions larger than the whole budget are not cached.
+
+        Parameters
+        ------------
+        key: tuple
+            The (path_id, df_id) of the version.
+        version: dict
+            The version to cache; its "df" is used to estimate its size.
+        """
+        nbytes = estimate_bytes(version['df'])
+
+        with self.lock:
+            self._remove(key)
+            if nbytes > self.max_bytes:
+                return
+
+            self.entries[key] = (version, nbytes)
+            self.total_bytes += nbytes
+
+            while self.total_bytes > self.max_bytes:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def discard(self, key: tuple) -> None:
+        """
+        Removes a version from the cache if present.
+        """
+        with self.lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        """
+        Removes every cached version.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Returns hit/miss counts and memory use, for tuning the budget.
+
+        Returns
+        ------------
+        dict: Cache statistics.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "versions": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def _remove(self, key: tuple) -> None:
+        """
+        Drops an entry and its size from the totals. Caller holds the lock.
+        """
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
@@ -0,0 +1,824 @@
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .config import CONFIG
+from .bloom import build_bloom, bloom_contains
+from .column_stats import sketch_column, merge_sketches, summarize, dumps_sketch, loads_sketch
+from .parquet_io import read_parquet, table_to_pandas, filter_mask, row_group_may_match
+
+
+class VersionStore:
+    """
+    Stores dataframe versions as column-level deltas.
+
+    Every column is written once as its own Parquet blob, named by a hash of its
+    contents, so versions that share a column share the file on disk. A version
+    is described by a manifest listing which blob holds each column. Filters are
+    stored as boolean row masks over the previous version's rows instead of
+    rewriting the surviving rows of every column.
+
+    Blobs are split into row groups of CONFIG['store']['row_group_rows'] rows,
+    and text and integer columns get a Bloom filter per row group, so reads with
+    row filters skip the groups that can't match.
+
+    Each version's columns get statistics, from a sketch saved under the hash of
+    the column's values, so a column kept unchanged or renamed is never
+    summarized twice and appended rows only add to the sketch of their column.
+    """
+
+    def __init__(self, data_path: str) -> None:
+        """
+        Initializes the store under the given data directory.
+
+        Parameters
+        ------------
+        data_path: str
+            Directory holding the dataset files for a client and year.
+        """
+        self.data_path = data_path
+        self.columns_path = os.path.join(data_path, "columns")
+        self.masks_path = os.path.join(data_path, "masks")
+        self.stats_path = os.path.join(data_path, "stats")
+        os.makedirs(self.columns_path, exist_ok=True)
+        os.makedirs(self.masks_path, exist_ok=True)
+        os.makedirs(self.stats_path, exist_ok=True)
+
+    @staticmethod
+    def hash_values(values) -> str:
+        """
+        Returns a content hash for a column, index or mask.
+
+        Parameters
+        ------------
+        values: array-like
+            The values to hash.
+
+        Returns
+        ------------
+        str: Hex digest identifying the values and their dtype.
+        """
+        series = pd.Series(values, copy=False)
+        row_hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(series.dtype).encode())
+        digest.update(row_hashes.tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def derive_hash(*parts: str) -> str:
+        """
+        Returns a hash identifying values built from others without reading them,
+        such as the rows of a column kept by a mask or a column with rows appended.
+
+        Parameters
+        ------------
+        parts: str
+            Hashes of the values the result is built from, in order.
+
+        Returns
+        ------------
+        str: Hex digest identifying the combination.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(part.encode())
+        return digest.hexdigest()
+
+    def write_version(self, df: pd.DataFrame, base: dict = None, changed: set = None) -> dict:
+        """
+        Writes the parts of a dataframe that differ from its base version.
+
+        Parameters
+        ------------
+        df: pd.DataFrame
+            The dataframe to store.
+        base: dict
+            The version `df` was derived from, as returned by `read_version` or
+            `write_version`, or None to write every column.
+        changed: set
+            Columns the transformations since `base` may have added or given new
+            values, or None when unknown. The other columns are taken to hold the
+            base's values for the rows kept, so they aren't hashed again.
+
+        Returns
+        ------------
+        dict: The stored version: a shallow snapshot of the dataframe, its manifest,
+        per-column hashes and per-column statistics.
+        """
+        masks = []
+        row_mask = None
+        base_entries = {}
+        index_entry = None
+
+        if base is not None:
+            base_df = base["df"]
+            base_entries = {entry["name"]: entry for entry in base["manifest"]["columns"]}
+
+            if df.index.equals(base_df.index):
+                masks = list(base["manifest"]["masks"])
+                index_entry = base["manifest"]["index"]
+            else:
+                row_mask = self._find_row_mask(base_df.index, df.index)
+                if row_mask is not None:
+                    masks = list(base["manifest"]["masks"]) + [self._write_mask(row_mask)]
+                    index_entry = base["manifest"]["index"]
+                else:
+                    base_entries = {}
+
+        level = len(masks)
+
+        omitted = []
+        if base is not None:
+            omitted = [entry for entry in base.get("omitted", []) if entry["name"] not in df.columns]
+            if omitted and not base_entries:
+                raise ValueError("Rows were reordered or added to a partially loaded version; "
+                                 "load every column before saving it.")
+
+        if index_entry is None:
+            index_entry = self._write_index(df.index, level)
+
+        columns = []
+        hashes = {}
+        for name in df.columns:
+            entry = base_entries.get(name)
+            known = entry is not None and changed is not None and name not in changed and name in base["hashes"]
+
+            if entry is not None and not known and not self._column_unchanged(df, base, name, row_mask):
+                entry = None
+
+            if entry is None:
+                entry = self._write_column(df[name], name, level)
+                hashes[name] = entry["hash"]
+            elif row_mask is None:
+                hashes[name] = base["hashes"][name]
+            elif known:
+                hashes[name] = self.derive_hash(base["hashes"][name], masks[-1])
+            else:
+                hashes[name] = self.hash_values(df[name])
+
+            columns.append(entry)
+
+        stats = {}
+        if CONFIG['store']['column_stats']:
+            base_stats = base.get("stats", {}) if base is not None else {}
+            for name in df.columns:
+                if name in base_stats and base["hashes"].get(name) == hashes[name]:
+                    stats[name] = base_stats[name]
+                else:
+                    stats[name] = summarize(self.column_sketch(df[name], hashes[name]))
+
+        manifest = {
+            "format": "delta",
+            "masks": masks,
+            "index": index_entry,
+            "columns": columns + omitted
+        }
+        if base_entries and base["manifest"].get("appends"):
+            # Batches of rows appended to the base, which its blobs still list
+            manifest["appends"] = list(base["manifest"]["appends"])
+
+        return {
+            "df": df.copy(deep=False),
+            "manifest": manifest,
+            "hashes": hashes,
+            "stats": stats,
+            "omitted": omitted
+        }
+
+    def read_version(self, manifest: dict, columns: list = None, filters: list = None) -> dict:
+        """
+        Rebuilds a dataframe from its manifest.
+
+        Parameters
+        ------------
+        manifest: dict
+            The manifest of the version to load.
+        columns: list
+            Columns to load, or None for all of them. Columns left out are carried
+            over unchanged when the next version is written.
+        filters: list[tuple]
+            Row filters as (column, operator, value) tuples that must all hold.
+            Only row groups that may hold passing rows are decoded, and the rows
+            kept are recorded as a row mask over the version, so the result can
+            still serve as a base.
+
+        Returns
+        ------------
+        dict: The stored version: the dataframe, its manifest and per-column
+        content hashes. Work on a shallow copy of the dataframe so the version can
+        serve as the base for the next `write_version`.
+        """
+        selectors = self._compose_masks(manifest["masks"])
+        entries = self._select_entries(manifest, columns)
+
+        index, data, row_mask = self._read_rows(manifest, selectors, entries, filters)
+
+        if row_mask is not None and not row_mask.all():
+            manifest = dict(manifest, masks=list(manifest["masks"]) + [self._write_mask(row_mask)])
+            selectors.append(None)
+
+        hashes = {}
+        for entry in entries:
+            if row_mask is not None or selectors[entry["level"]] is not None or entry.get("appends"):
+                hashes[entry["name"]] = self.hash_values(data[entry["name"]])
+            else:
+                hashes[entry["name"]] = entry["hash"]
+
+        df = pd.DataFrame({entry["name"]: data[entry["name"]].array for entry in entries},
+                          index=index, columns=[entry["name"] for entry in entries], copy=False)
+
+        return {
+            "df": df,
+            "manifest": manifest,
+            "hashes": hashes,
+            "omitted": [entry for entry in manifest["columns"] if entry["name"] not in hashes]
+        }
+
+    def read_frame(self, manifest: dict, columns: list = None, filters: list = None,
+                   arrow_dtypes: bool = False) -> pd.DataFrame:
+        """
+        Reads part of a version without making it the base for new versions. Only
+        the requested columns and those referenced by the filters are decoded, and
+        only in the row groups that may hold passing rows.
+
+        Parameters
+        ------------
+        manifest: dict
+            The manifest of the version to read.
+        columns: list
+            Columns to load, or None for all of them.
+        filters: list[tuple]
+            Row filters as (column, operator, value) tuples that must all hold.
+        arrow_dtypes: bool
+            Keep the Arrow buffers as pandas ArrowDtype columns.
+
+        Returns
+        ------------
+        pd.DataFrame: The selected rows and columns.
+        """
+        selectors = self._compose_masks(manifest["masks"])
+        entries = self._select_entries(manifest, columns)
+
+        index, data, _ = self._read_rows(manifest, selectors, entries, filters, arrow_dtypes)
+
+        return pd.DataFrame({entry["name"]: data[entry["name"]].array for entry in entries},
+                            index=index, columns=[entry["name"] for entry in entries], copy=False)
+
+    def iter_frames(self, manifest: dict, batch_rows: int):
+        """
+        Reads a version a batch of rows at a time, decoding only the row groups
+        each batch covers.
+
+        Parameters
+        ------------
+        manifest: dict
+            The manifest of the version to read.
+        batch_rows: int
+            Rows per batch.
+
+        Returns
+        ------------
+        iterator of pd.DataFrame: The batches, in row order.
+        """
+        selectors = self._compose_masks(manifest["masks"])
+        entries = self._select_entries(manifest)
+        total = self._count_rows(manifest, selectors)
+
+        for start in range(0, max(total, 1), batch_rows):
+            rows = np.arange(start, min(start + batch_rows, total))
+            index = self._read_index(manifest, selectors, rows)
+            data = {entry["name"]: self._read_column(manifest, entry, selectors, rows=rows).array
+                    for entry in entries}
+            yield pd.DataFrame(data, index=index, columns=[entry["name"] for entry in entries], copy=False)
+
+    def project_version(self, version: dict, columns: list) -> dict:
+        """
+        Narrows an already loaded version to some of its columns without copying them.
+
+        Parameters
+        ------------
+        version: dict
+            A fully loaded version, as returned by `read_version` or `write_version`.
+        columns: list
+            Columns to keep.
+
+        Returns
+        ------------
+        dict: The projected version, carrying the other columns over like `read_version`.
+        """
+        df = version["df"]
+        manifest = version["manifest"]
+        self._select_entries(manifest, columns)
+
+        return {
+            "df": pd.DataFrame({col: df[col].array for col in columns},
+                               index=df.index, columns=columns, copy=False),
+            "manifest": manifest,
+            "hashes": {col: version["hashes"][col] for col in columns},
+            "omitted": [entry for entry in manifest["columns"] if entry["name"] not in columns]
+        }
+
+    def append_rows(self, base: dict, rows: pd.DataFrame) -> dict:
+        """
+        Adds rows to the end of a stored version, writing only the new rows. Each
+        column and the index get a new blob for the appended rows, listed after
+        the blob they extend, so the rows already stored are never rewritten.
+
+        Parameters
+        ------------
+        base: dict
+            A fully loaded version with a manifest, as returned by `read_version`
+            or `write_version`.
+        rows: pd.DataFrame
+            The rows to add, with the version's columns.
+
+        Returns
+        ------------
+        dict: The new version, usable as the base for the next `write_version`.
+        """
+        if base.get("omitted"):
+            raise ValueError("Load every column of a version before appending rows to it.")
+
+        df = base["df"]
+        manifest = base["manifest"]
+        if list(rows.columns) != list(df.columns):
+            raise ValueError("Appended rows must have the same columns as the version.")
+
+        level = len(manifest["masks"])
+        record = {"level": level, "start": len(df), "rows": len(rows)}
+
+        columns = []
+        data = {}
+        hashes = {}
+        stats = {}
+        for entry in manifest["columns"]:
+            name = entry["name"]
+            segment = self._write_column(rows[name], name, level)
+            columns.append(dict(entry, appends=list(entry.get("appends", [])) + [segment["hash"]]))
+            data[name] = self.concat_values([df[name].reset_index(drop=True), rows[name].reset_index(drop=True)])
+            hashes[name] = self.derive_hash(base["hashes"][name], segment["hash"])
+
+            if CONFIG['store']['column_stats']:
+                # The rows already stored keep their sketch; only the new rows are summarized
+                sketch = merge_sketches([self.column_sketch(df[name], base["hashes"][name]),
+                                         sketch_column(rows[name])])
+                self._write_sketch(hashes[name], sketch)
+                stats[name] = summarize(sketch)
+
+        index_values = pd.Series(rows.index, copy=False).reset_index(drop=True)
+        index_hash = self.hash_values(index_values)
+        self._write_blob(self.columns_path, index_hash, index_values)
+        index_entry = dict(manifest["index"], appends=list(manifest["index"].get("appends", [])) + [index_hash])
+
+        index = df.index.append(rows.index).rename(df.index.name)
+        combined = pd.DataFrame({name: values.array for name, values in data.items()},
+                                index=index, columns=df.columns, copy=False)
+
+        return {
+            "df": combined,
+            "manifest": dict(manifest, columns=columns, index=index_entry,
+                             appends=list(manifest.get("appends", [])) + [record]),
+            "hashes": hashes,
+            "stats": stats,
+            "omitted": []
+        }
+
+    def column_sketch(self, values, content_hash: str) -> dict:
+        """
+        Returns the statistics sketch of a column's values, reading the one saved
+        for the same values or computing and saving it.
+
+        Parameters
+        ------------
+        values: array-like
+            The column.
+        content_hash: str
+            The hash of the values, from `hash_values`.
+
+        Returns
+        ------------
+        dict: The sketch, from `column_stats.sketch_column`.
+        """
+        sketch_path = os.path.join(self.stats_path, f"{content_hash}.json")
+        if os.path.exists(sketch_path):
+            with open(sketch_path) as f:
+                return loads_sketch(f.read())
+
+        sketch = sketch_column(values)
+        self._write_sketch(content_hash, sketch)
+        return sketch
+
+    def _write_sketch(self, content_hash: str, sketch: dict) -> None:
+        """
+        Saves the statistics sketch of the values with the given hash.
+        """
+        sketch_path = os.path.join(self.stats_path, f"{content_hash}.json")
+        tmp_path = f"{sketch_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(dumps_sketch(sketch))
+        os.replace(tmp_path, sketch_path)
+
+    def _select_entries(self, manifest: dict, columns: list = None) -> list:
+        """
+        Returns the manifest entries for the requested columns, in the requested order.
+        """
+        if columns is None:
+            return list(manifest["columns"])
+
+        entries = {entry["name"]: entry for entry in manifest["columns"]}
+        missing = [col for col in columns if col not in entries]
+        if missing:
+            raise KeyError(f"Columns not found in version: {missing}")
+
+        return [entries[col] for col in columns]
+
+    def _read_rows(self, manifest: dict, selectors: list, entries: list, filters: list = None,
+                   arrow_dtypes: bool = False) -> tuple:
+        """
+        Reads the index and columns of a version, keeping the rows that pass the
+        filters. Row groups whose statistics or Bloom filters rule out every
+        filter match are never decoded.
+
+        Returns
+        ------------
+        tuple: The index, the columns by name including those the filters read,
+        and the mask of kept rows over the version, or None without filters.
+        """
+        filter_entries = self._select_entries(manifest, [col for col, _, _ in filters or []])
+
+        # Rows of the version to decode, or None for all of them
+        rows = None
+        candidates = self._candidate_rows(manifest, filter_entries, selectors, filters) if filters else None
+        if candidates is not None and not candidates.all():
+            rows = np.flatnonzero(candidates)
+
+        index = self._read_index(manifest, selectors, rows)
+
+        data = {}
+        for entry in entries + filter_entries:
+            if entry["name"] not in data:
+                data[entry["name"]] = self._read_column(manifest, entry, selectors, arrow_dtypes, rows)
+
+        if not filters:
+            return index, data, None
+
+        passed = filter_mask(data, filters)
+        if rows is None:
+            row_mask = passed
+        else:
+            row_mask = np.zeros(len(candidates), dtype=bool)
+            row_mask[rows[passed]] = True
+
+        index = index[passed]
+        data = {name: values[passed].reset_index(drop=True) for name, values in data.items()}
+
+        return index, data, row_mask
+
+    def _candidate_rows(self, manifest: dict, filter_entries: list, selectors: list, filters: list) -> np.ndarray:
+        """
+        Marks the rows of a version lying in row groups that may pass every filter.
+        """
+        entries = {entry["name"]: entry for entry in filter_entries}
+        candidates = None
+
+        for col, op, value in filters:
+            rows = []
+            for content_hash, selector in self._column_parts(manifest, entries[col], selectors):
+                metadata = pq.ParquetFile(self._blob_path(self.columns_path, content_hash), memory_map=True).metadata
+                groups = [metadata.row_group(i) for i in range(metadata.num_row_groups)]
+
+                keep = np.array([row_group_may_match(group, op, value) for group in groups], dtype=bool)
+                if op in ('==', 'in') and keep.any():
+                    bloom = self._read_bloom(content_hash, len(groups))
+                    if bloom is not None:
+                        keep &= bloom_contains(bloom, [value] if op == '==' else value)
+
+                part_rows = np.repeat(keep, [group.num_rows for group in groups])
+                rows.append(part_rows if selector is None else part_rows[selector])
+
+            rows = np.concatenate(rows)
+            candidates = rows if candidates is None else candidates & rows
+
+        return candidates
+
+    def _column_parts(self, manifest: dict, entry: dict, selectors: list) -> list:
+        """
+        Returns the blobs holding a column or index: the one written at its level,
+        then one per batch of rows appended since. Each comes with the selector
+        taking its rows to the rows of the version, or None for all of them.
+        """
+        segments = entry.get("appends", [])
+        appends = manifest.get("appends", [])
+        records = appends[len(appends) - len(segments):]
+
+        selector = selectors[entry["level"]]
+        if selector is not None:
+            # Rows appended at the same level follow the blob's own rows
+            appended = sum(record["rows"] for record in records if record["level"] == entry["level"])
+            selector = selector[:len(selector) - appended]
+
+        parts = [(entry.get("hash"), selector)]
+        for content_hash, record in zip(segments, records):
+            selector = selectors[record["level"]]
+            if selector is not None:
+                selector = selector[record["start"]:record["start"] + record["rows"]]
+            parts.append((content_hash, selector))
+
+        return parts
+
+    def _count_rows(self, manifest: dict, selectors: list) -> int:
+        """
+        Counts the rows of a version without reading them.
+        """
+        total = 0
+        for content_hash, selector in self._column_parts(manifest, manifest["index"], selectors):
+            if selector is not None:
+                total += int(selector.sum())
+            elif content_hash is None:
+                total += len(range(*manifest["index"]["range"]))
+            else:
+                total += self._blob_rows(content_hash)
+
+        return total
+
+    def _read_column(self, manifest: dict, entry: dict, selectors: list, arrow_dtypes: bool = False,
+                     rows: np.ndarray = None) -> pd.Series:
+        """
+        Reads a column and narrows it to the rows of the version, or to the given
+        rows of the version.
+        """
+        values = []
+        offset = 0
+
+        for content_hash, selector in self._column_parts(manifest, entry, selectors):
+            if rows is None:
+                part = self._read_blob(self.columns_path, content_hash, arrow_dtypes)
+                if selector is not None:
+                    part = part[selector].reset_index(drop=True)
+            else:
+                count = self._blob_rows(content_hash) if selector is None else int(selector.sum())
+                local = rows[(rows >= offset) & (rows < offset + count)] - offset
+                offset += count
+                if selector is not None:
+                    local = np.flatnonzero(selector)[local]
+                part = self._read_blob_rows(self.columns_path, content_hash, local, arrow_dtypes)
+            values.append(part)
+
+        return self.concat_values(values)
+
+    @staticmethod
+    def concat_values(values: list) -> pd.Series:
+        """
+        Joins the parts of a column end to end, merging the categories of
+        categorical parts instead of falling back to object dtype.
+
+        Parameters
+        ------------
+        values: list[pd.Series]
+            The parts, in row order.
+
+        Returns
+        ------------
+        pd.Series: The whole column with a fresh range index.
+        """
+        values = [part for part in values if len(part)] or values[:1]
+        if len(values) == 1:
+            return values[0].reset_index(drop=True)
+
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in values):
+            joined = pd.api.types.union_categoricals([part.array for part in values])
+            return pd.Series(joined, name=values[0].name)
+
+        return pd.concat(values, ignore_index=True)
+
+    def _find_row_mask(self, base_index: pd.Index, index: pd.Index):
+        """
+        Returns a boolean mask selecting `index` out of `base_index`, or None when the
+        new rows are not an order-preserving subset of the base rows.
+        """
+        if len(index) >= len(base_index) or not base_index.is_unique:
+            return None
+
+        row_mask = base_index.isin(index)
+        if not base_index[row_mask].equals(index):
+            return None
+
+        return row_mask
+
+    def _column_unchanged(self, df: pd.DataFrame, base: dict, name, row_mask) -> bool:
+        """
+        Checks whether a column still holds the values it had when the base was loaded.
+        """
+        if name not in base["hashes"]:
+            return False
+
+        if row_mask is None:
+            return self.hash_values(df[name]) == base["hashes"][name]
+
+        # The base frame shares buffers with the working frame, so make sure it was
+        # not edited in place before comparing the surviving rows.
+        base_column = base["df"][name]
+        if self.hash_values(base_column) != base["hashes"][name]:
+            return False
+
+        return base_column[row_mask].reset_index(drop=True).equals(df[name].reset_index(drop=True))
+
+    def _write_column(self, series: pd.Series, name, level: int) -> dict:
+        """
+        Writes a column blob if one with the same content does not exist yet.
+        """
+        values = series.reset_index(drop=True)
+        content_hash = self.hash_values(values)
+        if self._write_blob(self.columns_path, content_hash, values) and CONFIG['store']['bloom_filters']:
+            self._write_bloom(content_hash, values)
+
+        return {"name": name, "hash": content_hash, "level": level}
+
+    def _write_index(self, index: pd.Index, level: int) -> dict:
+        """
+        Writes the row index, storing plain range indexes by their bounds only.
+        """
+        if isinstance(index, pd.RangeIndex):
+            return {
+                "name": index.name,
+                "range": [index.start, index.stop, index.step],
+                "level": level
+            }
+
+        values = pd.Series(index, copy=False)
+        content_hash = self.hash_values(values)
+        self._write_blob(self.columns_path, content_hash, values)
+
+        return {"name": index.name, "hash": content_hash, "level": level}
+
+    def _read_index(self, manifest: dict, selectors: list, rows: np.ndarray = None) -> pd.Index:
+        """
+        Rebuilds the row index of a version, or of the given rows of the version.
+        """
+        entry = manifest["index"]
+        if "range" not in entry:
+            values = self._read_column(manifest, entry, selectors, rows=rows)
+            return pd.Index(values.array, name=entry["name"])
+
+        pieces = []
+        for content_hash, selector in self._column_parts(manifest, entry, selectors):
+            if content_hash is None:
+                piece = pd.RangeIndex(*entry["range"])
+            else:
+                piece = pd.Index(self._read_blob(self.columns_path, content_hash).array)
+            pieces.append(piece if selector is None else piece[selector])
+
+        index = pieces[0].append(pieces[1:]) if len(pieces) > 1 else pieces[0]
+        index = index.rename(entry["name"])
+
+        return index if rows is None else index[rows]
+
+    def _write_mask(self, row_mask: np.ndarray) -> str:
+        """
+        Writes a row mask blob and returns its hash.
+        """
+        values = pd.Series(row_mask, dtype=bool)
+        content_hash = self.hash_values(values)
+        self._write_blob(self.masks_path, content_hash, values)
+
+        return content_hash
+
+    def write_keys(self, hashes: np.ndarray) -> str:
+        """
+        Stores an array of key hashes, such as the keys a transformation has seen.
+
+        Parameters
+        ------------
+        hashes: np.ndarray
+            The uint64 hashes.
+
+        Returns
+        ------------
+        str: The hash identifying the stored array.
+        """
+        values = pd.Series(hashes, dtype=np.uint64)
+        content_hash = self.hash_values(values)
+        self._write_blob(self.masks_path, content_hash, values)
+
+        return content_hash
+
+    def read_keys(self, content_hash: str) -> np.ndarray:
+        """
+        Reads an array of key hashes stored with `write_keys`.
+
+        Parameters
+        ------------
+        content_hash: str
+            The hash returned by `write_keys`.
+
+        Returns
+        ------------
+        np.ndarray: The uint64 hashes.
+        """
+        return self._read_blob(self.masks_path, content_hash).to_numpy(dtype=np.uint64)
+
+    def _compose_masks(self, mask_hashes: list) -> list:
+        """
+        Returns, for every row level, the selector taking rows at that level to the
+        rows of the final version (None at the final level itself).
+        """
+        selectors = [None] * (len(mask_hashes) + 1)
+
+        for level in reversed(range(len(mask_hashes))):
+            row_mask = self._read_blob(self.masks_path, mask_hashes[level]).to_numpy(dtype=bool)
+            following = selectors[level + 1]
+            if following is not None:
+                # Rows appended at the next level follow the ones this mask keeps
+                row_mask = row_mask.copy()
+                row_mask[row_mask] = following[:row_mask.sum()]
+            selectors[level] = row_mask
+
+        return selectors
+
+    def _write_blob(self, directory: str, content_hash: str, values: pd.Series) -> bool:
+        """
+        Writes a single-column Parquet blob, skipping it if it is already stored.
+        Returns whether it was written.
+        """
+        blob_path = self._blob_path(directory, content_hash)
+        if os.path.exists(blob_path):
+            return False
+
+        tmp_path = f"{blob_path}.tmp"
+        values.rename("values").to_frame().to_parquet(tmp_path, index=False,
+                                                      row_group_size=CONFIG['store']['row_group_rows'])
+        os.replace(tmp_path, blob_path)
+        return True
+
+    def _read_blob(self, directory: str, content_hash: str, arrow_dtypes: bool = False) -> pd.Series:
+        """
+        Reads a single-column Parquet blob through a memory map.
+        """
+        return read_parquet(self._blob_path(directory, content_hash), arrow_dtypes=arrow_dtypes)["values"]
+
+    def _read_blob_rows(self, directory: str, content_hash: str, positions: np.ndarray,
+                        arrow_dtypes: bool = False) -> pd.Series:
+        """
+        Reads the values at some positions of a blob, decoding only the row groups
+        holding them.
+        """
+        parquet = pq.ParquetFile(self._blob_path(directory, content_hash), memory_map=True)
+        sizes = np.array([parquet.metadata.row_group(i).num_rows
+                          for i in range(parquet.metadata.num_row_groups)], dtype=np.int64)
+        starts = np.cumsum(sizes) - sizes
+
+        groups = np.searchsorted(starts, positions, side="right") - 1
+        needed = np.unique(groups)
+
+        # Where each needed group starts once the groups are read back to back
+        read_starts = np.zeros(len(sizes), dtype=np.int64)
+        read_starts[needed] = np.cumsum(sizes[needed]) - sizes[needed]
+
+        table = parquet.read_row_groups(needed.tolist())
+        table = table.take(pa.array(positions - starts[groups] + read_starts[groups]))
+        return table_to_pandas(table, arrow_dtypes)["values"]
+
+    def _write_bloom(self, content_hash: str, values: pd.Series) -> None:
+        """
+        Writes the Bloom filters of a newly written column blob, one per row group.
+        """
+        bloom = build_bloom(values, CONFIG['store']['row_group_rows'], CONFIG['store']['bloom_bits_per_value'])
+        if bloom is None:
+            return
+
+        bloom_path = os.path.join(self.columns_path, f"{content_hash}.bloom")
+        tmp_path = f"{bloom_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **bloom)
+        os.replace(tmp_path, bloom_path)
+
+    def _read_bloom(self, content_hash: str, n_groups: int) -> dict:
+        """
+        Reads the Bloom filters of a column blob, or None when it has none
+        matching its row groups.
+        """
+        bloom_path = os.path.join(self.columns_path, f"{content_hash}.bloom")
+        if not os.path.exists(bloom_path):
+            return None
+
+        with np.load(bloom_path) as saved:
+            bloom = {name: saved[name] for name in saved.files}
+
+        return bloom if len(bloom['bits']) == n_groups else None
+
+    def _blob_rows(self, content_hash: str) -> int:
+        """
+        Returns the number of rows in a column blob, from its footer.
+        """
+        return pq.ParquetFile(self._blob_path(self.columns_path, content_hash), memory_map=True).metadata.num_rows
+
+    @staticmethod
+    def _blob_path(directory: str, content_hash: str) -> str:
+        """
+        Returns the path of a blob.
+        """
+        return os.path.join(directory, f"{content_hash}.parquet")
@@ -0,0 +1,31 @@
+import os
+import pandas as pd
+import pytest
+from lib.config import CONFIG
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """
+    Points ManageData at a fresh data folder and runs the test from it.
+    """
+    monkeypatch.setitem(CONFIG['paths'], 'data', str(tmp_path) + os.sep)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def mixed_frame():
+    """
+    A small frame with numbers, text, categories, dates and missing values.
+    """
+    return pd.DataFrame({
+        'id': range(8),
+        'amount': [10.5, -3.0, None, 7.25, 0.0, 12.0, -1.5, 3.0],
+        'state': pd.array(['CA', 'NY', None, 'CA', 'TX', 'NY', 'CA', 'TX'], dtype='string'),
+        'kind': pd.Categorical(['a', 'b', 'a', None, 'b', 'a', 'c', 'c']),
+        'count': pd.array([1, None, 3, 4, 5, None, 7, 8], dtype='Int64'),
+        'when': pd.to_datetime(['2024-01-01', None, '2024-02-01', '2024-03-01',
+                                '2024-04-01', '2024-05-01', '2024-06-01', '2024-07-01']),
+        'note': ['x', None, 'y', 'z', None, 'x', 'w', 'v'],
+    })
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import pytest
+from lib.backends import compare_backends, pl, duckdb
+
+pytestmark = pytest.mark.skipif(pl is None or duckdb is None, reason="needs polars and duckdb")
+
+
+@pytest.fixture
+def frame(mixed_frame):
+    """
+    The mixed frame with plain float, integer and text columns holding missing
+    values and numbers at the edges of the math functions' domains.
+    """
+    return mixed_frame.drop(columns=['when']).assign(
+        b=[2, np.nan, 3, 1, 2, np.nan, 2, 5],
+        x=[1.0, -1.0, 0.0, np.nan, 0.5, 4.0, -0.5, 2.0],
+        i=[3, -2, 0, 5, 7, 1, 3, 3],
+        text=pd.Series(['x', None, 'y', 'x', 'z', 'x', None, 'y'], dtype='str'),
+    )
+
+
+def lookup(df):
+    """
+    A load_dataset for merges that always returns the same dataframe.
+    """
+    return lambda dataset, version, columns: {'df': df, 'indexes': {}}
+
+
+def assert_backends_match(df, steps, load_dataset=None):
+    differences = compare_backends(df, steps, load_dataset)
+    assert differences == {'polars': None, 'duckdb': None}, differences
+
+
+FILTERS = [
+    {'b': '!= 2'},
+    {'b': '> 1'},
+    {'b': '== b'},
+    {'text': "!= 'x'"},
+    {'text': "== 'y'"},
+    {'state': "!= 'CA'"},
+    {'count': '!= 4'},
+    {'count': '>= 3', 'amount': '< 10'},
+    {'x': '> 0'},
+]
+
+
+@pytest.mark.parametrize('filters', FILTERS, ids=str)
+def test_filter_queries(frame, filters):
+    assert_backends_match(frame, [{'name': 'Filtered Rows', 'filters': filters}])
+
+
+PREDICATES = [
+    [('b', '!=', 2)],
+    [('b', '<', 3)],
+    [('text', '==', 'x')],
+    [('text', '!=', 'x')],
+    [('state', 'in', ['CA', None])],
+    [('state', 'not in', ['CA'])],
+    [('count', 'in', [1, 4, 8])],
+    [('note', 'not in', ['x', None])],
+]
+
+
+@pytest.mark.parametrize('predicates', PREDICATES, ids=str)
+def test_filter_predicates(frame, predicates):
+    assert_backends_match(frame, [{'name': 'Filtered Rows', 'predicates': [list(p) for p in predicates]}])
+
+
+FORMULAS = [
+    '[b] > 1',
+    '[b] != 2',
+    '[b] == [b]',
+    '([b] > 1) & ([x] < 2)',
+    '([b] > 1) | ~([x] < 0)',
+    'where([b] > 1, [x], -[x])',
+    '[b] / [x]',
+    '[b] // [x]',
+    '[b] % [x]',
+    '[i] * 2 - [b]',
+    '[x] ** 0.5',
+    'abs([x]) + exp([x] * 1000)',
+    'log([x])',
+    'log10([x])',
+    'log1p([x] - 1)',
+    'expm1([x])',
+    'sqrt([x])',
+    'arcsin([x] * 2)',
+    'arccos([x] * 2)',
+    'arccosh([x])',
+    'arctanh([x])',
+    'arctan2([x], [b])',
+    'sinh([x]) + cosh([x]) + tanh([x]) + arcsinh([x])',
+    'log([x]) > 0',
+    "[text] + '_suffix'",
+    "[text] == 'x'",
+    "[text] != 'x'",
+    "[state] == 'CA'",
+    '[count] + 1',
+    '[count] > 3',
+    'log([count])',
+]
+
+
+@pytest.mark.parametrize('formula', FORMULAS)
+def test_added_columns(frame, formula):
+    assert_backends_match(frame, [{'name': 'Added Column', 'column_name': 'c', 'formula': formula}])
+
+
+def test_added_columns_read_earlier_ones(frame):
+    steps = [{'name': 'Added Column', 'column_name': 'c', 'formula': 'sqrt([x])'},
+             {'name': 'Added Column', 'column_name': 'd', 'formula': '[c] > 0.5'},
+             {'name': 'Added Column', 'column_name': 'x', 'formula': '[x] * 10'},
+             {'name': 'Filtered Rows', 'filters': {'d': '== False'}}]
+    assert_backends_match(frame, steps)
+
+
+@pytest.mark.parametrize('keep', ['first', 'last', 'none'])
+@pytest.mark.parametrize('subset', [None, ['text'], ['text', 'b'], ['state', 'count']], ids=str)
+def test_removed_duplicates(frame, subset, keep):
+    df = pd.concat([frame, frame.iloc[[0, 1, 6]]], ignore_index=True)
+    assert_backends_match(df, [{'name': 'Removed Duplicates', 'subset': subset, 'keep': keep}])
+
+
+def test_merge(frame):
+    right = pd.DataFrame({
+        'text': pd.Series(['x', 'y', None, 'q'], dtype='str'),
+        'b': [2, 3, np.nan, 4],
+        'amount': [1.0, 2.0, 3.0, 4.0],
+        'extra': pd.array([1, None, 3, 4], dtype='Int64'),
+    })
+    steps = [{'name': 'Merged DataFrame', 'dataset': 1, 'version': 0, 'columns': ['text'], 'load_columns': None},
+             {'name': 'Added Column', 'column_name': 'c', 'formula': '[amount_x] != [amount_y]'},
+             {'name': 'Filtered Rows', 'filters': {'extra': '!= 3'}}]
+    assert_backends_match(frame, steps, lookup(right))
+
+
+def test_chained_steps(frame):
+    steps = [{'name': 'Filtered Rows', 'filters': {'b': '!= 3'}},
+             {'name': 'Added Column', 'column_name': 'c', 'formula': 'log([x]) + [i]'},
+             {'name': 'Removed Duplicates', 'subset': ['text'], 'keep': 'last'},
+             {'name': 'Filtered Rows', 'predicates': [['c', '>', -1]]}]
+    assert_backends_match(frame, steps)
@@ -0,0 +1,48 @@
+import json
+import os
+import pandas as pd
+from lib.batch_import import batch_import, database_names
+from lib.config import ClientPath
+
+
+def write_spec(client):
+    path = ClientPath(client).get('named_specs', 'specs', create=True, spec_name='csv')
+    with open(path, 'w') as f:
+        json.dump({'delimited': True, 'delimiter': ',', 'contains_headers': True, 'utf8_encoding': True}, f)
+
+
+def test_same_file_names_in_different_folders_stay_apart(data_dir):
+    for folder, rows in (('a', 1), ('b', 2)):
+        os.makedirs(data_dir / 'in' / folder)
+        (data_dir / 'in' / folder / 'jan.csv').write_text("x\n" + "".join(f"{folder}{i}\n" for i in range(rows)))
+    write_spec('client')
+
+    report = batch_import('client', 2024, 'csv', str(data_dir / 'in' / '*' / '*.csv'), workers=2)
+
+    assert report['succeeded'] == 2 and report['failed'] == 0
+    for result in report['results']:
+        folder = os.path.basename(os.path.dirname(result['source']))
+        target = ClientPath('client').get('database', 'data', db_name=result['database'])
+        assert pd.read_parquet(target)['x'].str[0].eq(folder).all()
+        assert len(pd.read_parquet(target)) == result['rows']
+
+
+def test_empty_file_is_an_error(data_dir):
+    (data_dir / 'empty.csv').write_text("x\n")
+    write_spec('client')
+
+    report = batch_import('client', 2024, 'csv', str(data_dir / 'empty.csv'), workers=1)
+
+    assert report['failed'] == 1
+    assert 'No rows' in report['results'][0]['error']
+
+
+def test_database_names():
+    names = database_names(['in/a/jan.csv', 'in/b/jan.csv', 'in/b/feb.csv', 'in/b/feb.txt'])
+
+    assert names == {
+        'in/a/jan.csv': os.path.join('a', 'jan'),
+        'in/b/jan.csv': os.path.join('b', 'jan'),
+        'in/b/feb.csv': os.path.join('b', 'feb_csv'),
+        'in/b/feb.txt': os.path.join('b', 'feb_txt'),
+    }
@@ -0,0 +1,26 @@
+import sqlite3
+from lib.catalog import VersionCatalog
+
+
+def test_datasets_keep_their_order(tmp_path):
+    catalog = VersionCatalog(str(tmp_path / 'catalog.sqlite'))
+    for path_id in ('b', 'a', 'c'):
+        catalog.add_dataset(path_id, {'source': path_id})
+    catalog.add_dataset('a', {'source': 'a2'})
+
+    df_list = catalog.load_df_list()
+    assert list(df_list) == ['b', 'a', 'c']
+    assert df_list['a']['metadata'] == {'source': 'a2'}
+
+    catalog.add_dataset('d', {})
+    assert list(catalog.load_df_list()) == ['b', 'a', 'c', 'd']
+    catalog.close()
+
+
+def test_new_positions_come_from_the_index(tmp_path):
+    db_path = str(tmp_path / 'catalog.sqlite')
+    VersionCatalog(db_path).close()
+
+    plan = sqlite3.connect(db_path).execute(
+        "EXPLAIN QUERY PLAN SELECT COALESCE(MAX(position) + 1, 0) FROM datasets").fetchall()
+    assert any('datasets_position' in row[-1] for row in plan)
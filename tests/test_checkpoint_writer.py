@@ -0,0 +1,60 @@
+import atexit
+import threading
+from lib.checkpoint_writer import CheckpointWriter
+
+
+def test_jobs_run_in_order():
+    writer = CheckpointWriter()
+    order = []
+    for i in range(20):
+        writer.submit(lambda i=i: order.append(i))
+
+    assert writer.flush(timeout=10)
+    assert order == list(range(20))
+    writer.close()
+
+
+def test_coalesced_job_runs_after_jobs_submitted_before_it():
+    writer = CheckpointWriter()
+    started = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def blocking():
+        started.set()
+        release.wait(10)
+        order.append('version 1')
+
+    writer.submit(blocking)
+    started.wait(10)
+    first = writer.submit(lambda: order.append('state a'), key='state')
+    writer.submit(lambda: order.append('version 2'))
+    second = writer.submit(lambda: order.append('state b'), key='state')
+    release.set()
+
+    assert writer.flush(timeout=10)
+    assert first is second
+    assert order == ['version 1', 'version 2', 'state b']
+    writer.close()
+
+
+def test_failed_job_resolves_with_its_error():
+    writer = CheckpointWriter()
+    future = writer.submit(lambda: 1 / 0)
+
+    assert writer.flush(timeout=10)
+    assert isinstance(future.exception(), ZeroDivisionError)
+    writer.close()
+
+
+def test_closing_writes_queued_jobs_and_drops_the_exit_hook(monkeypatch):
+    unregistered = []
+    monkeypatch.setattr(atexit, 'unregister', unregistered.append)
+    writer = CheckpointWriter()
+    order = []
+    for i in range(5):
+        writer.submit(lambda i=i: order.append(i))
+
+    writer.close()
+    assert order == list(range(5))
+    assert unregistered == [writer.close] and not writer._thread.is_alive()
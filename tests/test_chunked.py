@@ -0,0 +1,19 @@
+import pandas as pd
+import pandas.testing as tm
+from lib.chunked import join_chunked, write_batches
+from lib.config import CONFIG
+
+
+def test_join_matches_pandas_across_partitions(tmp_path, monkeypatch):
+    left = pd.DataFrame({'k': [0.0, -0.0, 1.0, 2.0, None] * 40, 'a': range(200)})
+    right = pd.DataFrame({'k': [-0.0, 1, 3], 'b': ['x', 'y', 'z']})
+    frame = write_batches([left], str(tmp_path / 'left.parquet'), temporary=False)
+    # A budget this small splits the left side into several partitions
+    monkeypatch.setitem(CONFIG['chunked'], 'memory_bytes', 1)
+
+    joined = join_chunked(frame, right, ['k'], str(tmp_path / 'joined.parquet'), str(tmp_path)).to_pandas()
+
+    expected = pd.merge(left, right, on='k', how='outer')
+    by_values = ['k', 'a', 'b']
+    tm.assert_frame_equal(joined.sort_values(by_values, ignore_index=True),
+                          expected.sort_values(by_values, ignore_index=True), check_dtype=False)
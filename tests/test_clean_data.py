@@ -0,0 +1,83 @@
+import pandas as pd
+import pandas.testing as tm
+import pytest
+from lib.clean_data import CleanData
+
+
+def load(data_dir, df, client='client', year='2024'):
+    source = data_dir / 'source.csv'
+    source.write_text('unused')
+    cleaner = CleanData(client, year)
+    cleaner.load_df(str(source), df_new=df)
+    return cleaner
+
+
+def test_checkpoints_reload_after_each_operation(data_dir, mixed_frame):
+    cleaner = load(data_dir, mixed_frame)
+
+    cleaner.add_col('double', '[amount] * 2')
+    cleaner.add_checkpoint('added')
+    cleaner.filter_rows([('state', '==', 'CA')])
+    cleaner.add_col('id2', '[id] + 1')
+    cleaner.add_checkpoint('filtered')
+    cleaner.remove_duplicates(['kind'])
+    cleaner.add_checkpoint('deduplicated')
+    expected = cleaner.df.copy()
+    cleaner.flush()
+
+    cleaner.cache.clear()
+    cleaner.set_active_df(cleaner.path_id, cleaner.df_id)
+    tm.assert_frame_equal(cleaner.df, expected)
+
+    # Earlier checkpoints are untouched by later ones
+    cleaner.set_active_df(cleaner.path_id, 1)
+    assert list(cleaner.df.columns) == list(mixed_frame.columns) + ['double']
+    assert len(cleaner.df) == len(mixed_frame)
+
+
+def test_frame_replaced_without_an_operation_is_checked(data_dir, mixed_frame):
+    cleaner = load(data_dir, mixed_frame)
+
+    df = cleaner.df.copy()
+    df['amount'] = df['amount'] + 1
+    cleaner.df = df
+    cleaner.add_checkpoint('edited')
+    cleaner.flush()
+
+    cleaner.cache.clear()
+    cleaner.set_active_df(cleaner.path_id, cleaner.df_id)
+    tm.assert_series_equal(cleaner.df['amount'], mixed_frame['amount'] + 1)
+
+
+def test_appended_rows_with_other_columns_are_added_as_they_are(data_dir, mixed_frame):
+    cleaner = load(data_dir, mixed_frame)
+    cleaner.add_col('double', '[amount] * 2')
+    cleaner.add_checkpoint('added')
+    cleaned = cleaner.df.copy()
+
+    other = pd.DataFrame({'id': [20, 21], 'amount': [1.0, 2.0], 'extra': ['p', 'q']})
+    cleaner.append_rows('other.csv', df_new=other)
+
+    expected = pd.concat([cleaned, other], ignore_index=True)
+    tm.assert_frame_equal(cleaner.df, expected)
+
+    cleaner.add_checkpoint('merged')
+    cleaner.flush()
+    cleaner.cache.clear()
+    cleaner.set_active_df(cleaner.path_id, cleaner.df_id)
+    assert len(cleaner.df) == len(expected) and list(cleaner.df.columns) == list(expected.columns)
+
+
+def test_closing_saves_pending_work_and_stops_the_writer(data_dir, mixed_frame):
+    with CleanData('acme', '2024') as cleaner:
+        source = data_dir / 'source.csv'
+        source.write_text('unused')
+        cleaner.load_df(str(source), df_new=mixed_frame)
+        cleaner.add_checkpoint('saved')
+
+    assert not cleaner.writer._thread.is_alive()
+    with pytest.raises(RuntimeError, match="closed"):
+        cleaner.writer.submit(lambda: None)
+
+    with CleanData('acme', '2024') as reopened:
+        assert len(reopened.df_list[cleaner.path_id]['history']) == 2
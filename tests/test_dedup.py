@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+from lib.dedup import drop_duplicate_rows, dedup_parquet
+
+
+def signed_zeros():
+    return pd.DataFrame({
+        'x': [0.0, -0.0, 1.5, -0.0, np.nan, 0.0],
+        'y': pd.array([-0.0, 0.0, None, 0.0, None, 2.0], dtype='Float64'),
+        'k': ['a', 'a', 'b', 'a', 'c', 'a'],
+    })
+
+
+@pytest.mark.parametrize('keep', ['first', 'last', 'none'])
+@pytest.mark.parametrize('subset', [None, ['x'], ['y', 'k']], ids=str)
+def test_negative_zero_matches_drop_duplicates(subset, keep):
+    df = signed_zeros()
+    expected = df.drop_duplicates(subset, keep={'none': False}.get(keep, keep))
+
+    tm.assert_frame_equal(drop_duplicate_rows(df, subset, keep), expected)
+
+
+@pytest.mark.parametrize('subset', [None, ['x']], ids=str)
+def test_negative_zero_matches_drop_duplicates_out_of_core(tmp_path, subset):
+    df = signed_zeros()
+    source, target = str(tmp_path / 'source.parquet'), str(tmp_path / 'target.parquet')
+    df.to_parquet(source, index=False)
+
+    summary = dedup_parquet(source, target, subset, partitions=4, spill_dir=str(tmp_path))
+
+    expected = df.drop_duplicates(subset).reset_index(drop=True)
+    assert summary['rows_after'] == len(expected)
+    tm.assert_frame_equal(pd.read_parquet(target), expected, check_dtype=False)
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+from lib.expressions import compile_formula, FUNCTIONS
+
+FORMULAS = [
+    '[a] + [b] * 2 - -[a]',
+    '([a] - [b]) ** 2 / ([b] % 3 + 1)',
+    '[a] > 1 & [b] <= 4 | not [a] == 3',
+    '1 < [a] < 4',
+    "where([a] != [b], sqrt(abs([a])), log1p([b]))",
+]
+
+
+@pytest.mark.parametrize('formula', FORMULAS)
+def test_source_computes_what_the_kernel_does(formula):
+    compiled = compile_formula(formula)
+    args = [np.array([1.0, 2.0, 3.0, 4.0]), np.array([4.0, 2.0, 0.0, 5.0])][:len(compiled['columns'])]
+
+    namespace = {**FUNCTIONS, **{f"_c{i}": arg for i, arg in enumerate(args)}}
+    from_source = eval(compiled['source'], {"__builtins__": {}}, namespace)
+    np.testing.assert_array_equal(from_source, compiled['kernel'](*args))
+
+
+def test_unsupported_calls_are_named():
+    with pytest.raises(ValueError, match="Unsupported function call: eval"):
+        compile_formula('eval([a])')
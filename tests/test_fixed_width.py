@@ -0,0 +1,59 @@
+import pyarrow.parquet as pq
+import pytest
+from lib.config import CONFIG
+from lib.fixed_width import read_fixed_width, iter_fixed_width
+from lib.import_engine import stream_import
+
+
+# Each line is 12 bytes, so blocks of 40 bytes hold a few lines each
+LINES = ["001  1.5 aa", "002  2.5 bb", "003  3.5 cc", "004  4.5 dd", "x05  5.5 ee", "006 six  ff", "007  7.5 gg"]
+
+
+def fixed_specs(**types):
+    columns = [{'name': 'id', 'start': 0, 'end': 3},
+               {'name': 'amount', 'start': 3, 'end': 8},
+               {'name': 'code', 'start': 9, 'end': 11}]
+    for col in columns:
+        if col['name'] in types:
+            col['type'] = types[col['name']]
+    return {'delimited': False, 'fixed_width_columns': columns, 'contains_headers': False, 'utf8_encoding': True}
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG['import'], 'chunk_bytes', 40)
+    path = tmp_path / 'source.txt'
+    path.write_text("\n".join(LINES) + "\n")
+    return str(path)
+
+
+def test_later_blocks_widen_inferred_types(source):
+    types = {}
+    blocks = [table for table, _ in iter_fixed_width(source, fixed_specs(), types=types)]
+
+    assert len(blocks) > 1
+    assert str(blocks[0].schema.field('id').type) == 'int64'
+    assert str(types['id']) == 'string' and str(types['amount']) == 'string'
+
+
+def test_read_keeps_every_value_of_widened_columns(source):
+    df = read_fixed_width(source, fixed_specs())
+
+    assert df['id'].tolist() == ["001", "002", "003", "004", "x05", "006", "007"]
+    assert df['amount'].tolist() == ["1.5", "2.5", "3.5", "4.5", "5.5", "six", "7.5"]
+    assert df['code'].tolist() == ["aa", "bb", "cc", "dd", "ee", "ff", "gg"]
+
+
+def test_layout_types_name_the_column_and_line(source):
+    with pytest.raises(ValueError, match=r"Column id on line 5: 'x05'"):
+        read_fixed_width(source, fixed_specs(id='int64'))
+
+
+def test_streaming_imports_again_with_widened_types(source, tmp_path):
+    target = str(tmp_path / 'data.parquet')
+    summary = stream_import(source, fixed_specs(), target)
+
+    df = pq.read_table(target).to_pandas()
+    assert summary['rows'] == len(LINES)
+    assert df['id'].tolist() == ["001", "002", "003", "004", "x05", "006", "007"]
+    assert df['amount'].tolist()[-2:] == ["six", "7.5"]
@@ -0,0 +1,76 @@
+import pandas as pd
+import pandas.testing as tm
+import pyarrow.parquet as pq
+from lib.import_engine import read_source, apply_specs, optimize_dtypes, stream_import, reader_dtypes
+
+
+def csv_specs(**extra):
+    return dict({'delimited': True, 'delimiter': ',', 'contains_headers': True, 'utf8_encoding': True}, **extra)
+
+
+def saved_specs(tmp_path):
+    """
+    Specs with the compact types chosen for a first file of small values, as the
+    import dialog saves them.
+    """
+    first = tmp_path / 'first.csv'
+    first.write_text("a,b,c\n1,0.5,x\n2,1.25,x\n3,2.0,y\n")
+    df = apply_specs(read_source(str(first), csv_specs()), csv_specs())
+    _, dtypes, _ = optimize_dtypes(df)
+    assert dtypes['a'] == 'Int8' and dtypes['b'] == 'float32'
+    return csv_specs(optimize_dtypes=True, dtypes=dtypes)
+
+
+def test_saved_compact_types_never_change_later_values(tmp_path):
+    specs = saved_specs(tmp_path)
+    later = tmp_path / 'later.csv'
+    later.write_text("a,b,c\n300,0.1234567891,x\n-70000,,y\n4,2.5,x\n")
+
+    df = apply_specs(read_source(str(later), specs), specs)
+
+    assert df['a'].tolist() == [300, -70000, 4]
+    assert df['b'].tolist()[0] == 0.1234567891
+    assert pd.isna(df['b'].tolist()[1])
+
+
+def test_saved_compact_types_apply_where_values_fit(tmp_path):
+    specs = saved_specs(tmp_path)
+    later = tmp_path / 'later.csv'
+    later.write_text("a,b,c\n5,0.75,x\n,1.5,y\n")
+
+    df = apply_specs(read_source(str(later), specs), specs)
+
+    assert str(df['a'].dtype) == 'Int8'
+    assert str(df['b'].dtype) == 'float32'
+    assert df['a'].isna().tolist() == [False, True]
+
+
+def test_streamed_import_keeps_values_with_saved_types(tmp_path):
+    specs = saved_specs(tmp_path)
+    later = tmp_path / 'later.csv'
+    later.write_text("a,b,c\n1,0.5,x\n" + "".join(f"{i * 1000},{i}.123456789,y\n" for i in range(50)))
+
+    stream_import(str(later), specs, str(tmp_path / 'out.parquet'), chunksize=7)
+    df = pq.read_table(tmp_path / 'out.parquet').to_pandas()
+
+    expected = pd.read_csv(later)
+    tm.assert_series_equal(df['a'].astype('int64'), expected['a'])
+    tm.assert_series_equal(df['b'], expected['b'])
+
+
+def test_reader_types_cannot_overflow():
+    assert reader_dtypes({'a': 'Int8', 'b': 'uint16', 'c': 'float32', 'd': 'category'}) == \
+        {'a': 'Int64', 'b': 'Int64', 'c': 'float64', 'd': 'category'}
+
+
+def test_streamed_import_widens_types_that_change_between_chunks(tmp_path):
+    source = tmp_path / 'mixed.csv'
+    lines = [f"{i},{i % 3},x{i}" for i in range(150)] + [f"{i}.5,{'' if i % 2 else 'q'},{i}" for i in range(150, 300)]
+    source.write_text("a,b,c\n" + "\n".join(lines) + "\n")
+    target = tmp_path / 'out.parquet'
+
+    summary = stream_import(str(source), csv_specs(), str(target), chunksize=100)
+
+    expected = read_source(str(source), csv_specs())
+    assert summary['rows'] == 300
+    tm.assert_frame_equal(pq.read_table(target).to_pandas(), expected, check_dtype=False)
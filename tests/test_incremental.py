@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+from lib.clean_data import CleanData
+
+FALLBACK = "cleaning the whole dataset again"
+
+
+def raw_frame():
+    return pd.DataFrame({
+        'id': range(8),
+        'state': ['CA', 'NY', 'CA', 'TX', 'NY', 'WA', 'CA', 'TX'],
+        'amount': [10.5, -3.0, np.nan, 7.25, 0.0, 12.0, -1.5, 3.0],
+        'kind': ['a', 'b', 'a', 'c', 'b', 'a', 'c', 'c'],
+    })
+
+
+def appended_frame():
+    # Repeats earlier states and kinds, and brings new ones
+    return pd.DataFrame({
+        'id': range(8, 13),
+        'state': ['NY', 'OR', 'CA', 'OR', 'NV'],
+        'amount': [4.0, np.nan, 2.5, 8.0, -6.0],
+        'kind': ['b', 'd', 'a', 'd', 'e'],
+    })
+
+
+def cleaned(cleaner, steps):
+    cleaner.apply([dict(step) for step in steps])
+    cleaner.add_checkpoint('cleaned')
+
+
+def load(data_dir, cleaner, name, df):
+    source = data_dir / name
+    source.write_text('unused')
+    cleaner.load_df(str(source), df_new=df)
+    return cleaner.path_id
+
+
+def appended_and_full(data_dir, steps, other=None):
+    """
+    Cleans the raw rows, appends more and returns the result reloaded from disk,
+    with the result of cleaning all the raw rows at once.
+    """
+    results = []
+    for client, append in (('incremental', True), ('full', False)):
+        cleaner = CleanData(client, '2024')
+        other_id = load(data_dir, cleaner, f'{client}_other.csv', other) if other is not None else None
+
+        raw = raw_frame() if append else pd.concat([raw_frame(), appended_frame()], ignore_index=True)
+        load(data_dir, cleaner, f'{client}.csv', raw)
+        cleaned(cleaner, [dict(step, dataset=other_id) if 'dataset' in step else step for step in steps])
+
+        if append:
+            cleaner.append_rows('appended.csv', df_new=appended_frame())
+            cleaner.flush()
+            cleaner.cache.clear()
+            cleaner.set_active_df(cleaner.path_id, cleaner.df_id)
+        results.append(cleaner.df)
+
+    return results
+
+
+ROW_LOCAL = [
+    {'name': 'Filtered Rows', 'filters': {'amount': '> 0'}},
+    {'name': 'Added Column', 'column_name': 'double', 'formula': '[amount] * 2'},
+    {'name': 'Filtered Rows', 'predicates': [['state', '!=', 'TX']]},
+]
+
+
+def test_filters_and_columns(data_dir, capsys):
+    incremental, full = appended_and_full(data_dir, ROW_LOCAL)
+
+    assert FALLBACK not in capsys.readouterr().out
+    tm.assert_frame_equal(incremental, full)
+
+
+@pytest.mark.parametrize('keep', ['first', 'last', 'none'])
+@pytest.mark.parametrize('subset', [['state'], ['state', 'kind']], ids=str)
+def test_removed_duplicates(data_dir, capsys, subset, keep):
+    steps = [{'name': 'Added Column', 'column_name': 'double', 'formula': '[amount] * 2'},
+             {'name': 'Removed Duplicates', 'subset': subset, 'keep': keep}]
+    incremental, full = appended_and_full(data_dir, steps)
+
+    assert FALLBACK not in capsys.readouterr().out
+    tm.assert_frame_equal(incremental.sort_index(), full)
+
+
+def test_merge(data_dir, capsys):
+    other = pd.DataFrame({'state': ['CA', 'NY', 'OR', 'ME'], 'region': ['west', 'east', 'west', 'east']})
+    steps = [{'name': 'Merged DataFrame', 'dataset': None, 'version': 0, 'columns': ['state'], 'load_columns': None},
+             {'name': 'Filtered Rows', 'predicates': [['id', '!=', 3]]}]
+    incremental, full = appended_and_full(data_dir, steps, other)
+    assert FALLBACK not in capsys.readouterr().out
+
+    # Merged rows are sorted by key, so appended ones land elsewhere in a full clean
+    def by_values(df):
+        return df.sort_values(['state', 'id'], na_position='last').reset_index(drop=True)
+
+    tm.assert_frame_equal(by_values(incremental), by_values(full), check_dtype=False)
+
+
+def test_changed_keys_fall_back_to_a_full_clean(data_dir, capsys):
+    steps = [{'name': 'Removed Duplicates', 'subset': ['state'], 'keep': 'last'},
+             {'name': 'Added Column', 'column_name': 'state', 'formula': "[kind] + '_'"}]
+    incremental, full = appended_and_full(data_dir, steps)
+
+    assert FALLBACK in capsys.readouterr().out
+    tm.assert_frame_equal(incremental.sort_index(), full)
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+from lib.config import CONFIG
+from lib.join import outer_join, outer_join_rows, partitioned_outer_join_rows
+
+
+def sides():
+    rng = np.random.default_rng(7)
+    left = pd.DataFrame({'k': rng.integers(0, 50, 400).astype(float), 'a': np.arange(400)})
+    right = pd.DataFrame({'k': rng.integers(25, 75, 300), 'b': np.arange(300)})
+    left.loc[::37, 'k'] = np.nan
+    return left, right
+
+
+def test_partitioned_rows_match_a_single_hash_table():
+    left, right = sides()
+
+    expected = outer_join_rows(left, right, ['k'])
+    for partitions in (1, 4, 16):
+        actual = partitioned_outer_join_rows(left, right, ['k'], partitions)
+        np.testing.assert_array_equal(actual[0], expected[0])
+        np.testing.assert_array_equal(actual[1], expected[1])
+
+
+def test_partitioned_join_matches_pandas(monkeypatch):
+    monkeypatch.setitem(CONFIG['join'], 'partition_rows', 100)
+    left, right = sides()
+
+    expected = pd.merge(left, right, on='k', how='outer')
+    pd.testing.assert_frame_equal(outer_join(left, right, ['k']), expected, check_dtype=False)
@@ -0,0 +1,44 @@
+import json
+import pytest
+from lib.config import ClientPath
+from lib.replay import replay, replay_job, save_pipeline
+
+STEPS = [{'name': 'Filtered Rows', 'filters': {'a': '> 1'}}]
+MERGE = {'name': 'Merged DataFrame', 'dataset': 1, 'version': 0, 'columns': ['a'], 'load_columns': None}
+
+
+def save_specs(client, name, delimiter):
+    path = ClientPath(client).get('named_specs', 'specs', create=True, spec_name=name)
+    with open(path, 'w') as f:
+        json.dump({'delimited': True, 'delimiter': delimiter, 'contains_headers': True, 'utf8_encoding': True}, f)
+
+
+def test_jobs_of_one_year_run_together_with_their_own_specs(data_dir):
+    save_specs('acme', 'commas', ',')
+    save_specs('acme', 'semicolons', ';')
+    (data_dir / 'a.csv').write_text("a,b\n1,x\n2,y\n3,z\n")
+    (data_dir / 'b.csv').write_text("a;b\n5;x\n0;y\n")
+
+    report = replay([{'client': 'acme', 'year': 2024, 'sources': 'a.csv', 'spec_name': 'commas'},
+                     {'client': 'acme', 'year': 2024, 'sources': ['b.csv'], 'spec_name': 'semicolons'}],
+                    transformations=STEPS, workers=1)
+
+    assert report['jobs'] == 1 and report['succeeded'] == 1
+    results = {result['source']: result for result in report['results'][0]['sources']}
+    assert results['a.csv']['spec_name'] == 'commas' and results['a.csv']['rows_after'] == 2
+    assert results['b.csv']['spec_name'] == 'semicolons' and results['b.csv']['rows_after'] == 1
+
+    with open(ClientPath('acme').get('years', 'replay_report', year='2024')) as f:
+        assert len(json.load(f)['results'][0]['sources']) == 2
+
+
+def test_merges_are_rejected_before_anything_runs(data_dir):
+    with pytest.raises(ValueError, match="Step 2 merges dataset 1"):
+        replay([{'client': 'acme', 'year': 2024, 'sources': 'a.csv'}], transformations=STEPS + [MERGE])
+
+    with pytest.raises(ValueError, match="Step 1 merges"):
+        save_pipeline('acme', 'with_merge', [MERGE])
+
+    result = replay_job('acme', '2024', ['a.csv'], [MERGE])
+    assert result['status'] == 'error' and "merges dataset" in result['error']
+    assert not (data_dir / 'acme').exists()
@@ -0,0 +1,143 @@
+import os
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+from lib.version_store import VersionStore
+
+
+def blobs(store):
+    return {name for name in os.listdir(store.columns_path) if name.endswith('.parquet')}
+
+
+def masks(store):
+    return set(os.listdir(store.masks_path))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return VersionStore(str(tmp_path))
+
+
+def test_round_trip(store, mixed_frame):
+    version = store.write_version(mixed_frame)
+    loaded = store.read_version(version['manifest'])
+
+    tm.assert_frame_equal(loaded['df'], mixed_frame)
+    assert loaded['hashes'] == version['hashes']
+
+
+def test_non_range_index_round_trip(store, mixed_frame):
+    df = mixed_frame.set_index(pd.Index(list('abcdefgh'), name='key'))
+    version = store.write_version(df)
+
+    tm.assert_frame_equal(store.read_version(version['manifest'])['df'], df)
+
+
+def test_added_column_writes_only_the_new_column(store, mixed_frame):
+    base = store.write_version(mixed_frame)
+    before = blobs(store)
+
+    df = mixed_frame.copy(deep=False)
+    df['double'] = df['amount'] * 2
+    version = store.write_version(df, base=base)
+
+    assert len(blobs(store) - before) == 1
+    assert version['manifest']['masks'] == []
+    tm.assert_frame_equal(store.read_version(version['manifest'])['df'], df)
+
+
+def test_filter_writes_a_mask_instead_of_columns(store, mixed_frame):
+    base = store.write_version(mixed_frame)
+    before = blobs(store)
+
+    df = mixed_frame[mixed_frame['amount'] > 0]
+    version = store.write_version(df, base=base)
+
+    assert blobs(store) == before
+    assert len(version['manifest']['masks']) == 1
+    tm.assert_frame_equal(store.read_version(version['manifest'])['df'], df)
+
+
+def test_chained_masks_and_new_columns(store, mixed_frame):
+    version = store.write_version(mixed_frame)
+    df = mixed_frame
+
+    for step in range(3):
+        df = df.iloc[1:].copy(deep=False)
+        df[f'step{step}'] = np.arange(len(df)) * step
+        version = store.write_version(df, base=version)
+
+    loaded = store.read_version(version['manifest'])
+    tm.assert_frame_equal(loaded['df'], df)
+
+    # A loaded version serves as the base for the next one
+    df = loaded['df'][loaded['df']['id'] % 2 == 0]
+    version = store.write_version(df, base=loaded)
+    tm.assert_frame_equal(store.read_version(version['manifest'])['df'], df)
+
+
+def test_changed_columns_are_the_only_ones_hashed(store, mixed_frame, monkeypatch):
+    base = store.write_version(mixed_frame)
+
+    df = mixed_frame[mixed_frame['id'] > 2].copy(deep=False)
+    df['double'] = df['amount'] * 2
+
+    hashed = []
+    original = VersionStore.hash_values
+    monkeypatch.setattr(VersionStore, 'hash_values', staticmethod(lambda values: hashed.append(1) or original(values)))
+
+    version = store.write_version(df, base=base, changed={'double'})
+
+    # The new column and the row mask; the kept columns aren't read
+    assert len(hashed) == 2
+    tm.assert_frame_equal(store.read_version(version['manifest'])['df'], df)
+
+
+def test_unknown_changes_are_detected_by_hash(store, mixed_frame):
+    base = store.write_version(mixed_frame)
+
+    df = mixed_frame.copy()
+    df.loc[3, 'amount'] = 99.0
+    version = store.write_version(df, base=base)
+
+    assert version['hashes']['amount'] != base['hashes']['amount']
+    assert version['hashes']['state'] == base['hashes']['state']
+    tm.assert_frame_equal(store.read_version(version['manifest'])['df'], df)
+
+
+def test_appended_rows(store, mixed_frame):
+    base = store.write_version(mixed_frame.iloc[:5])
+    rows = mixed_frame.iloc[5:]
+
+    version = store.append_rows(base, rows)
+    tm.assert_frame_equal(version['df'], mixed_frame)
+    tm.assert_frame_equal(store.read_version(version['manifest'])['df'], mixed_frame)
+
+    # Filters after an append mask the appended rows too
+    df = version['df'][version['df']['id'] != 6]
+    filtered = store.write_version(df, base=version, changed=set())
+    tm.assert_frame_equal(store.read_version(filtered['manifest'])['df'], df)
+
+
+def test_read_columns_and_filters(store, mixed_frame):
+    version = store.write_version(mixed_frame)
+
+    loaded = store.read_version(version['manifest'], columns=['id', 'state'], filters=[('state', '==', 'CA')])
+    expected = mixed_frame.loc[mixed_frame['state'] == 'CA', ['id', 'state']]
+
+    tm.assert_frame_equal(loaded['df'], expected)
+    assert {entry['name'] for entry in loaded['omitted']} == set(mixed_frame.columns) - {'id', 'state'}
+
+    # Omitted columns are carried over when the partial version is saved
+    saved = store.write_version(loaded['df'], base=loaded)
+    reloaded = store.read_version(saved['manifest'])['df']
+    tm.assert_frame_equal(reloaded, mixed_frame.loc[mixed_frame['state'] == 'CA', reloaded.columns])
+
+
+def test_identical_columns_share_blobs(store, mixed_frame):
+    store.write_version(mixed_frame)
+    before = blobs(store)
+
+    store.write_version(mixed_frame.rename(columns={'amount': 'value'}))
+    assert blobs(store) == before